@@ -1,11 +1,30 @@
-from typing import List, Union
+import csv
+import io
+import secrets
+import uuid
+from collections import Counter
+from typing import Dict, Iterator, List, Optional, Tuple, Union
 from uuid import UUID
 
+from fastapi import HTTPException
+from loguru import logger
+from pydantic import ValidationError
+from starlette.concurrency import run_in_threadpool
+
 from db.models.user import User
 from db.models.course import Course
 from api.v1.schemas.course_schema import ListAdminCourse
 from api.v1.schemas.admin_schema import PlatformSettingsResponse, UpdateSettingsRequest 
+from api.v1.schemas.admin_schema import UserImportResponse, UserImportRow, UserImportStatus
+from api.v1.schemas.user_schema import UserCreate
+from core.config import USER_IMPORT_BATCH_SIZE, BCRYPT_ROUNDS, BCRYPT_TARGET_MS, BCRYPT_MAX_ROUNDS
+from db.session import async_session
+from db.models.user import PortalRole, Gender
 from services.admin_service import AdminDAL
+from services.course_service import CourseDAL
+from services.user_service import UserDAL
+from utils.hashing import (BCRYPT_ROUNDS_FLOOR, bulk_password_hasher, calibrate_bcrypt_rounds,
+                           configure_password_hashing)
 
 async def _get_user_by_id(user_id, session) -> Union[User, None]:
     async with session.begin():
@@ -68,9 +87,137 @@ async def _get_settings(session) -> PlatformSettingsResponse:
             settings = await admin_dal.upsert_settings()
         return PlatformSettingsResponse.model_validate(settings)
 
+async def _configure_password_hashing() -> int:
+    """
+    Стоимость bcrypt для всех воркеров: BCRYPT_ROUNDS, иначе калибровка при каждом старте.
+    В platform_settings хранится наибольшая из откалиброванных стоимостей: на новом железе
+    она повышается, но не понижается, поэтому воркеры не пересчитывают хеши друг за другом.
+    """
+    if BCRYPT_ROUNDS:
+        return configure_password_hashing(BCRYPT_ROUNDS)
+    rounds = calibrate_bcrypt_rounds(BCRYPT_TARGET_MS, BCRYPT_ROUNDS_FLOOR, BCRYPT_MAX_ROUNDS)
+    async with async_session() as session:
+        async with session.begin():
+            admin_dal = AdminDAL(session)
+            rounds = await admin_dal.store_bcrypt_rounds(rounds)
+    return configure_password_hashing(rounds, calibrated=True)
+
 async def _update_settings(body, session) -> PlatformSettingsResponse:
     async with session.begin():
         admin_dal = AdminDAL(session)
         params = body.model_dump(exclude_none=True)
         settings = await admin_dal.upsert_settings(**params)
         return PlatformSettingsResponse.model_validate(settings)
+
+
+_IMPORT_FIELDS = ("email", "last_name", "first_name", "patronymic", "phone", "password")
+
+
+def _validate_import_row(data: Dict[str, str]) -> Tuple[Optional[UserCreate], Optional[str], Optional[str]]:
+    """(пользователь, сгенерированный пароль, ошибка) для строки файла."""
+    fields = {key: data[key] for key in _IMPORT_FIELDS if data.get(key)}
+    generated_password = None
+    if "password" not in fields:
+        generated_password = secrets.token_urlsafe(9)
+        fields["password"] = generated_password
+    try:
+        return UserCreate(**fields), generated_password, None
+    except ValidationError as err:
+        return None, None, "; ".join(f"{'.'.join(map(str, e['loc']))}: {e['msg']}" for e in err.errors())
+    except HTTPException as err:
+        return None, None, str(err.detail)
+
+
+async def _import_users(records: Iterator[Tuple[int, Dict[str, str]]], course_id: Optional[int],
+                        session) -> Union[UserImportResponse, None]:
+    logger.info(f"Импорт пользователей (курс: {course_id})")
+    rows: List[UserImportRow] = []
+    new_users: List[Tuple[UserImportRow, UserCreate]] = []
+    seen: set[str] = set()
+
+    for line, data in await run_in_threadpool(list, records):
+        user, generated_password, error = _validate_import_row(data)
+        email = user.email if user is not None else data.get("email", "").lower()
+        row = UserImportRow(row=line, email=email, status=UserImportStatus.CREATED,
+                            password=generated_password, error=error)
+        rows.append(row)
+        if user is None:
+            row.status = UserImportStatus.INVALID
+        elif email in seen:
+            row.status, row.password = UserImportStatus.DUPLICATE, None
+        else:
+            seen.add(email)
+            new_users.append((row, user))
+
+    async with session.begin():
+        if course_id is not None and not await CourseDAL(session).course_exists(course_id):
+            return None
+        # Дубликаты с базой — одним запросом на весь файл
+        existing = await UserDAL(session).get_existing_emails([user.email for _, user in new_users])
+    for row, user in new_users:
+        if user.email in existing:
+            row.status, row.password = UserImportStatus.EXISTS, None
+    new_users = [(row, user) for row, user in new_users if row.status == UserImportStatus.CREATED]
+
+    hashed_passwords = await bulk_password_hasher.hash_many([user.password for _, user in new_users])
+
+    for start in range(0, len(new_users), USER_IMPORT_BATCH_SIZE):
+        batch = new_users[start:start + USER_IMPORT_BATCH_SIZE]
+        values = [
+            {
+                "user_id": uuid.uuid4(),
+                "last_name": user.last_name,
+                "first_name": user.first_name,
+                "patronymic": user.patronymic,
+                "email": user.email,
+                "phone": user.phone,
+                "roles": [PortalRole.ROLE_PORTAL_USER.value],
+                "gender": [Gender.OTHER.value],
+                "balance": 0,
+                "is_active": True,
+                "hashed_password": hashed_password,
+            }
+            for (_, user), hashed_password in zip(batch, hashed_passwords[start:start + USER_IMPORT_BATCH_SIZE])
+        ]
+        async with session.begin():
+            created = await UserDAL(session).create_users_bulk(values)
+        for row, user in batch:
+            if user.email in created:
+                row.user_id = created[user.email]
+            else:
+                # Email заняли между проверкой и вставкой
+                row.status, row.password = UserImportStatus.EXISTS, None
+
+    if course_id is not None:
+        # На курс записываются и созданные, и уже существовавшие пользователи из файла
+        accounts = {row.email: row for row in rows if row.status in (UserImportStatus.CREATED, UserImportStatus.EXISTS)}
+        emails = list(accounts)
+        for start in range(0, len(emails), USER_IMPORT_BATCH_SIZE):
+            async with session.begin():
+                enrolled = await CourseDAL(session).enroll_students_by_email(
+                    course_id, emails[start:start + USER_IMPORT_BATCH_SIZE],
+                )
+            for email, added in enrolled.items():
+                accounts[email].enrollment = "enrolled" if added else "already_enrolled"
+
+    counts = Counter(row.status for row in rows)
+    logger.info(f"Импорт пользователей: {dict(counts)}")
+    return UserImportResponse(
+        total=len(rows),
+        created=counts[UserImportStatus.CREATED],
+        exists=counts[UserImportStatus.EXISTS],
+        invalid=counts[UserImportStatus.INVALID],
+        duplicate=counts[UserImportStatus.DUPLICATE],
+        enrolled=sum(1 for row in rows if row.enrollment == "enrolled"),
+        rows=rows,
+    )
+
+
+def _user_import_report_csv(report: UserImportResponse) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["row", "email", "status", "user_id", "password", "enrollment", "error"])
+    for row in report.rows:
+        writer.writerow([row.row, row.email, row.status.value, row.user_id or "", row.password or "",
+                         row.enrollment or "", row.error or ""])
+    return buffer.getvalue()
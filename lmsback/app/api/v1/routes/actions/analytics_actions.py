@@ -0,0 +1,154 @@
+from collections import defaultdict
+from typing import Any, Optional
+from uuid import UUID
+
+from loguru import logger
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.v1.schemas.course_schema import GradebookCells, GradebookLessons, GradebookResponse, GradebookStudents
+from api.v1.schemas.lesson_schema import (
+    TestAnalyticsResponse,
+    TestItemAnalysis,
+    TestOptionStat,
+    TestWrongAnswerStat,
+)
+from db.models.lesson import LessonType
+from services.analytics_service import AnalyticsDAL
+from services.course_service import CourseDAL
+from services.lesson_service import LessonDAL
+from utils.cache import test_analytics_cache
+
+# Частых неправильных текстовых ответов на вопрос
+WRONG_ANSWERS_LIMIT = 10
+
+
+def _correct_options(correct_row: Any) -> set[int]:
+    if correct_row is None:
+        return set()
+    if isinstance(correct_row.correct_options, list):
+        return {i for i in correct_row.correct_options if isinstance(i, int)}
+    if correct_row.correct_option is not None:
+        return {correct_row.correct_option}
+    return set()
+
+
+def _option_stats(question: dict, counts: dict[int, int], answered: int, correct: set[int]) -> list[TestOptionStat]:
+    options = question.get("options") or []
+    # Варианты из вопроса (и невыбранные тоже), затем выбранные, которых в вопросе уже нет
+    indexes = list(range(len(options))) + sorted(i for i in counts if not 0 <= i < len(options))
+    return [
+        TestOptionStat(
+            option=i,
+            text=options[i] if 0 <= i < len(options) else None,
+            is_correct=i in correct,
+            count=counts.get(i, 0),
+            share=round(counts.get(i, 0) / answered, 4) if answered else 0.0,
+        )
+        for i in indexes
+    ]
+
+
+async def _get_test_analytics(
+    lesson_slug: str,
+    teacher_user_id: UUID,
+    session: AsyncSession,
+) -> TestAnalyticsResponse:
+    async with session.begin():
+        lesson_dal = LessonDAL(session)
+        analytics_dal = AnalyticsDAL(session)
+        lesson = await lesson_dal.get_lesson_by_slug_for_teacher(lesson_slug, teacher_user_id)
+        if lesson is None:
+            raise ValueError(f"Урок с slug '{lesson_slug}' не найден или нет доступа")
+        if LessonType(lesson.lesson_type) != LessonType.TEST:
+            raise ValueError("Указанный урок не является тестом")
+
+        # Новая отправка меняет число отправок и последний id — и с ними ключ кэша
+        stamp = await analytics_dal.get_test_submission_stamp(lesson.id)
+        cache_key = (lesson.id, lesson.updated_at, stamp.submissions, stamp.last_id)
+        cached = test_analytics_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        logger.info(f"Расчёт аналитики теста '{lesson_slug}': отправок {stamp.submissions}")
+        item_stats = await analytics_dal.get_test_item_stats(lesson.id)
+        option_rows = await analytics_dal.get_test_option_counts(lesson.id)
+        wrong_rows = await analytics_dal.get_test_wrong_text_answers(lesson.id, WRONG_ANSWERS_LIMIT)
+        correct_answers_map = await lesson_dal.get_test_correct_answers_map(lesson.id)
+
+    option_counts: dict[int, dict[int, int]] = defaultdict(dict)
+    for question_index, option, count in option_rows:
+        try:
+            option_counts[question_index][int(option)] = count
+        except ValueError:
+            continue
+    wrong_answers: dict[int, list[TestWrongAnswerStat]] = defaultdict(list)
+    for question_index, answer, count in wrong_rows:
+        wrong_answers[question_index].append(TestWrongAnswerStat(answer=answer, count=count))
+
+    questions = lesson.questions or []
+    items: list[TestItemAnalysis] = []
+    for row in item_stats:
+        question: dict = questions[row.question_index] if row.question_index < len(questions) \
+            and isinstance(questions[row.question_index], dict) else {}
+        q_type: Optional[str] = question.get("question_type") or ("single" if question else None)
+        discrimination = row.discrimination
+        items.append(TestItemAnalysis(
+            question_index=row.question_index,
+            question_type=q_type,
+            prompt=question.get("prompt"),
+            answered=row.answered,
+            attempts=row.attempts,
+            correct=row.correct,
+            difficulty=round(row.correct / row.attempts, 4) if row.attempts else None,
+            discrimination=round(discrimination, 4) if discrimination is not None else None,
+            options=_option_stats(question, option_counts.get(row.question_index, {}), row.answered,
+                                  _correct_options(correct_answers_map.get(row.question_index)))
+            if q_type in ("single", "multiple") else [],
+            wrong_answers=wrong_answers.get(row.question_index, []),
+        ))
+
+    analytics = TestAnalyticsResponse(
+        test_lesson_id=lesson.id,
+        lesson_slug=lesson.slug,
+        submissions=stamp.submissions,
+        mean_score=round(stamp.mean_score, 4) if stamp.mean_score is not None else None,
+        items=items,
+    )
+    test_analytics_cache.set(cache_key, analytics)
+    return analytics
+
+
+async def _get_course_gradebook(
+    course_slug: str,
+    teacher_user_id: UUID,
+    session: AsyncSession,
+) -> GradebookResponse:
+    logger.info(f"Получение журнала курса '{course_slug}' для преподавателя")
+    async with session.begin():
+        course_id = await CourseDAL(session).get_teacher_course_id(user_id=teacher_user_id, slug=course_slug)
+        if course_id is None:
+            raise ValueError(f"Курс с slug '{course_slug}' не найден или нет доступа")
+
+        analytics_dal = AnalyticsDAL(session)
+        students = await analytics_dal.get_gradebook_students(course_id)
+        lessons = await analytics_dal.get_gradebook_lessons(course_id)
+        cells = await analytics_dal.get_gradebook_cells(course_id)
+
+    return GradebookResponse(
+        course_id=course_id,
+        course_slug=course_slug,
+        students=GradebookStudents(
+            user_id=[row.user_id for row in students],
+            last_name=[row.last_name for row in students],
+            first_name=[row.first_name for row in students],
+            email=[row.email for row in students],
+        ),
+        lessons=GradebookLessons(
+            id=[row.id for row in lessons],
+            slug=[row.slug for row in lessons],
+            name=[row.name for row in lessons],
+            lesson_type=[row.lesson_type for row in lessons],
+            max_score=[row.max_score for row in lessons],
+        ),
+        cells=GradebookCells(**cells),
+    )
@@ -1,52 +1,112 @@
 from typing import Union
+from uuid import UUID
 
 from fastapi import Depends, status
 from fastapi import HTTPException
 from fastapi.security import OAuth2PasswordBearer
-from jose import jwt
 from jose import JWTError
 from loguru import logger
+from pydantic import ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from api.v1.schemas.user_schema import TokenData
+from api.v1.schemas.user_schema import TokenData, TokenClaims, UserPrincipal
 from services.user_service import UserDAL
 from db.models.user import User
 
-from core.config import SECRET_KEY, ALGORITHM
 from utils.hashing import Hasher
+from utils.cache import user_cache, token_version_cache
+from utils.security import decode_token
 from db.session import get_db
 
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/token")
 
 
-async def _get_user_by_email_for_auth(email: str, session: AsyncSession):
+async def _get_user_by_email_for_auth(email: str, session: AsyncSession) -> Union[UserPrincipal, None]:
     async with session.begin():
         user_dal = UserDAL(session)
-        return await user_dal.get_user_by_email(
+        user_row = await user_dal.get_user_principal_by_email(
             email=email,
         )
+    if user_row is not None:
+        return UserPrincipal.model_validate(user_row)
+
+async def _get_user_credentials_by_email(email: str, session: AsyncSession) -> Union[User, None]:
+    async with session.begin():
+        user_dal = UserDAL(session)
+        return await user_dal.get_user_credentials_by_email(
+            email=email,
+        )
+
+async def _get_user_by_token_subject(email: str, session: AsyncSession) -> Union[UserPrincipal, None]:
+    user = user_cache.get(email)
+    if user is not None:
+        return user
 
-async def authenticate_user(email: str, password: str, session: AsyncSession):
     user = await _get_user_by_email_for_auth(email=email, session=session)
+    if user is not None:
+        user_cache.set(email, user)
+    return user
+
+async def _get_token_version(user_id: UUID, session: AsyncSession) -> Union[int, None]:
+    token_version = token_version_cache.get(user_id)
+    if token_version is not None:
+        return token_version
+
+    async with session.begin():
+        user_dal = UserDAL(session)
+        token_version = await user_dal.get_token_version(user_id=user_id)
+    if token_version is not None:
+        token_version_cache.set(user_id, token_version)
+    return token_version
+
+def _is_token_version_valid(payload: dict, user: UserPrincipal) -> bool:
+    # Токены, выпущенные до появления версии, принимаем до истечения их срока
+    token_version = payload.get("token_version")
+    return token_version is None or token_version == user.token_version
+
+def build_access_token_claims(user: Union[User, UserPrincipal]) -> dict:
+    return {
+        "sub": user.email,
+        "user_id": str(user.user_id),
+        "roles": list(user.roles),
+        "token_version": user.token_version,
+    }
+
+async def authenticate_user(email: str, password: str, session: AsyncSession):
+    user = await _get_user_credentials_by_email(email=email, session=session)
     if user is None:
         return
-    if not Hasher.verify_password(password, user.hashed_password):
+    if not await Hasher.verify_password_async(password, user.hashed_password):
         return
+    if Hasher.needs_rehash(user.hashed_password):
+        await _rehash_user_password(user=user, password=password, session=session)
     return user
 
+async def _rehash_user_password(user: User, password: str, session: AsyncSession) -> None:
+    # Хеш со старой стоимостью bcrypt пересчитываем, пока знаем пароль
+    try:
+        hashed_password = await Hasher.get_password_hash_async(password)
+        async with session.begin():
+            user_dal = UserDAL(session)
+            await user_dal.update_user_password(
+                user_id=user.user_id,
+                hashed_password=hashed_password,
+            )
+        logger.info(f"Пароль пользователя {user.user_id} перехеширован")
+    except Exception as err:
+        logger.error(f"Не удалось перехешировать пароль пользователя {user.user_id}: {err}")
+
 
 async def get_current_user_from_token(
     token: str = Depends(oauth2_scheme), session: AsyncSession = Depends(get_db)
-):
+) -> UserPrincipal:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
     )
     try:
-        payload = jwt.decode(
-            token, SECRET_KEY, algorithms=[ALGORITHM]
-        )
+        payload = decode_token(token)
         email: str = payload.get("sub")
         if email is None:
             logger.error('Отсутсвует почта')
@@ -54,19 +114,69 @@ async def get_current_user_from_token(
     except JWTError:
         logger.error(JWTError)
         raise credentials_exception
-    user = await _get_user_by_email_for_auth(email=email, session=session)
+    # Refresh-токен не несёт версии и живёт днями: как bearer он обошёл бы отзыв
+    if payload.get("token_type") != "access":
+        logger.error(f'Неверный тип токена {payload.get("token_type")}')
+        raise credentials_exception
+    user = await _get_user_by_token_subject(email=email, session=session)
     if user is None:
         logger.error(f'Пользователь не найден {email}')
         raise credentials_exception
+    if not _is_token_version_valid(payload, user):
+        logger.error(f'Устаревшая версия токена пользователя {email}')
+        raise credentials_exception
     
     return user
 
+async def get_current_principal_from_token(
+    token: str = Depends(oauth2_scheme), session: AsyncSession = Depends(get_db)
+) -> TokenClaims:
+    """
+    Пользователь из claims access-токена без загрузки из базы.
+    Подходит для эндпоинтов, которым нужны только user_id, email и роли.
+    """
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+    )
+    try:
+        payload = decode_token(token)
+    except JWTError as err:
+        logger.error(err)
+        raise credentials_exception
+    if payload.get("token_type") != "access":
+        logger.error(f'Неверный тип токена {payload.get("token_type")}')
+        raise credentials_exception
+
+    if "token_version" not in payload:
+        # Токен выпущен до появления claims: принимаем до истечения срока, пользователя берём из базы
+        email = payload.get("sub")
+        user = await _get_user_by_token_subject(email=email, session=session) if email else None
+        if user is None:
+            logger.error(f'Пользователь не найден {email}')
+            raise credentials_exception
+        return TokenClaims(sub=user.email, user_id=user.user_id, roles=list(user.roles),
+                           token_version=user.token_version)
+
+    try:
+        claims = TokenClaims(**payload)
+    except ValidationError as err:
+        logger.error(err)
+        raise credentials_exception
+
+    token_version = await _get_token_version(user_id=claims.user_id, session=session)
+    if token_version is None or token_version != claims.token_version:
+        logger.error(f'Токен пользователя {claims.email} отозван')
+        raise credentials_exception
+
+    return claims
+
 async def get_current_user_from_token_ws(
         token: str,
         session: AsyncSession,
-):
+) -> Union[UserPrincipal, None]:
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = decode_token(token)
         email: str = payload.get("sub")
         if email is None:
             logger.error('Отсутствует почта')
@@ -74,11 +184,17 @@ async def get_current_user_from_token_ws(
     except JWTError:
         logger.error(JWTError)
         return None
+    if payload.get("token_type") != "access":
+        logger.error(f'Неверный тип токена {payload.get("token_type")}')
+        return None
 
-    user = await _get_user_by_email_for_auth(email=email, session=session)
+    user = await _get_user_by_token_subject(email=email, session=session)
     if user is None:
         logger.error(f'Пользователь не найден {email}')
         return None
+    if not _is_token_version_valid(payload, user):
+        logger.error(f'Устаревшая версия токена пользователя {email}')
+        return None
 
     return user
 
@@ -89,7 +205,7 @@ async def verify_token(
         db: AsyncSession
         ):
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = decode_token(token)
         email: str = payload.get("sub")
         token_type: str | None = payload.get("token_type")
 
@@ -1,12 +1,18 @@
-from typing import List, Union
+import re
+from collections import Counter
+from typing import Iterator, List, Union
 from uuid import UUID
 from loguru import logger
+from starlette.concurrency import run_in_threadpool
 
 from api.v1.schemas.course_schema import ListCourse, ShowCourse, ListTeacherCourse, ShowTeacherCourse, ShowUserCourse
-from api.v1.schemas.course_schema import CourseCreate
+from api.v1.schemas.course_schema import CourseCreate, CourseMembership, CourseMembershipPair
+from api.v1.schemas.course_schema import RosterImportResponse, RosterImportRow, RosterRowStatus
+from core.config import ROSTER_IMPORT_BATCH_SIZE
 from services.course_service import CourseDAL
 from services.dialog_service import DialogDAL
 from db.models.course import Course
+from utils.roster import RosterRow, next_batch
 
 async def _get_course_by_id(id: int, session) -> Union[Course, None]:
     async with session.begin():
@@ -138,9 +144,6 @@ async def _update_course(updated_course_params: dict, id: int, session) -> Union
             dialog_params["name"] = updated_course_params["name"]
         if "image" in updated_course_params:
             dialog_params["image"] = updated_course_params["image"]
-        if "status" in updated_course_params:
-            status = updated_course_params["status"]
-            dialog_params["is_active"] = ("PUBLISHED" in status)
 
         updated_course_id = await course_dal.update_course(
             id=id, **updated_course_params,
@@ -151,6 +154,8 @@ async def _update_course(updated_course_params: dict, id: int, session) -> Union
         
         if dialog_params:
             await dialog_dal.update_by_course_id(course_id=id, **dialog_params)
+        if "status" in updated_course_params:
+            await dialog_dal.sync_active_with_course(course_id=id)
 
         return updated_course_id
 
@@ -183,3 +188,75 @@ async def _remove_students_from_course(course_id: int, student_ids: List[UUID],
         course_dal = CourseDAL(session)
         course = await course_dal.remove_students_from_course(course_id, student_ids)
         return course
+
+
+async def _get_course_memberships(pairs: List[CourseMembershipPair], session) -> List[CourseMembership]:
+    async with session.begin():
+        course_dal = CourseDAL(session)
+        memberships = await course_dal.get_course_memberships([(pair.user_id, pair.course_id) for pair in pairs])
+    # Ответ в порядке запроса
+    return [
+        CourseMembership(user_id=pair.user_id, course_id=pair.course_id,
+                         is_student=memberships[(pair.user_id, pair.course_id)][0],
+                         is_teacher=memberships[(pair.user_id, pair.course_id)][1])
+        for pair in pairs
+    ]
+
+
+_EMAIL_RE = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+
+
+async def _import_course_roster(course_id: int, rows: Iterator[RosterRow], session) -> Union[RosterImportResponse, None]:
+    logger.info(f"Импорт списка студентов курса {course_id}")
+    async with session.begin():
+        if not await CourseDAL(session).course_exists(course_id):
+            return None
+
+    results: List[RosterImportRow] = []
+    seen: set[str] = set()
+    while True:
+        # Разбор файла (в т.ч. XLSX) — синхронный, выполняется вне event loop
+        batch = await run_in_threadpool(next_batch, rows, ROSTER_IMPORT_BATCH_SIZE)
+        if not batch:
+            break
+
+        statuses: dict[int, RosterRowStatus] = {}
+        emails: List[str] = []
+        for line, email in batch:
+            email = email.lower()
+            if not _EMAIL_RE.match(email):
+                statuses[line] = RosterRowStatus.INVALID
+            elif email in seen:
+                statuses[line] = RosterRowStatus.DUPLICATE
+            else:
+                seen.add(email)
+                emails.append(email)
+
+        # Каждая пачка — отдельная короткая транзакция
+        async with session.begin():
+            enrolled = await CourseDAL(session).enroll_students_by_email(course_id, emails)
+
+        for line, email in batch:
+            email = email.lower()
+            status = statuses.get(line)
+            if status is None:
+                if email not in enrolled:
+                    status = RosterRowStatus.NOT_FOUND
+                elif enrolled[email]:
+                    status = RosterRowStatus.ENROLLED
+                else:
+                    status = RosterRowStatus.ALREADY_ENROLLED
+            results.append(RosterImportRow(row=line, email=email, status=status))
+
+    counts = Counter(result.status for result in results)
+    logger.info(f"Импорт списка курса {course_id}: {dict(counts)}")
+    return RosterImportResponse(
+        course_id=course_id,
+        total=len(results),
+        enrolled=counts[RosterRowStatus.ENROLLED],
+        already_enrolled=counts[RosterRowStatus.ALREADY_ENROLLED],
+        not_found=counts[RosterRowStatus.NOT_FOUND],
+        invalid=counts[RosterRowStatus.INVALID],
+        duplicate=counts[RosterRowStatus.DUPLICATE],
+        rows=results,
+    )
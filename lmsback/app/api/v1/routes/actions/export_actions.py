@@ -0,0 +1,108 @@
+from typing import Any, AsyncIterator, List, Sequence
+from uuid import UUID
+
+from loguru import logger
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import EXPORT_BATCH_SIZE
+from db.models.lesson import LessonType
+from services.analytics_service import AnalyticsDAL
+from services.course_service import CourseDAL
+from services.export_service import ExportDAL
+
+TEST_SUBMISSIONS_HEADER = ["Урок", "Slug", "Email", "Фамилия", "Имя", "Отправлено",
+                           "Проверено вопросов", "Всего вопросов", "Балл"]
+PRACTICA_SUBMISSIONS_HEADER = ["Урок", "Slug", "Email", "Фамилия", "Имя", "Отправлено", "Обновлено",
+                               "Проверено", "Балл", "Максимальный балл", "Отзыв", "Ответ"]
+GRADEBOOK_HEADER = ["Email", "Фамилия", "Имя"]
+
+# Значения клеток журнала в выгрузке
+COMPLETED_MARK = "+"
+UNGRADED_MARK = "на проверке"
+
+
+async def _get_export_course_id(course_slug: str, teacher_user_id: UUID, session: AsyncSession) -> int:
+    # Доступ проверяется до начала ответа: после первой строки статус уже не поменять
+    async with session.begin():
+        course_id = await CourseDAL(session).get_teacher_course_id(user_id=teacher_user_id, slug=course_slug)
+    if course_id is None:
+        raise ValueError(f"Курс с slug '{course_slug}' не найден или нет доступа")
+    return course_id
+
+
+async def _export_test_submissions(
+    course_slug: str,
+    teacher_user_id: UUID,
+    session: AsyncSession,
+) -> AsyncIterator[Sequence[Row]]:
+    logger.info(f"Выгрузка отправок тестов курса '{course_slug}'")
+    course_id = await _get_export_course_id(course_slug, teacher_user_id, session)
+    return ExportDAL(session).stream_test_submissions(course_id, EXPORT_BATCH_SIZE)
+
+
+async def _export_practica_submissions(
+    course_slug: str,
+    teacher_user_id: UUID,
+    session: AsyncSession,
+) -> AsyncIterator[Sequence[Row]]:
+    logger.info(f"Выгрузка отправок практик курса '{course_slug}'")
+    course_id = await _get_export_course_id(course_slug, teacher_user_id, session)
+    return ExportDAL(session).stream_practica_submissions(course_id, EXPORT_BATCH_SIZE)
+
+
+async def _gradebook_rows(
+    analytics_dal: AnalyticsDAL,
+    course_id: int,
+    students: List[Row],
+    lessons: List[Row],
+) -> AsyncIterator[List[List[Any]]]:
+    """
+    Строки журнала пачками по EXPORT_BATCH_SIZE студентов: одна пачка — один запрос клеток.
+    Номер студента в клетке — его позиция в students, номер урока — в lessons.
+    """
+    marks = [COMPLETED_MARK if row.lesson_type not in (LessonType.TEST.value, LessonType.PRACTICA.value) else None
+             for row in lessons]
+    try:
+        for start in range(0, len(students), EXPORT_BATCH_SIZE):
+            batch = students[start:start + EXPORT_BATCH_SIZE]
+            cells = await analytics_dal.get_gradebook_cells(course_id, [row.user_id for row in batch])
+            yield _gradebook_batch(cells, batch, start, len(lessons), marks)
+    finally:
+        await analytics_dal.db_session.rollback()
+
+
+def _gradebook_batch(cells: dict, batch: List[Row], start: int, lessons_count: int,
+                     marks: List[Any]) -> List[List[Any]]:
+    rows = [[row.email, row.last_name, row.first_name] + [""] * lessons_count for row in batch]
+    offset = len(GRADEBOOK_HEADER)
+    completed = cells["completed"]
+    for student, lesson in zip(completed["student"], completed["lesson"]):
+        if marks[lesson] is not None:
+            rows[student - start][offset + lesson] = marks[lesson]
+    tests = cells["tests"]
+    for student, lesson, score in zip(tests["student"], tests["lesson"], tests["score"]):
+        rows[student - start][offset + lesson] = score
+    practicas = cells["practicas"]
+    for student, lesson, score, graded in zip(practicas["student"], practicas["lesson"],
+                                              practicas["score"], practicas["graded"]):
+        rows[student - start][offset + lesson] = score if graded else UNGRADED_MARK
+    return rows
+
+
+async def _export_gradebook(
+    course_slug: str,
+    teacher_user_id: UUID,
+    session: AsyncSession,
+) -> tuple[List[str], AsyncIterator[List[List[Any]]]]:
+    logger.info(f"Выгрузка журнала курса '{course_slug}'")
+    course_id = await _get_export_course_id(course_slug, teacher_user_id, session)
+    analytics_dal = AnalyticsDAL(session)
+    # Один снимок базы на всю выгрузку: номера строк и колонок в клетках каждой пачки
+    # должны указывать в те же списки студентов и уроков. Транзакцию закрывает _gradebook_rows
+    await session.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+    students = await analytics_dal.get_gradebook_students(course_id)
+    lessons = await analytics_dal.get_gradebook_lessons(course_id)
+
+    header = GRADEBOOK_HEADER + [f"{row.name} ({row.slug})" for row in lessons]
+    return header, _gradebook_rows(analytics_dal, course_id, students, lessons)
@@ -0,0 +1,133 @@
+from collections import defaultdict
+from typing import List, Optional
+from uuid import UUID
+
+from loguru import logger
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.v1.schemas.practica_schema import (
+    BulkGradeStatus,
+    GradingQueueItem,
+    PracticaBulkGradeItem,
+    PracticaBulkGradeResponse,
+    PracticaBulkGradeResult,
+    UngradedCounterResponse,
+)
+from core.config import BULK_GRADE_MAX_ITEMS
+from services.grading_service import GradingDAL
+from utils.pagination import decode_cursor, split_page
+
+
+async def _get_grading_queue(
+    teacher_user_id: UUID,
+    limit: int,
+    cursor: Optional[str],
+    course_slug: Optional[str],
+    session: AsyncSession,
+) -> tuple[List[GradingQueueItem], Optional[str]]:
+    """Самые старые непроверенные практики по всем курсам преподавателя (или по одному курсу)."""
+    logger.info(f"Очередь проверки практик для {teacher_user_id}")
+    after = decode_cursor(cursor) if cursor else None
+    async with session.begin():
+        grading_dal = GradingDAL(session)
+        practicas = await grading_dal.get_teacher_practicas(teacher_user_id, course_slug)
+        if course_slug is not None and not practicas:
+            raise ValueError(f"Курс с slug '{course_slug}' не найден или в нём нет практик")
+        practica_by_id = {practica.id: practica for practica in practicas}
+        rows = await grading_dal.get_ungraded_page(list(practica_by_id), after, limit)
+
+    rows, next_cursor = split_page(rows, limit, lambda row: (row.submitted_at, row.id))
+    items = []
+    for row in rows:
+        practica = practica_by_id[row.practica_id]
+        items.append(GradingQueueItem(
+            id=row.id,
+            practica_id=row.practica_id,
+            lesson_slug=practica.slug,
+            lesson_name=practica.name,
+            course_id=practica.course_id,
+            course_slug=practica.course_slug,
+            user_id=row.user_id,
+            user_email=row.email,
+            user_first_name=row.first_name,
+            user_last_name=row.last_name,
+            submitted_at=row.submitted_at,
+        ))
+    return items, next_cursor
+
+
+async def _get_ungraded_counters(teacher_user_id: UUID, session: AsyncSession) -> List[UngradedCounterResponse]:
+    async with session.begin():
+        rows = await GradingDAL(session).get_teacher_ungraded_counters(teacher_user_id)
+    return [
+        UngradedCounterResponse(course_id=row.course_id, course_slug=row.slug, course_name=row.name,
+                                ungraded=row.ungraded)
+        for row in rows
+    ]
+
+
+async def _bulk_grade_submissions(
+    items: List[PracticaBulkGradeItem],
+    teacher_user_id: UUID,
+    session: AsyncSession,
+) -> PracticaBulkGradeResponse:
+    """
+    Оценки многих студентов по одной или нескольким практикам в одной транзакции:
+    поиск практик, блокировка отправок и один UPDATE ... FROM (VALUES ...) на все оценки.
+    Ненайденные отправки и повторы не прерывают запрос — они попадают в результаты.
+    """
+    if len(items) > BULK_GRADE_MAX_ITEMS:
+        raise ValueError(f"Некорректный запрос: не больше {BULK_GRADE_MAX_ITEMS} оценок за раз")
+    logger.info(f"Массовое оценивание практик: {len(items)} оценок от {teacher_user_id}")
+
+    results: list[Optional[PracticaBulkGradeResult]] = [None] * len(items)
+
+    def _result(index: int, status: BulkGradeStatus, submission_id: Optional[int] = None,
+                detail: Optional[str] = None) -> None:
+        results[index] = PracticaBulkGradeResult(
+            lesson_slug=items[index].lesson_slug,
+            student_user_id=items[index].student_user_id,
+            status=status,
+            submission_id=submission_id,
+            detail=detail,
+        )
+
+    async with session.begin():
+        grading_dal = GradingDAL(session)
+        practicas = await grading_dal.get_teacher_practicas(
+            teacher_user_id, slugs=sorted({item.lesson_slug for item in items}),
+        )
+        practica_by_slug = {practica.slug: practica for practica in practicas}
+
+        pending: dict[tuple[int, UUID], int] = {}
+        for index, item in enumerate(items):
+            practica = practica_by_slug.get(item.lesson_slug)
+            if practica is None:
+                _result(index, BulkGradeStatus.NOT_FOUND,
+                        detail=f"Практика с slug '{item.lesson_slug}' не найдена или нет доступа")
+            elif (practica.id, item.student_user_id) in pending:
+                _result(index, BulkGradeStatus.DUPLICATE, detail="Оценка этому студенту уже есть в запросе")
+            else:
+                pending[(practica.id, item.student_user_id)] = index
+
+        submissions = {
+            (row.practica_id, row.user_id): row
+            for row in await grading_dal.lock_practica_submissions(list(pending))
+        }
+        course_by_practica = {practica.id: practica.course_id for practica in practicas}
+        grades: list[tuple[int, int, Optional[str]]] = []
+        deltas: dict[int, int] = defaultdict(int)
+        for key, index in pending.items():
+            submission = submissions.get(key)
+            if submission is None:
+                _result(index, BulkGradeStatus.NOT_FOUND, detail="Решение студента не найдено")
+                continue
+            grades.append((submission.id, items[index].score, items[index].feedback))
+            if not submission.is_graded:
+                deltas[course_by_practica[submission.practica_id]] -= 1
+            _result(index, BulkGradeStatus.GRADED, submission_id=submission.id)
+
+        await grading_dal.set_practica_grades(grades)
+        await grading_dal.add_ungraded_by_course(deltas)
+
+    return PracticaBulkGradeResponse(graded=len(grades), results=results)
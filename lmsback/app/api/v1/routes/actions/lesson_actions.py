@@ -2,7 +2,7 @@ from typing import Union, Optional, List, Any
 from loguru import logger
 from uuid import UUID
 from sqlalchemy.ext.asyncio import AsyncSession
-from services.lesson_service import LessonDAL
+from services.lesson_service import LessonDAL, SubmissionFilters
 from services.course_service import CourseDAL
 from db.models.lesson import LessonType, LessonMaterial
 from api.v1.schemas.lesson_schema import (
@@ -18,9 +18,17 @@ from api.v1.schemas.lesson_schema import (
     TestStudentSingleAnswer,
     TestStudentMultipleAnswer,
     TestStudentTextAnswer,
+    TestDraftAnswer,
+    TestDraftSaveResponse,
+    TestDraftAnswerResponse,
+    TestDraftResponse,
+    SubmissionListQuery,
+    SubmissionCountResponse,
 )
-from db.models.user import User
-from sqlalchemy import select
+from datetime import datetime
+from utils.cache import answer_key_cache
+from utils.grading import AnswerKey, compile_answer_key, grade_answers
+from utils.pagination import decode_cursor, split_page
 
 LESSON_TYPE_FIELDS = {
     LessonType.LECTURE: ["content", "images"],
@@ -64,37 +72,53 @@ def _jsonable(value: Any) -> Any:
     return value
 
 
+# Структурированный ответ -> (тип вопроса, поле с ответом)
+_ANSWER_MODEL_FIELDS = {
+    TestStudentSingleAnswer: ("single", "selected_option"),
+    TestStudentMultipleAnswer: ("multiple", "selected_options"),
+    TestStudentTextAnswer: ("text", "text"),
+}
+
+# Тип вопроса -> (ключ ответа в dict, значение по умолчанию)
+_ANSWER_DICT_KEYS = {
+    "single": ("selected_option", None),
+    "multiple": ("selected_options", []),
+    "text": ("text", None),
+}
+
+
 def _normalize_student_answer(raw_answer: Any, q_type: str) -> Any:
     """
     Приводит ответ студента к единому виду для проверки.
     Поддерживает и новый структурированный формат, и legacy-формат.
     """
-    if isinstance(raw_answer, TestStudentSingleAnswer):
-        return raw_answer.selected_option if q_type == "single" else None
-    if isinstance(raw_answer, TestStudentMultipleAnswer):
-        return raw_answer.selected_options if q_type == "multiple" else None
-    if isinstance(raw_answer, TestStudentTextAnswer):
-        return raw_answer.text if q_type == "text" else None
+    model_field = _ANSWER_MODEL_FIELDS.get(type(raw_answer))
+    if model_field is not None:
+        answer_type, field = model_field
+        return getattr(raw_answer, field) if q_type == answer_type else None
 
     if isinstance(raw_answer, dict):
-        answer_type = raw_answer.get("answer_type")
-        if q_type == "single":
-            if answer_type == "single":
-                return raw_answer.get("selected_option")
-            return raw_answer.get("selected_option", raw_answer.get("answer"))
-        if q_type == "multiple":
-            if answer_type == "multiple":
-                return raw_answer.get("selected_options", [])
-            return raw_answer.get("selected_options", raw_answer.get("answer", []))
-        if q_type == "text":
-            if answer_type == "text":
-                return raw_answer.get("text")
-            return raw_answer.get("text", raw_answer.get("answer"))
-        return None
+        dict_key = _ANSWER_DICT_KEYS.get(q_type)
+        if dict_key is None:
+            return None
+        key, default = dict_key
+        if raw_answer.get("answer_type") == q_type:
+            return raw_answer.get(key, default)
+        # legacy: {"answer": ...}
+        return raw_answer.get(key, raw_answer.get("answer", default))
 
     return raw_answer
 
 
+def _answer_columns(user_answer: Any) -> dict[str, Any]:
+    """Раскладывает нормализованный ответ по колонкам TestSubmissionAnswer."""
+    return {
+        "selected_option": user_answer if isinstance(user_answer, int) else None,
+        "selected_options": user_answer if isinstance(user_answer, list) else None,
+        "text_answer": user_answer if isinstance(user_answer, str) else None,
+    }
+
+
 def _split_test_questions_and_correct_answers(questions: list[Any]) -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
     public_questions: list[dict[str, Any]] = []
     correct_answers: list[dict[str, Any]] = []
@@ -266,6 +290,20 @@ async def _get_lesson_by_slug_for_student(
         return response_class.model_validate(lesson)
 
 
+async def _get_answer_key(lesson_dal: LessonDAL, lesson) -> AnswerKey:
+    """
+    Ключ ответов теста из кэша процесса. updated_at в ключе кэша делает запись
+    недействительной и в других процессах после изменения вопросов.
+    """
+    cache_key = (lesson.id, lesson.updated_at)
+    answer_key = answer_key_cache.get(cache_key)
+    if answer_key is None:
+        correct_answers_map = await lesson_dal.get_test_correct_answers_map(test_lesson_id=lesson.id)
+        answer_key = compile_answer_key(lesson.id, lesson.updated_at, lesson.questions or [], correct_answers_map)
+        answer_key_cache.set(cache_key, answer_key)
+    return answer_key
+
+
 async def _check_test_answers(
     lesson_slug: str,
     user_id: UUID,
@@ -290,84 +328,46 @@ async def _check_test_answers(
         if not isinstance(questions, list):
             raise ValueError("Некорректный формат questions")
 
-        correct_answers_map = await lesson_dal.get_test_correct_answers_map(test_lesson_id=lesson.id)
+        answer_key = await _get_answer_key(lesson_dal, lesson)
+        user_answers = [
+            _normalize_student_answer(answers[idx] if idx < len(answers) else None, q_type)
+            if q_type is not None else None
+            for idx, q_type in enumerate(answer_key.question_types)
+        ]
+        graded = grade_answers(answer_key, user_answers)
 
-        results: list[TestQuestionCheckResult] = []
-        checked = 0
-        total_score = 0.0
-        answers_for_db: list[dict[str, Any]] = []
-
-        for idx, q in enumerate(questions):
-            if not isinstance(q, dict):
-                results.append(TestQuestionCheckResult(is_correct=None, score=0.0))
-                continue
-
-            q_type = q.get("question_type") or "single"
-            raw_user_answer = answers[idx] if idx < len(answers) else None
-            user_answer = _normalize_student_answer(raw_user_answer, q_type)
-            score = 0.0
-            is_correct: Optional[bool] = None
-            correct_row = correct_answers_map.get(idx)
-
-            if q_type == "single":
-                correct = correct_row.correct_option if correct_row is not None else None
-                if correct is not None and isinstance(user_answer, int):
-                    is_correct = (user_answer == correct)
-                    checked += 1
-                    score = 1.0 if is_correct else 0.0
-            elif q_type == "multiple":
-                correct = correct_row.correct_options if correct_row is not None else None
-                if isinstance(correct, list) and all(isinstance(i, int) for i in correct) and isinstance(user_answer, list):
-                    user_set = {int(i) for i in user_answer if isinstance(i, int)}
-                    correct_set = set(correct)
-                    is_correct = (user_set == correct_set)
-                    checked += 1
-                    score = 1.0 if is_correct else 0.0
-            elif q_type == "text":
-                correct_text = correct_row.correct_text if correct_row is not None else None
-                if isinstance(correct_text, str) and isinstance(user_answer, str):
-                    # простая нормализация
-                    ua = user_answer.strip().lower()
-                    ca = correct_text.strip().lower()
-                    if ca:
-                        is_correct = (ua == ca)
-                        checked += 1
-                        score = 1.0 if is_correct else 0.0
-
-            total_score += score
-            results.append(TestQuestionCheckResult(is_correct=is_correct, score=score))
-            answers_for_db.append(
-                {
-                    "question_index": idx,
-                    "question_type": q_type,
-                    "selected_option": user_answer if isinstance(user_answer, int) else None,
-                    "selected_options": user_answer if isinstance(user_answer, list) else None,
-                    "text_answer": user_answer if isinstance(user_answer, str) else None,
-                    "is_correct": is_correct,
-                    "score": score,
-                }
+        results = [
+            TestQuestionCheckResult(is_correct=is_correct, score=score)
+            for is_correct, score in graded.results
+        ]
+        answers_for_db = [
+            {
+                "question_index": idx,
+                "question_type": q_type,
+                **_answer_columns(user_answer),
+                "is_correct": is_correct,
+                "score": score,
+            }
+            for idx, (q_type, user_answer, (is_correct, score)) in enumerate(
+                zip(answer_key.question_types, user_answers, graded.results)
             )
+            if q_type is not None
+        ]
 
-        # Удаляем черновик, если есть
-        draft = await lesson_dal.get_test_draft(test_lesson_id=lesson.id, user_id=user_id)
-        if draft:
-            # Удаляем черновик (ответы удалятся каскадом)
-            await session.delete(draft)
-            await session.flush()
-
+        # Черновик, если есть, становится отправкой без удаления и копирования ответов
         await lesson_dal.create_test_submission(
             test_lesson_id=lesson.id,
             user_id=user_id,
             total_questions=len(questions),
-            checked_questions=checked,
-            total_score=total_score,
+            checked_questions=graded.checked,
+            total_score=graded.total_score,
             answers=answers_for_db,
         )
 
         return TestCheckResponse(
             total_questions=len(questions),
-            checked_questions=checked,
-            total_score=total_score,
+            checked_questions=graded.checked,
+            total_score=graded.total_score,
             results=results,
         )
 
@@ -411,122 +411,235 @@ async def _get_test_result(
         )
 
 
+async def _get_test_lesson_for_student(lesson_dal: LessonDAL, lesson_slug: str, user_id: UUID):
+    lesson = await lesson_dal.get_lesson_by_slug_for_student(lesson_slug, user_id)
+    if lesson is None:
+        raise ValueError(f"Урок с slug '{lesson_slug}' не найден или нет доступа к курсу")
+    if LessonType(lesson.lesson_type) != LessonType.TEST:
+        raise ValueError("Указанный урок не является тестом")
+    return lesson
+
+
+async def _save_test_draft(
+    lesson_slug: str,
+    user_id: UUID,
+    version: int,
+    answers: list[TestDraftAnswer],
+    session: AsyncSession,
+) -> TestDraftSaveResponse:
+    async with session.begin():
+        lesson_dal = LessonDAL(session)
+        lesson = await _get_test_lesson_for_student(lesson_dal, lesson_slug, user_id)
+
+        existing_submission = await lesson_dal.get_test_submission(test_lesson_id=lesson.id, user_id=user_id)
+        if existing_submission is not None:
+            raise ValueError("Тест уже отправлен. Черновик больше не сохраняется")
+
+        questions = lesson.questions or []
+        if not isinstance(questions, list):
+            raise ValueError("Некорректный формат questions")
+
+        # Один вопрос — одна строка: ON CONFLICT не может обновить строку дважды за запрос
+        rows: dict[int, dict[str, Any]] = {}
+        for item in answers:
+            idx = item.question_index
+            if idx >= len(questions) or not isinstance(questions[idx], dict):
+                raise ValueError(f"Некорректный номер вопроса: {idx}")
+            q_type = questions[idx].get("question_type") or "single"
+            rows[idx] = {
+                "question_index": idx,
+                "question_type": q_type,
+                **_answer_columns(_normalize_student_answer(item.answer, q_type)),
+            }
+
+        new_version = await lesson_dal.save_test_draft(
+            test_lesson_id=lesson.id,
+            user_id=user_id,
+            total_questions=len(questions),
+            answers=list(rows.values()),
+            version=version,
+        )
+        if new_version is None:
+            raise ValueError("Черновик устарел: он уже сохранён с более новой версией")
+
+        return TestDraftSaveResponse(version=new_version)
+
+
+async def _get_test_draft(
+    lesson_slug: str,
+    user_id: UUID,
+    session: AsyncSession,
+) -> TestDraftResponse:
+    async with session.begin():
+        lesson_dal = LessonDAL(session)
+        lesson = await _get_test_lesson_for_student(lesson_dal, lesson_slug, user_id)
+
+        draft = await lesson_dal.get_test_draft(test_lesson_id=lesson.id, user_id=user_id)
+        if draft is None:
+            raise ValueError("Черновик не найден")
+
+        return TestDraftResponse(
+            version=draft.draft_version,
+            answers=[
+                TestDraftAnswerResponse.model_validate(item)
+                for item in sorted(draft.answers or [], key=lambda x: x.question_index)
+            ],
+        )
+
+
+def _submission_filters(query: SubmissionListQuery) -> SubmissionFilters:
+    return SubmissionFilters(
+        student_id=query.student_id,
+        graded=query.graded,
+        submitted_from=query.submitted_from,
+        submitted_to=query.submitted_to,
+    )
+
+
+def _submission_cursor(row) -> tuple[datetime, int]:
+    # Первый элемент строки страницы — сама отправка
+    return row[0].submitted_at, row[0].id
+
+
+async def _get_teacher_course_lessons(
+    session: AsyncSession,
+    course_slug: str,
+    teacher_user_id: UUID,
+    lesson_type: LessonType,
+    lesson_slug: Optional[str] = None,
+) -> list:
+    """Уроки курса преподавателя одного типа; при lesson_slug — только этот урок."""
+    course_id = await CourseDAL(session).get_teacher_course_id(user_id=teacher_user_id, slug=course_slug)
+    if course_id is None:
+        raise ValueError(f"Курс с slug '{course_slug}' не найден или нет доступа")
+    lessons = await LessonDAL(session).get_course_lessons_of_type(course_id, lesson_type)
+    if lesson_slug is not None:
+        lessons = [lesson for lesson in lessons if lesson.slug == lesson_slug]
+        if not lessons:
+            raise ValueError(f"Урок с slug '{lesson_slug}' не найден в курсе")
+    return lessons
+
+
+async def _get_test_lesson_for_teacher_list(lesson_dal: LessonDAL, lesson_slug: str):
+    lesson = await lesson_dal.get_lesson_by_slug(lesson_slug)
+    if lesson is None:
+        raise ValueError(f"Урок с slug '{lesson_slug}' не найден")
+    if LessonType(lesson.lesson_type) != LessonType.TEST:
+        raise ValueError("Указанный урок не является тестом")
+    return lesson
+
+
+def _test_submission_teacher_response(
+    row,
+    questions_map: Optional[dict[int, dict]] = None,
+    lesson=None,
+    with_answers: bool = True,
+) -> TestSubmissionTeacherResponse:
+    s, email, first_name, last_name = row
+    answers = None
+    if with_answers:
+        answers = [
+            TestSubmissionAnswerTeacherResponse(
+                question_index=a.question_index,
+                question_type=a.question_type,
+                selected_option=a.selected_option,
+                selected_options=a.selected_options,
+                text_answer=a.text_answer,
+                is_correct=a.is_correct,
+                score=float(a.score or 0.0),
+                prompt=questions_map.get(a.question_index, {}).get("prompt") if questions_map is not None else None,
+                options=questions_map.get(a.question_index, {}).get("options") if questions_map is not None else None,
+            )
+            for a in sorted(s.answers or [], key=lambda x: x.question_index)
+        ]
+    return TestSubmissionTeacherResponse(
+        user_id=str(s.user_id),
+        user_email=email,
+        user_first_name=first_name,
+        user_last_name=last_name,
+        lesson_slug=getattr(lesson, "slug", None),
+        lesson_name=getattr(lesson, "name", None),
+        total_questions=s.total_questions,
+        checked_questions=s.checked_questions,
+        total_score=float(s.total_score or 0.0),
+        submitted_at=s.submitted_at,
+        answers=answers,
+    )
+
+
 async def _get_test_submissions_for_teacher(
     lesson_slug: str,
+    query: SubmissionListQuery,
     session: AsyncSession,
-) -> list[TestSubmissionTeacherResponse]:
+) -> tuple[list[TestSubmissionTeacherResponse], Optional[str]]:
+    """Страница отправок теста и курсор следующей страницы."""
     logger.info(f"Получение отправок теста '{lesson_slug}' для преподавателя")
+    after = decode_cursor(query.cursor) if query.cursor else None
     async with session.begin():
         lesson_dal = LessonDAL(session)
-        lesson = await lesson_dal.get_lesson_by_slug(lesson_slug)
-        if lesson is None:
-            raise ValueError(f"Урок с slug '{lesson_slug}' не найден")
-        if LessonType(lesson.lesson_type) != LessonType.TEST:
-            raise ValueError("Указанный урок не является тестом")
-        submissions = await lesson_dal.get_test_submissions_with_answers(test_lesson_id=lesson.id)
-        if not submissions:
-            return []
-
-        questions_map = {i: q for i, q in enumerate(lesson.questions or {})}
-
-        user_ids = [s.user_id for s in submissions]
-        r = await session.execute(select(User.user_id, User.email, User.first_name, User.last_name).where(User.user_id.in_(user_ids)))
-        user_data: dict[UUID, dict] = {row[0]: {"email": row[1], "first_name": row[2], "last_name": row[3]} for row in r.all()}
-        result: list[TestSubmissionTeacherResponse] = []
-        for s in submissions:
-            answers_sorted = sorted(s.answers or [], key=lambda x: x.question_index)
-            answers = [
-                TestSubmissionAnswerTeacherResponse(
-                    question_index=a.question_index,
-                    question_type=a.question_type,
-                    selected_option=a.selected_option,
-                    selected_options=a.selected_options,
-                    text_answer=a.text_answer,
-                    is_correct=a.is_correct,
-                    score=float(a.score or 0.0),
-                    prompt=questions_map.get(a.question_index, {}).get("prompt"),    # [+]
-                    options=questions_map.get(a.question_index, {}).get("options"),  # [+]
-                )
-                for a in answers_sorted
-            ]
-            user_info = user_data.get(s.user_id, {})
-            result.append(
-                TestSubmissionTeacherResponse(
-                    user_id=str(s.user_id),
-                    user_email=user_info.get("email"),
-                    user_first_name=user_info.get("first_name"),
-                    user_last_name=user_info.get("last_name"),
-                    total_questions=s.total_questions,
-                    checked_questions=s.checked_questions,
-                    total_score=float(s.total_score or 0.0),
-                    submitted_at=s.submitted_at,
-                    answers=answers,
-                )
-            )
-        return result
+        lesson = await _get_test_lesson_for_teacher_list(lesson_dal, lesson_slug)
+        rows = await lesson_dal.get_test_submission_page(
+            [lesson.id], _submission_filters(query), after, query.limit, with_answers=not query.summary,
+        )
+
+    rows, next_cursor = split_page(rows, query.limit, _submission_cursor)
+    questions_map = {i: q for i, q in enumerate(lesson.questions or {})}
+    items = [_test_submission_teacher_response(row, questions_map, with_answers=not query.summary) for row in rows]
+    return items, next_cursor
+
+
+async def _count_test_submissions_for_teacher(
+    lesson_slug: str,
+    query: SubmissionListQuery,
+    session: AsyncSession,
+) -> SubmissionCountResponse:
+    async with session.begin():
+        lesson_dal = LessonDAL(session)
+        lesson = await _get_test_lesson_for_teacher_list(lesson_dal, lesson_slug)
+        total = await lesson_dal.count_test_submissions([lesson.id], _submission_filters(query))
+    return SubmissionCountResponse(total=total)
+
 
 async def _get_test_submissions_for_teacher_by_course(
     course_slug: str,
     teacher_user_id: UUID,
+    query: SubmissionListQuery,
     session: AsyncSession,
-) -> list[TestSubmissionTeacherResponse]:
+) -> tuple[list[TestSubmissionTeacherResponse], Optional[str]]:
     logger.info(f"Получение отправок тестов курса '{course_slug}' для преподавателя")
+    after = decode_cursor(query.cursor) if query.cursor else None
     async with session.begin():
-        course_dal = CourseDAL(session)
-        lesson_dal = LessonDAL(session)
+        test_lessons = await _get_teacher_course_lessons(
+            session, course_slug, teacher_user_id, LessonType.TEST, query.lesson_slug,
+        )
+        lesson_by_id = {lesson.id: lesson for lesson in test_lessons}
+        rows = await LessonDAL(session).get_test_submission_page(
+            list(lesson_by_id), _submission_filters(query), after, query.limit, with_answers=not query.summary,
+        )
 
-        course = await course_dal.get_teacher_course_by_slug(user_id=teacher_user_id, slug=course_slug)
-        if course is None:
-            raise ValueError(f"Курс с slug '{course_slug}' не найден или нет доступа")
+    rows, next_cursor = split_page(rows, query.limit, _submission_cursor)
+    items = [
+        _test_submission_teacher_response(row, lesson=lesson_by_id.get(row[0].test_lesson_id),
+                                          with_answers=not query.summary)
+        for row in rows
+    ]
+    return items, next_cursor
 
-        test_lessons = []
-        for module in (course.modules or []):
-            for lesson in (module.lessons or []):
-                if getattr(lesson, "lesson_type", None) == LessonType.TEST.value:
-                    test_lessons.append(lesson)
 
-        test_ids = [lesson.id for lesson in test_lessons]
-        lesson_by_id = {lesson.id: lesson for lesson in test_lessons}
-        submissions = await lesson_dal.get_test_submissions_with_answers_by_ids(test_ids)
-        if not submissions:
-            return []
-
-        user_ids = [s.user_id for s in submissions]
-        r = await session.execute(select(User.user_id, User.email, User.first_name, User.last_name).where(User.user_id.in_(user_ids)))
-        user_data: dict[UUID, dict] = {row[0]: {"email": row[1], "first_name": row[2], "last_name": row[3]} for row in r.all()}
-
-        result: list[TestSubmissionTeacherResponse] = []
-        for s in submissions:
-            answers_sorted = sorted(s.answers or [], key=lambda x: x.question_index)
-            answers = [
-                TestSubmissionAnswerTeacherResponse(
-                    question_index=a.question_index,
-                    question_type=a.question_type,
-                    selected_option=a.selected_option,
-                    selected_options=a.selected_options,
-                    text_answer=a.text_answer,
-                    is_correct=a.is_correct,
-                    score=float(a.score or 0.0),
-                )
-                for a in answers_sorted
-            ]
-            user_info = user_data.get(s.user_id, {})
-            result.append(
-                TestSubmissionTeacherResponse(
-                    user_id=str(s.user_id),
-                    user_email=user_info.get("email"),
-                    user_first_name=user_info.get("first_name"),
-                    user_last_name=user_info.get("last_name"),
-                    lesson_slug=getattr(lesson_by_id.get(s.test_lesson_id), "slug", None),
-                    lesson_name=getattr(lesson_by_id.get(s.test_lesson_id), "name", None),
-                    total_questions=s.total_questions,
-                    checked_questions=s.checked_questions,
-                    total_score=float(s.total_score or 0.0),
-                    submitted_at=s.submitted_at,
-                    answers=answers,
-                )
-            )
-        return result
+async def _count_test_submissions_for_teacher_by_course(
+    course_slug: str,
+    teacher_user_id: UUID,
+    query: SubmissionListQuery,
+    session: AsyncSession,
+) -> SubmissionCountResponse:
+    async with session.begin():
+        test_lessons = await _get_teacher_course_lessons(
+            session, course_slug, teacher_user_id, LessonType.TEST, query.lesson_slug,
+        )
+        total = await LessonDAL(session).count_test_submissions(
+            [lesson.id for lesson in test_lessons], _submission_filters(query),
+        )
+    return SubmissionCountResponse(total=total)
 
 
 async def _delete_lesson(lesson_id: int, session: AsyncSession) -> int:
@@ -734,6 +847,8 @@ async def _update_lesson(
                 raw_questions = _jsonable(updated_params["questions"])
                 public_questions, correct_answers = _split_test_questions_and_correct_answers(raw_questions)
                 lesson.questions = public_questions
+                # Меняется только test_lessons, а updated_at — версия ключа ответов в кэше
+                lesson.updated_at = datetime.utcnow()
                 normalized_questions = [
                     {
                         "question_type": item["question_type"],
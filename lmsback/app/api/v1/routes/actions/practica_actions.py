@@ -3,13 +3,17 @@ from uuid import UUID
 
 from loguru import logger
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
 
 from db.models.lesson import LessonType
 from services.lesson_service import LessonDAL
-from services.course_service import CourseDAL
+from api.v1.schemas.lesson_schema import SubmissionCountResponse, SubmissionListQuery
 from api.v1.schemas.practica_schema import PracticaSubmissionResponse
-from db.models.user import User
+from api.v1.routes.actions.lesson_actions import (
+    _get_teacher_course_lessons,
+    _submission_cursor,
+    _submission_filters,
+)
+from utils.pagination import decode_cursor, split_page
 
 
 def _validate_practica_lesson_type(lesson_type: str) -> None:
@@ -101,76 +105,97 @@ async def _grade_submission(
         return PracticaSubmissionResponse.model_validate(submission)
 
 
+def _practica_submission_response(row, lesson=None, summary: bool = False) -> PracticaSubmissionResponse:
+    s, email, first_name, last_name = row
+    item = PracticaSubmissionResponse.model_validate(s)
+    item.user_email = email
+    item.user_first_name = first_name
+    item.user_last_name = last_name
+    item.lesson_slug = getattr(lesson, "slug", None)
+    item.lesson_name = getattr(lesson, "name", None)
+    if summary:
+        # Краткий список: без текста ответа, файлов и отзыва
+        item.text_answer = None
+        item.files = None
+        item.feedback = None
+    return item
+
+
+async def _get_practica_lesson_for_teacher_list(lesson_dal: LessonDAL, lesson_slug: str):
+    lesson = await lesson_dal.get_lesson_by_slug(lesson_slug)
+    if lesson is None:
+        raise ValueError(f"Практика с slug '{lesson_slug}' не найдена")
+    _validate_practica_lesson_type(lesson.lesson_type)
+    return lesson
+
+
 async def _get_submissions_for_practica(
     lesson_slug: str,
+    query: SubmissionListQuery,
     session: AsyncSession,
-) -> List[PracticaSubmissionResponse]:
+) -> tuple[List[PracticaSubmissionResponse], Optional[str]]:
+    """Страница отправок практики и курсор следующей страницы."""
     logger.info(f"Получение отправок по практике '{lesson_slug}'")
+    after = decode_cursor(query.cursor) if query.cursor else None
     async with session.begin():
         lesson_dal = LessonDAL(session)
+        lesson = await _get_practica_lesson_for_teacher_list(lesson_dal, lesson_slug)
+        rows = await lesson_dal.get_practica_submission_page(
+            [lesson.id], _submission_filters(query), after, query.limit,
+        )
 
-        lesson = await lesson_dal.get_lesson_by_slug(lesson_slug)
-        if lesson is None:
-            raise ValueError(f"Практика с slug '{lesson_slug}' не найдена")
-
-        _validate_practica_lesson_type(lesson.lesson_type)
-
-        submissions = await lesson_dal.get_practica_submissions(practica_id=lesson.id)
+    rows, next_cursor = split_page(rows, query.limit, _submission_cursor)
+    return [_practica_submission_response(row, summary=query.summary) for row in rows], next_cursor
 
-        user_ids = [s.user_id for s in submissions]
-        emails_by_id: dict[UUID, str] = {}
-        if user_ids:
-            r = await session.execute(select(User.user_id, User.email).where(User.user_id.in_(user_ids)))
-            emails_by_id = {row[0]: row[1] for row in r.all()}
 
-        resp: list[PracticaSubmissionResponse] = []
-        for s in submissions:
-            item = PracticaSubmissionResponse.model_validate(s)
-            item.user_email = emails_by_id.get(s.user_id)
-            resp.append(item)
-        return resp
+async def _count_submissions_for_practica(
+    lesson_slug: str,
+    query: SubmissionListQuery,
+    session: AsyncSession,
+) -> SubmissionCountResponse:
+    async with session.begin():
+        lesson_dal = LessonDAL(session)
+        lesson = await _get_practica_lesson_for_teacher_list(lesson_dal, lesson_slug)
+        total = await lesson_dal.count_practica_submissions([lesson.id], _submission_filters(query))
+    return SubmissionCountResponse(total=total)
 
 
 async def _get_submissions_for_course_practicas(
     course_slug: str,
     teacher_user_id: UUID,
+    query: SubmissionListQuery,
     session: AsyncSession,
-) -> List[PracticaSubmissionResponse]:
+) -> tuple[List[PracticaSubmissionResponse], Optional[str]]:
     logger.info(f"Получение отправок по всем практикам курса '{course_slug}'")
+    after = decode_cursor(query.cursor) if query.cursor else None
     async with session.begin():
-        course_dal = CourseDAL(session)
-        lesson_dal = LessonDAL(session)
-
-        course = await course_dal.get_teacher_course_by_slug(user_id=teacher_user_id, slug=course_slug)
-        if course is None:
-            raise ValueError(f"Курс с slug '{course_slug}' не найден или нет доступа")
-
-        practica_lessons = []
-        for module in (course.modules or []):
-            for lesson in (module.lessons or []):
-                if getattr(lesson, "lesson_type", None) == LessonType.PRACTICA.value:
-                    practica_lessons.append(lesson)
-
-        practica_ids = [lesson.id for lesson in practica_lessons]
-        submissions = await lesson_dal.get_practica_submissions_by_ids(practica_ids)
+        practica_lessons = await _get_teacher_course_lessons(
+            session, course_slug, teacher_user_id, LessonType.PRACTICA, query.lesson_slug,
+        )
+        lesson_by_id = {lesson.id: lesson for lesson in practica_lessons}
+        rows = await LessonDAL(session).get_practica_submission_page(
+            list(lesson_by_id), _submission_filters(query), after, query.limit,
+        )
 
-        user_ids = [s.user_id for s in submissions]
-        user_data: dict[UUID, dict] = {}
-        if user_ids:
-            r = await session.execute(select(User.user_id, User.email, User.first_name, User.last_name).where(User.user_id.in_(user_ids)))
-            user_data = {row[0]: {"email": row[1], "first_name": row[2], "last_name": row[3]} for row in r.all()}
+    rows, next_cursor = split_page(rows, query.limit, _submission_cursor)
+    items = [
+        _practica_submission_response(row, lesson=lesson_by_id.get(row[0].practica_id), summary=query.summary)
+        for row in rows
+    ]
+    return items, next_cursor
 
-        lesson_by_id = {lesson.id: lesson for lesson in practica_lessons}
-        resp: list[PracticaSubmissionResponse] = []
-        for s in submissions:
-            lesson = lesson_by_id.get(s.practica_id)
-            user_info = user_data.get(s.user_id, {})
-            item = PracticaSubmissionResponse.model_validate(s)
-            item.user_email = user_info.get("email")
-            item.user_first_name = user_info.get("first_name")
-            item.user_last_name = user_info.get("last_name")
-            item.lesson_slug = getattr(lesson, "slug", None)
-            item.lesson_name = getattr(lesson, "name", None)
-            resp.append(item)
-        return resp
 
+async def _count_submissions_for_course_practicas(
+    course_slug: str,
+    teacher_user_id: UUID,
+    query: SubmissionListQuery,
+    session: AsyncSession,
+) -> SubmissionCountResponse:
+    async with session.begin():
+        practica_lessons = await _get_teacher_course_lessons(
+            session, course_slug, teacher_user_id, LessonType.PRACTICA, query.lesson_slug,
+        )
+        total = await LessonDAL(session).count_practica_submissions(
+            [lesson.id for lesson in practica_lessons], _submission_filters(query),
+        )
+    return SubmissionCountResponse(total=total)
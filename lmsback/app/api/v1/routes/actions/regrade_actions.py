@@ -0,0 +1,204 @@
+import asyncio
+from datetime import datetime, timedelta
+from typing import Optional
+from uuid import UUID
+
+from loguru import logger
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.v1.schemas.lesson_schema import RegradeJobResponse
+from core.config import REGRADE_BATCH_SIZE, REGRADE_STALE_SECONDS
+from db.models.lesson import LessonType, RegradeStatus, TestRegradeJob
+from db.session import async_session
+from services.course_service import CourseDAL
+from services.lesson_service import LessonDAL
+from services.regrade_service import RegradeDAL
+from utils.background import background_jobs
+from utils.cache import invalidate_test_analytics
+from utils.grading import compile_answer_key, grade_stored_answer
+
+STALE_JOB_ERROR = "Прерван: обработчик перестал отвечать"
+
+
+def _regrade_job_response(job: TestRegradeJob) -> RegradeJobResponse:
+    done = job.status == RegradeStatus.DONE.value
+    return RegradeJobResponse(
+        id=job.id,
+        course_id=job.course_id,
+        test_lesson_id=job.test_lesson_id,
+        status=job.status,
+        total=job.total,
+        processed=job.processed,
+        changed=job.changed,
+        progress=1.0 if done or not job.total else round(min(job.processed / job.total, 1.0), 4),
+        error=job.error,
+        created_at=job.created_at,
+        finished_at=job.finished_at,
+    )
+
+
+async def _enqueue_regrade(
+    regrade_dal: RegradeDAL,
+    course_id: int,
+    test_lesson_id: Optional[int],
+    test_lesson_ids: list[int],
+    user_id: UUID,
+) -> tuple[TestRegradeJob, bool]:
+    """
+    Создаёт задачу пересчёта или возвращает уже идущую для той же области.
+    Задача, от которой дольше REGRADE_STALE_SECONDS нет отметок (воркер упал или убит),
+    закрывается как упавшая, и вместо неё создаётся новая.
+    """
+    job = await regrade_dal.get_active_job(course_id, test_lesson_id)
+    if job is not None:
+        stale_before = datetime.utcnow() - timedelta(seconds=REGRADE_STALE_SECONDS)
+        if await regrade_dal.fail_stale_job(job.id, stale_before, error=STALE_JOB_ERROR):
+            logger.warning(f"Пересчёт {job.id} завис и помечен упавшим")
+        # Пока ждали блокировку строки, зависшую задачу мог заменить параллельный запрос
+        job = await regrade_dal.get_active_job(course_id, test_lesson_id)
+        if job is not None:
+            return job, False
+    total = await regrade_dal.count_submissions(test_lesson_ids)
+    created = await regrade_dal.create_job(course_id, test_lesson_id, user_id, total)
+    if created is None:
+        # Параллельный запрос успел создать задачу первым
+        return await regrade_dal.get_active_job(course_id, test_lesson_id), False
+    return created, True
+
+
+def _spawn_regrade(job_id: int) -> None:
+    background_jobs.spawn(_run_regrade_job(job_id), name=f"regrade-{job_id}")
+
+
+async def _start_test_regrade(
+    lesson_slug: str,
+    teacher_user_id: UUID,
+    session: AsyncSession,
+) -> RegradeJobResponse:
+    logger.info(f"Пересчёт оценок теста '{lesson_slug}' запрошен {teacher_user_id}")
+    async with session.begin():
+        lesson_dal = LessonDAL(session)
+        regrade_dal = RegradeDAL(session)
+        lesson = await lesson_dal.get_lesson_by_slug_for_teacher(lesson_slug, teacher_user_id)
+        if lesson is None:
+            raise ValueError(f"Урок с slug '{lesson_slug}' не найден или нет доступа")
+        if LessonType(lesson.lesson_type) != LessonType.TEST:
+            raise ValueError("Указанный урок не является тестом")
+
+        course_id = await regrade_dal.get_lesson_course_id(lesson.id)
+        job, created = await _enqueue_regrade(regrade_dal, course_id, lesson.id, [lesson.id], teacher_user_id)
+
+    # Задача стартует после коммита: фоновая сессия должна видеть запись о задаче
+    if created:
+        _spawn_regrade(job.id)
+    return _regrade_job_response(job)
+
+
+async def _start_course_regrade(
+    course_slug: str,
+    teacher_user_id: UUID,
+    session: AsyncSession,
+) -> RegradeJobResponse:
+    logger.info(f"Пересчёт оценок тестов курса '{course_slug}' запрошен {teacher_user_id}")
+    async with session.begin():
+        regrade_dal = RegradeDAL(session)
+        course_id = await CourseDAL(session).get_teacher_course_id(user_id=teacher_user_id, slug=course_slug)
+        if course_id is None:
+            raise ValueError(f"Курс с slug '{course_slug}' не найден или нет доступа")
+
+        test_lessons = await regrade_dal.get_course_test_lessons(course_id)
+        job, created = await _enqueue_regrade(
+            regrade_dal, course_id, None, [lesson.id for lesson in test_lessons], teacher_user_id,
+        )
+
+    if created:
+        _spawn_regrade(job.id)
+    return _regrade_job_response(job)
+
+
+async def _get_regrade_job(job_id: int, user_id: UUID, session: AsyncSession) -> RegradeJobResponse:
+    async with session.begin():
+        job = await RegradeDAL(session).get_job(job_id)
+        if job is None or job.created_by != user_id:
+            raise ValueError(f"Задача пересчёта {job_id} не найдена")
+        return _regrade_job_response(job)
+
+
+async def _regrade_test(regrade_dal: RegradeDAL, lesson_dal: LessonDAL, job_id: int, test_lesson) -> None:
+    """
+    Пересчёт отправок одного теста пачками по REGRADE_BATCH_SIZE, каждая — в своей транзакции.
+    Записываются только изменившиеся оценки: два UPDATE ... FROM (VALUES ...) на пачку.
+    """
+    session = regrade_dal.db_session
+    async with session.begin():
+        await regrade_dal.update_job(job_id)
+        correct_answers_map = await lesson_dal.get_test_correct_answers_map(test_lesson.id)
+    key = compile_answer_key(test_lesson.id, test_lesson.updated_at, test_lesson.questions or [], correct_answers_map)
+
+    after_id = 0
+    while True:
+        async with session.begin():
+            rows = await regrade_dal.get_submissions_batch(test_lesson.id, after_id, REGRADE_BATCH_SIZE)
+            if not rows:
+                invalidate_test_analytics(test_lesson.id)
+                return
+
+            answer_grades: list[tuple[int, Optional[bool], float]] = []
+            totals: dict[int, list] = {}
+            stored: dict[int, tuple[int, float]] = {}
+            for row in rows:
+                sums = totals.setdefault(row.submission_id, [0, 0.0])
+                stored[row.submission_id] = (row.checked_questions, float(row.total_score or 0.0))
+                if row.answer_id is None:
+                    continue
+                is_correct, score = grade_stored_answer(key, row.question_index, row)
+                if is_correct is not None:
+                    sums[0] += 1
+                    sums[1] += score
+                if (is_correct, score) != (row.is_correct, float(row.score or 0.0)):
+                    answer_grades.append((row.answer_id, is_correct, score))
+
+            changed_totals = [
+                (submission_id, checked, total_score)
+                for submission_id, (checked, total_score) in totals.items()
+                if (checked, total_score) != stored[submission_id]
+            ]
+            await regrade_dal.set_answer_grades(answer_grades)
+            await regrade_dal.set_submission_totals(changed_totals)
+            await regrade_dal.update_job(job_id, processed=len(totals), changed=len(changed_totals))
+
+        after_id = max(totals)
+        # Отдаём управление event loop между пачками
+        await asyncio.sleep(0)
+
+
+async def _run_regrade_job(job_id: int) -> None:
+    async with async_session() as session:
+        regrade_dal = RegradeDAL(session)
+        lesson_dal = LessonDAL(session)
+        try:
+            async with session.begin():
+                job = await regrade_dal.get_job(job_id)
+                await regrade_dal.update_job(job_id, status=RegradeStatus.RUNNING.value)
+                if job.test_lesson_id is not None:
+                    test_lessons = await regrade_dal.get_test_lessons([job.test_lesson_id])
+                else:
+                    test_lessons = await regrade_dal.get_course_test_lessons(job.course_id)
+
+            logger.info(f"Пересчёт {job_id}: тестов {len(test_lessons)}, отправок {job.total}")
+            for test_lesson in test_lessons:
+                await _regrade_test(regrade_dal, lesson_dal, job_id, test_lesson)
+
+            async with session.begin():
+                await regrade_dal.finish_job(job_id, RegradeStatus.DONE)
+            logger.info(f"Пересчёт {job_id} завершён")
+        except asyncio.CancelledError:
+            await session.rollback()
+            async with session.begin():
+                await regrade_dal.finish_job(job_id, RegradeStatus.FAILED, error="Прерван остановкой сервиса")
+            raise
+        except Exception as e:
+            logger.exception(f"Пересчёт {job_id} завершился ошибкой")
+            await session.rollback()
+            async with session.begin():
+                await regrade_dal.finish_job(job_id, RegradeStatus.FAILED, error=str(e))
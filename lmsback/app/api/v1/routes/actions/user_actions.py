@@ -35,6 +35,8 @@ async def _get_user_by_email(email, session) -> Union[User, None]:
 
 async def _create_new_user(body: UserCreate, session) -> ShowUser:
     logger.info(f"Регистрация пользователя {body.email}")
+    # Хешируем до открытия транзакции, чтобы не держать соединение
+    hashed_password = await Hasher.get_password_hash_async(body.password)
     async with session.begin():
         user_dal = UserDAL(session)
         user = await user_dal.create_user(
@@ -49,7 +51,7 @@ async def _create_new_user(body: UserCreate, session) -> ShowUser:
             gender=body.gender,
             date_of_birth=body.date_of_birth,
             balance=0,
-            hashed_password=Hasher.get_password_hash(body.password),
+            hashed_password=hashed_password,
         )
 
         return ShowUser(
@@ -1,22 +1,25 @@
-from typing import List, Union
+from typing import List, Optional, Union
 from uuid import UUID
 from loguru import logger
 from pathlib import Path
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Response
 
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from api.v1.schemas.admin_schema import ShowUserAdmin, DeleteUserResponse, UpdatedUserResponse, DeleteCourseResponse, UpdatedCourseResponse, PlatformSettingsResponse, UpdateSettingsRequest
+from api.v1.schemas.admin_schema import ShowUserAdmin, DeleteUserResponse, UpdatedUserResponse, DeleteCourseResponse, UpdatedCourseResponse, PlatformSettingsResponse, UpdateSettingsRequest, UserImportResponse
 from api.v1.schemas.course_schema import ListAdminCourse
-from api.v1.routes.actions.auth_actions import get_current_user_from_token
+from api.v1.routes.actions.auth_actions import get_current_principal_from_token
 from api.v1.routes.actions.user_actions import check_user_permissions_admin
-from api.v1.routes.actions.admin_actions import _get_user_by_id, _get_user_all, _delete_user, _restore_user, _get_course_all, _delete_course, _restore_course, _get_course_by_id, _get_settings, _update_settings
+from api.v1.routes.actions.admin_actions import _get_user_by_id, _get_user_all, _delete_user, _restore_user, _get_course_all, _delete_course, _restore_course, _get_course_by_id, _get_settings, _update_settings, _import_users, _user_import_report_csv
 
 from core.config import LOG_FILES
-from db.models.user import User 
+from db.models.user import User
+from api.v1.schemas.user_schema import TokenClaims
 from db.session import get_db
 from utils.images import save_upload_image
+from utils.metrics import collect_metrics
+from utils.roster import iter_csv_records
 from core.config import BASE_URL
 
 SETTINGS_UPLOAD_DIR = Path("media/settings")
@@ -26,7 +29,7 @@ admin_router = APIRouter()
 @admin_router.post("/settings/upload-image")
 async def upload_course_image(
     file: UploadFile = File(...),
-    current_user: User = Depends(get_current_user_from_token),
+    current_user: TokenClaims = Depends(get_current_principal_from_token),
 ) -> dict:
     if not check_user_permissions_admin(current_user=current_user):
         logger.error(f"У пользователя {current_user.email} не хватает прав")
@@ -38,17 +41,45 @@ async def upload_course_image(
 
 @admin_router.get("/user/all", response_model=List[ShowUserAdmin])
 async def get_user_all(session: AsyncSession = Depends(get_db),
-                       current_user: User = Depends(get_current_user_from_token),
+                       current_user: TokenClaims = Depends(get_current_principal_from_token),
                        ):
     if not check_user_permissions_admin(current_user=current_user):
         raise HTTPException(status_code=403, detail="Forbidden.")
     users = await _get_user_all(session)
     return users
 
+@admin_router.post("/user/import", response_model=UserImportResponse)
+async def import_users(
+    file: UploadFile = File(...),
+    course_id: Optional[int] = None,
+    report_format: str = "csv",
+    session: AsyncSession = Depends(get_db),
+    current_user: TokenClaims = Depends(get_current_principal_from_token),
+):
+    """
+    Создание пользователей из CSV (email, last_name, first_name, patronymic, phone, password).
+    Без пароля в файле он генерируется и попадает в отчёт. С course_id пользователи
+    записываются на курс. Отчёт по строкам — CSV-файлом или JSON (report_format=json).
+    """
+    if not check_user_permissions_admin(current_user=current_user):
+        raise HTTPException(status_code=403, detail="Forbidden.")
+
+    report = await _import_users(records=iter_csv_records(file), course_id=course_id, session=session)
+    if report is None:
+        raise HTTPException(status_code=404, detail=f"Course with id {course_id} not found")
+
+    if report_format == "json":
+        return report
+    return Response(
+        content=_user_import_report_csv(report),
+        media_type="text/csv; charset=utf-8",
+        headers={"Content-Disposition": 'attachment; filename="user-import-report.csv"'},
+    )
+
 @admin_router.delete("/user/delete", response_model=DeleteUserResponse)
 async def delete_user(user_id: UUID,
                       session: AsyncSession = Depends(get_db),
-                      current_user: User = Depends(get_current_user_from_token),
+                      current_user: TokenClaims = Depends(get_current_principal_from_token),
 ) -> DeleteUserResponse:
     if not check_user_permissions_admin(current_user=current_user):
         raise HTTPException(status_code=403, detail="Forbidden.")
@@ -67,7 +98,7 @@ async def delete_user(user_id: UUID,
 @admin_router.patch("/user/restore", response_model=UpdatedUserResponse)
 async def restore_user(user_id: UUID,
                       session: AsyncSession = Depends(get_db),
-                      current_user: User = Depends(get_current_user_from_token),
+                      current_user: TokenClaims = Depends(get_current_principal_from_token),
 ) -> UpdatedUserResponse:
     if not check_user_permissions_admin(current_user=current_user):
         raise HTTPException(status_code=403, detail="Forbidden.")
@@ -87,7 +118,7 @@ async def restore_user(user_id: UUID,
 @admin_router.get("/course/all", response_model=List[ListAdminCourse])
 async def get_course_all(
                         session: AsyncSession = Depends(get_db),
-                        current_user: User = Depends(get_current_user_from_token)
+                        current_user: TokenClaims = Depends(get_current_principal_from_token)
 ) -> List[ListAdminCourse]:
     if not check_user_permissions_admin(current_user=current_user):
         raise HTTPException(status_code=403, detail="Forbidden.")
@@ -100,7 +131,7 @@ async def get_course_all(
 @admin_router.delete("/course/delete", response_model=DeleteCourseResponse)
 async def delete_course(course_id: int,
                         session: AsyncSession = Depends(get_db),
-                        current_user: User = Depends(get_current_user_from_token),
+                        current_user: TokenClaims = Depends(get_current_principal_from_token),
 ) -> DeleteCourseResponse:
     if not check_user_permissions_admin(current_user=current_user):
         raise HTTPException(status_code=403, detail="Forbidden.")
@@ -119,7 +150,7 @@ async def delete_course(course_id: int,
 @admin_router.patch("/course/restore", response_model=UpdatedCourseResponse)
 async def restore_course(course_id: int,
                          session: AsyncSession = Depends(get_db),
-                         current_user: User = Depends(get_current_user_from_token),
+                         current_user: TokenClaims = Depends(get_current_principal_from_token),
 ) -> UpdatedCourseResponse:
     if not check_user_permissions_admin(current_user=current_user):
         raise HTTPException(status_code=403, detail="Forbidden.")
@@ -138,7 +169,7 @@ async def restore_course(course_id: int,
 
 @admin_router.get("/logs/all")
 async def get_logs_all(
-    current_user: User = Depends(get_current_user_from_token),
+    current_user: TokenClaims = Depends(get_current_principal_from_token),
 ):
     if not check_user_permissions_admin(current_user=current_user):
         raise HTTPException(status_code=403, detail="Forbidden.")
@@ -155,7 +186,7 @@ async def get_logs_all(
 @admin_router.get("/logs")
 async def get_logs(
     lines: int = 100,  
-    current_user: User = Depends(get_current_user_from_token),
+    current_user: TokenClaims = Depends(get_current_principal_from_token),
 ):
     if not check_user_permissions_admin(current_user=current_user):
         raise HTTPException(status_code=403, detail="Forbidden.")
@@ -169,6 +200,15 @@ async def get_logs(
         return {"logs": []}
 
 
+@admin_router.get("/metrics")
+async def get_metrics(
+    current_user: TokenClaims = Depends(get_current_principal_from_token),
+):
+    if not check_user_permissions_admin(current_user=current_user):
+        raise HTTPException(status_code=403, detail="Forbidden.")
+    return collect_metrics()
+
+
 @admin_router.get("/settings", response_model=PlatformSettingsResponse)
 async def get_platform_settings(
     session: AsyncSession = Depends(get_db)
@@ -179,7 +219,7 @@ async def get_platform_settings(
 async def update_platform_settings(
     body: UpdateSettingsRequest,
     session: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user_from_token),
+    current_user: TokenClaims = Depends(get_current_principal_from_token),
 ):
     if not check_user_permissions_admin(current_user=current_user):
         raise HTTPException(status_code=403, detail="Forbidden.")
@@ -7,13 +7,13 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from api.v1.routes.actions.auth_actions import get_current_user_from_token
+from api.v1.routes.actions.auth_actions import get_current_principal_from_token
 from api.v1.routes.actions.user_actions import check_user_permissions_admin
 from api.v1.schemas.category_schema import ShowCategory, CategoryCreate, DeleteCategoryResponse, UpdateCategoryRequest, UpdatedCategoryResponse
 from api.v1.routes.actions.category_actions import _create_new_category, _get_category_by_id, _delete_category, _update_category, _get_categories_all
-from db.models.user import User 
+from api.v1.schemas.user_schema import TokenClaims
 from db.models.category import Category
-from db.session import get_db
+from db.session import get_db, get_read_db
   
 
 category_router = APIRouter()
@@ -21,7 +21,7 @@ category_router = APIRouter()
 @category_router.post("/", response_model=ShowCategory)
 async def create_category(body: CategoryCreate, 
                           session: AsyncSession = Depends(get_db),
-                          current_user: User = Depends(get_current_user_from_token),
+                          current_user: TokenClaims = Depends(get_current_principal_from_token),
                           ) -> ShowCategory:
     
     if not check_user_permissions_admin(current_user=current_user):
@@ -32,7 +32,7 @@ async def create_category(body: CategoryCreate,
 
 @category_router.get("/{id}", response_model=ShowCategory)
 async def get_category_by_id(id: int, 
-                         session: AsyncSession = Depends(get_db),
+                         session: AsyncSession = Depends(get_read_db),
 ) -> Union[Category, None]:
     category = await _get_category_by_id(id, session)
     if category is None:
@@ -41,14 +41,14 @@ async def get_category_by_id(id: int,
     return category
 
 @category_router.get("/all/", response_model=List[ShowCategory])
-async def get_user_all(session: AsyncSession = Depends(get_db)):
+async def get_user_all(session: AsyncSession = Depends(get_read_db)):
     category = await _get_categories_all(session)
     return category
 
 @category_router.delete("/", response_model=DeleteCategoryResponse)
 async def delete_category(id: int,
                           session: AsyncSession = Depends(get_db),
-                          current_user: User = Depends(get_current_user_from_token),
+                          current_user: TokenClaims = Depends(get_current_principal_from_token),
 ) -> DeleteCategoryResponse:
     
     if not check_user_permissions_admin(current_user=current_user):
@@ -73,7 +73,7 @@ async def delete_category(id: int,
 async def update_category_by_id(id: int, 
                             body: UpdateCategoryRequest, 
                             session: AsyncSession = Depends(get_db),
-                            current_user: User = Depends(get_current_user_from_token),
+                            current_user: TokenClaims = Depends(get_current_principal_from_token),
 ) -> UpdatedCategoryResponse:
     
     if not check_user_permissions_admin(current_user=current_user):
@@ -2,27 +2,34 @@ from typing import List, Union
 from pathlib import Path
 from loguru import logger
 
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query
 
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from api.v1.routes.actions.auth_actions import get_current_user_from_token
+from api.v1.routes.actions.auth_actions import get_current_user_from_token, get_current_principal_from_token
 from api.v1.routes.actions.user_actions import check_user_permissions_moderator, check_user_permissions_teahers, check_user_permissions_admin
 from api.v1.schemas.course_schema import (AddStudentsToCourse, AddTeachersToCourse, ListCourse, RemoveStudentsFromCourse, ShowUserCourse,
                                           RemoveTeachersFromCourse, ShowCourse, CourseCreate, ListTeacherCourse, ShowTeacherCourse,
-                                          DeleteCourseResponse, UpdatedCourseResponse, UpdateCourseRequest)
+                                          DeleteCourseResponse, UpdatedCourseResponse, UpdateCourseRequest,
+                                          CourseMembership, CourseMembershipRequest, RosterImportResponse,
+                                          GradebookResponse)
 from api.v1.routes.actions.course_actions import (_get_course_by_id, _create_new_course, _delete_course,
                                                   _update_course, _add_students_to_course, _add_teachers_to_course,
                                                   _remove_students_from_course, _remove_teachers_from_course,
                                                   _get_course_by_slug, _get_course_all, _get_course_by_categories,
                                                   _get_user_courses_as_student, _get_user_course_by_slug,
                                                   _get_user_courses_as_teacher, _get_teacher_course_by_slug,
-                                                  _get_course_teacher_by_id)
-from db.models.user import User
+                                                  _get_course_teacher_by_id, _get_course_memberships,
+                                                  _import_course_roster)
+from api.v1.routes.actions.analytics_actions import _get_course_gradebook
+from api.v1.routes.actions.export_actions import _export_gradebook
+from api.v1.schemas.user_schema import TokenClaims, UserPrincipal
 from db.models.course import Course
-from db.session import get_db
+from db.session import get_db, get_read_db
 from utils.images import save_upload_image
+from utils.roster import iter_roster
+from utils.export import ExportFormat, export_response
 from core.config import BASE_URL
 
 course_router = APIRouter()
@@ -32,7 +39,7 @@ COURSES_UPLOAD_DIR = Path("media/courses")
 @course_router.post("/upload-image/")
 async def upload_course_image(
     file: UploadFile = File(...),
-    current_user: User = Depends(get_current_user_from_token),
+    current_user: TokenClaims = Depends(get_current_principal_from_token),
 ) -> dict:
     if not check_user_permissions_teahers(current_user=current_user):
         logger.error(f"У пользователя {current_user.email} не хватает прав")
@@ -46,7 +53,7 @@ async def upload_course_image(
 @course_router.post("/", response_model=ShowCourse)
 async def create_course(body: CourseCreate,
                         session: AsyncSession = Depends(get_db),
-                        current_user: User = Depends(get_current_user_from_token),
+                        current_user: TokenClaims = Depends(get_current_principal_from_token),
 ) -> ShowCourse:
 
     if not check_user_permissions_teahers(current_user=current_user):
@@ -58,7 +65,7 @@ async def create_course(body: CourseCreate,
 
 @course_router.get("/", response_model=ShowCourse)
 async def get_course_by_slug(slug: str,
-                             session: AsyncSession = Depends(get_db),
+                             session: AsyncSession = Depends(get_read_db),
 ) -> Union[Course, None]:
 
     logger.info("Получение категории по slug")
@@ -69,8 +76,8 @@ async def get_course_by_slug(slug: str,
     return course
 
 @course_router.get("/list", response_model=List[ListCourse])
-async def get_course_all(session: AsyncSession = Depends(get_db),
-                        current_user: User = Depends(get_current_user_from_token)) -> List[ListCourse]:
+async def get_course_all(session: AsyncSession = Depends(get_read_db),
+                        current_user: UserPrincipal = Depends(get_current_user_from_token)) -> List[ListCourse]:
     logger.info("Получение курсов")
     course = await _get_course_all(user_id=current_user.user_id, session=session)
     if course is None:
@@ -78,7 +85,7 @@ async def get_course_all(session: AsyncSession = Depends(get_db),
     return course
 
 @course_router.get("/list/{categories_slug}", response_model=List[ListCourse])
-async def get_course_by_categories(categories_slug: str, session: AsyncSession = Depends(get_db)) -> List[ListCourse]:
+async def get_course_by_categories(categories_slug: str, session: AsyncSession = Depends(get_read_db)) -> List[ListCourse]:
     logger.info(f"Получение курсов по категории {categories_slug}")
     course = await _get_course_by_categories(categories_slug=categories_slug, session=session)
     if course is None:
@@ -87,8 +94,8 @@ async def get_course_by_categories(categories_slug: str, session: AsyncSession =
 
 @course_router.get("/educations", response_model=List[ListCourse])
 async def get_user_courses_as_student(
-                        session: AsyncSession = Depends(get_db),
-                        current_user: User = Depends(get_current_user_from_token)
+                        session: AsyncSession = Depends(get_read_db),
+                        current_user: UserPrincipal = Depends(get_current_user_from_token)
 ) -> List[ListCourse]:
     logger.info("Получение курсов, на которые подписаны пользователи")
     course = await _get_user_courses_as_student(session=session, user_id=current_user.user_id)
@@ -99,8 +106,8 @@ async def get_user_courses_as_student(
 @course_router.get("/educations/{slug}", response_model=ShowUserCourse)
 async def get_user_course_by_slug(
                         slug: str,
-                        session: AsyncSession = Depends(get_db),
-                        current_user: User = Depends(get_current_user_from_token)
+                        session: AsyncSession = Depends(get_read_db),
+                        current_user: UserPrincipal = Depends(get_current_user_from_token)
 ) -> Union[Course, None]:
     logger.info("Получение курса по slug, на которые подписаны пользователи")
     course = await _get_user_course_by_slug(session=session, user_id=current_user.user_id, slug=slug)
@@ -111,8 +118,8 @@ async def get_user_course_by_slug(
 
 @course_router.get("/teachers", response_model=List[ListTeacherCourse])
 async def get_user_courses_as_teacher(
-                        session: AsyncSession = Depends(get_db),
-                        current_user: User = Depends(get_current_user_from_token)
+                        session: AsyncSession = Depends(get_read_db),
+                        current_user: UserPrincipal = Depends(get_current_user_from_token)
 ) -> List[ListCourse]:
     logger.info("Получение курсов, на которые подписаны пользователи")
     course = await _get_user_courses_as_teacher(session=session, user_id=current_user.user_id)
@@ -123,8 +130,8 @@ async def get_user_courses_as_teacher(
 @course_router.get("/teachers/{slug}", response_model=ShowTeacherCourse)
 async def get_teachers_course_by_slug(
                         slug: str,
-                        session: AsyncSession = Depends(get_db),
-                        current_user: User = Depends(get_current_user_from_token)
+                        session: AsyncSession = Depends(get_read_db),
+                        current_user: UserPrincipal = Depends(get_current_user_from_token)
 ) -> Union[Course, None]:
     logger.info("Получение курса по slug, на которые подписаны преподаватели")
     course = await _get_teacher_course_by_slug(session=session, user_id=current_user.user_id, slug=slug)
@@ -133,10 +140,45 @@ async def get_teachers_course_by_slug(
         raise HTTPException(status_code=404, detail=f"Course with slug {slug} not found")
     return course
 
+@course_router.get("/teachers/{slug}/gradebook", response_model=GradebookResponse)
+async def get_course_gradebook(
+                        slug: str,
+                        session: AsyncSession = Depends(get_read_db),
+                        current_user: TokenClaims = Depends(get_current_principal_from_token),
+) -> GradebookResponse:
+    """Журнал курса: студенты × уроки в колоночном виде, клетки — только непустые."""
+    if not check_user_permissions_teahers(current_user=current_user):
+        logger.error(f"У пользователя {current_user.email} не хватает прав")
+        raise HTTPException(status_code=403, detail="Forbidden.")
+    try:
+        return await _get_course_gradebook(course_slug=slug, teacher_user_id=current_user.user_id, session=session)
+    except ValueError as e:
+        logger.error(str(e))
+        raise HTTPException(status_code=404, detail=str(e))
+
+@course_router.get("/teachers/{slug}/gradebook/export")
+async def export_course_gradebook(
+                        slug: str,
+                        export_format: ExportFormat = Query(ExportFormat.CSV, alias="format"),
+                        session: AsyncSession = Depends(get_read_db),
+                        current_user: TokenClaims = Depends(get_current_principal_from_token),
+):
+    """Журнал курса файлом: строка на студента, колонка на урок."""
+    if not check_user_permissions_teahers(current_user=current_user):
+        logger.error(f"У пользователя {current_user.email} не хватает прав")
+        raise HTTPException(status_code=403, detail="Forbidden.")
+    try:
+        header, rows = await _export_gradebook(course_slug=slug, teacher_user_id=current_user.user_id,
+                                               session=session)
+    except ValueError as e:
+        logger.error(str(e))
+        raise HTTPException(status_code=404, detail=str(e))
+    return export_response(f"gradebook-{slug}", header, rows, export_format)
+
 @course_router.delete("/", response_model=DeleteCourseResponse)
 async def delete_course(id: int,
                         session: AsyncSession = Depends(get_db),
-                        current_user: User = Depends(get_current_user_from_token),
+                        current_user: TokenClaims = Depends(get_current_principal_from_token),
 ) -> DeleteCourseResponse:
 
     if not check_user_permissions_teahers(current_user=current_user):
@@ -161,7 +203,7 @@ async def delete_course(id: int,
 async def update_course_by_id(id: int,
                               body: UpdateCourseRequest,
                               session: AsyncSession = Depends(get_db),
-                              current_user: User = Depends(get_current_user_from_token),
+                              current_user: TokenClaims = Depends(get_current_principal_from_token),
 ) -> UpdatedCourseResponse:
 
     if not check_user_permissions_teahers(current_user=current_user):
@@ -191,7 +233,7 @@ async def update_course_by_id(id: int,
 async def add_teachers_to_course(course_id: int,
                                  teacher_ids: AddTeachersToCourse,
                                  session: AsyncSession = Depends(get_db),
-                                 current_user: User = Depends(get_current_user_from_token),
+                                 current_user: TokenClaims = Depends(get_current_principal_from_token),
 ) -> ShowCourse:
 
     if not check_user_permissions_moderator(current_user=current_user):
@@ -211,7 +253,7 @@ async def add_teachers_to_course(course_id: int,
 async def remove_teachers_from_course(course_id: int,
                                       teacher_ids: RemoveTeachersFromCourse,
                                       session: AsyncSession = Depends(get_db),
-                                      current_user: User = Depends(get_current_user_from_token),
+                                      current_user: TokenClaims = Depends(get_current_principal_from_token),
 ) -> ShowCourse:
 
     if not check_user_permissions_moderator(current_user=current_user):
@@ -231,14 +273,18 @@ async def remove_teachers_from_course(course_id: int,
 async def add_students_to_course(course_id: int,
                                  student_ids: AddStudentsToCourse,
                                  session: AsyncSession = Depends(get_db),
-                                 current_user: User = Depends(get_current_user_from_token),
+                                 current_user: TokenClaims = Depends(get_current_principal_from_token),
 ) -> ShowCourse:
 
     if not check_user_permissions_moderator(current_user=current_user):
         logger.error(f"У пользователя {current_user.email} не хватает прав")
         raise HTTPException(status_code=403, detail="Forbiden.")
 
-    course = await _add_students_to_course(course_id=course_id, student_ids=student_ids.student_ids, session=session)
+    try:
+        course = await _add_students_to_course(course_id=course_id, student_ids=student_ids.student_ids, session=session)
+    except ValueError as err:
+        logger.error(err)
+        raise HTTPException(status_code=404, detail=str(err))
 
     if course is None:
         logger.error(f"Курс {id} не найден.")
@@ -251,7 +297,7 @@ async def add_students_to_course(course_id: int,
 async def remove_students_from_course(course_id: int,
                                       student_ids: RemoveStudentsFromCourse,
                                       session: AsyncSession = Depends(get_db),
-                                      current_user: User = Depends(get_current_user_from_token),
+                                      current_user: TokenClaims = Depends(get_current_principal_from_token),
 ) -> ShowCourse:
 
     if not check_user_permissions_moderator(current_user=current_user):
@@ -265,3 +311,37 @@ async def remove_students_from_course(course_id: int,
         raise HTTPException(status_code=404, detail=f"Course with id {id} not found")
 
     return course
+
+
+@course_router.post("/memberships", response_model=List[CourseMembership])
+async def get_course_memberships(body: CourseMembershipRequest,
+                                 session: AsyncSession = Depends(get_read_db),
+                                 current_user: TokenClaims = Depends(get_current_principal_from_token),
+) -> List[CourseMembership]:
+
+    if not check_user_permissions_moderator(current_user=current_user):
+        logger.error(f"У пользователя {current_user.email} не хватает прав")
+        raise HTTPException(status_code=403, detail="Forbiden.")
+
+    return await _get_course_memberships(pairs=body.pairs, session=session)
+
+
+@course_router.post("/students/import", response_model=RosterImportResponse)
+async def import_course_roster(course_id: int,
+                               file: UploadFile = File(...),
+                               session: AsyncSession = Depends(get_db),
+                               current_user: TokenClaims = Depends(get_current_principal_from_token),
+) -> RosterImportResponse:
+    """Запись на курс по списку email из CSV/XLSX; результат — по каждой строке файла."""
+
+    if not check_user_permissions_moderator(current_user=current_user):
+        logger.error(f"У пользователя {current_user.email} не хватает прав")
+        raise HTTPException(status_code=403, detail="Forbiden.")
+
+    report = await _import_course_roster(course_id=course_id, rows=iter_roster(file), session=session)
+
+    if report is None:
+        logger.error(f"Курс {course_id} не найден.")
+        raise HTTPException(status_code=404, detail=f"Course with id {course_id} not found")
+
+    return report
@@ -6,11 +6,11 @@ from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from api.v1.routes.actions.auth_actions import get_current_user_from_token
+from api.v1.routes.actions.auth_actions import get_current_user_from_token, get_current_principal_from_token
 from api.v1.routes.actions.user_actions import check_user_permissions_moderator, check_user_permissions_teahers, check_user_permissions_admin
 from api.v1.schemas.dialog_schema import ShowDialog, DeletedDialogResponse, UpdatedDialogResponse, DialogUpdate, AddMembersToDialog, RemoveMemebersFromDialog
 from api.v1.routes.actions.dialog_actions import _get_user_dialogs, _get_dialog_by_slug, _get_dialog_by_id, _delete_dialog, _update_dialog, _add_members_to_dialog, _remove_members_from_dialog
-from db.models.user import User
+from api.v1.schemas.user_schema import TokenClaims, UserPrincipal
 from db.models.dialog import Dialog
 from db.session import get_db
 
@@ -19,7 +19,7 @@ dialog_router = APIRouter()
 @dialog_router.get("/list", response_model=List[ShowDialog])
 async def get_user_dialogs(
                         session: AsyncSession = Depends(get_db),
-                        current_user: User = Depends(get_current_user_from_token)
+                        current_user: UserPrincipal = Depends(get_current_user_from_token)
 ) -> List[ShowDialog]:
     logger.info("Получение диалогов пользователя")
     dialogs = await _get_user_dialogs(session=session, user_id=current_user.user_id)
@@ -32,7 +32,7 @@ async def get_user_dialogs(
 async def get_dialog_by_slug(
                         slug: str,
                         session: AsyncSession = Depends(get_db),
-                        current_user: User = Depends(get_current_user_from_token)
+                        current_user: UserPrincipal = Depends(get_current_user_from_token)
 ) -> Union[Dialog, None]:
     logger.info("Получение диалога по slug")
     dialog = await _get_dialog_by_slug(session=session, user_id=current_user.user_id, slug=slug)
@@ -45,7 +45,7 @@ async def get_dialog_by_slug(
 @dialog_router.delete("/", response_model=DeletedDialogResponse)
 async def delete_dialog(id: int,
                           session: AsyncSession = Depends(get_db),
-                          current_user: User = Depends(get_current_user_from_token),
+                          current_user: TokenClaims = Depends(get_current_principal_from_token),
 ) -> DeletedDialogResponse:
     
     if not check_user_permissions_moderator(current_user=current_user):
@@ -67,7 +67,7 @@ async def delete_dialog(id: int,
 async def update_category_by_id(id: int, 
                             body: DialogUpdate, 
                             session: AsyncSession = Depends(get_db),
-                            current_user: User = Depends(get_current_user_from_token),
+                            current_user: TokenClaims = Depends(get_current_principal_from_token),
 ) -> UpdatedDialogResponse:
     
     if not check_user_permissions_moderator(current_user=current_user):
@@ -96,7 +96,7 @@ async def update_category_by_id(id: int,
 async def add_members_to_dialog(dialog_id: int,
                                 members_ids: AddMembersToDialog,
                                 session: AsyncSession = Depends(get_db),
-                                current_user: User = Depends(get_current_user_from_token),
+                                current_user: TokenClaims = Depends(get_current_principal_from_token),
 ) -> ShowDialog:
 
     if not check_user_permissions_moderator(current_user=current_user):
@@ -116,7 +116,7 @@ async def add_members_to_dialog(dialog_id: int,
 async def remove_members_from_dialog(dialog_id: int,
                                      members_ids: RemoveMemebersFromDialog,
                                      session: AsyncSession = Depends(get_db),
-                                     current_user: User = Depends(get_current_user_from_token),
+                                     current_user: TokenClaims = Depends(get_current_principal_from_token),
 ) -> ShowDialog:
 
     if not check_user_permissions_moderator(current_user=current_user):
@@ -1,9 +1,10 @@
 from pathlib import Path
-from fastapi import APIRouter, Depends, HTTPException, File, UploadFile, Form, Body
+from typing import Annotated
+from fastapi import APIRouter, Depends, HTTPException, File, UploadFile, Form, Body, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from loguru import logger
-from db.session import get_db
-from db.models.user import User
+from db.session import get_db, get_read_db
+from api.v1.schemas.user_schema import TokenClaims, UserPrincipal
 from db.models.lesson import LessonType
 from api.v1.routes.actions.lesson_actions import (
     _create_new_lesson,
@@ -17,8 +18,15 @@ from api.v1.routes.actions.lesson_actions import (
     _update_lesson,
     _get_test_submissions_for_teacher,
     _get_test_submissions_for_teacher_by_course,
+    _count_test_submissions_for_teacher,
+    _count_test_submissions_for_teacher_by_course,
+    _save_test_draft,
+    _get_test_draft,
 )
-from api.v1.routes.actions.auth_actions import get_current_user_from_token
+from api.v1.routes.actions.analytics_actions import _get_test_analytics
+from api.v1.routes.actions.export_actions import _export_test_submissions, TEST_SUBMISSIONS_HEADER
+from api.v1.routes.actions.regrade_actions import _start_test_regrade, _start_course_regrade, _get_regrade_job
+from api.v1.routes.actions.auth_actions import get_current_user_from_token, get_current_principal_from_token
 from api.v1.routes.actions.user_actions import check_user_permissions_admin, check_user_permissions_teahers
 from api.v1.schemas.lesson_schema import (
     LessonCreate,
@@ -28,10 +36,19 @@ from api.v1.schemas.lesson_schema import (
     PracticaResponse,
     TestCheckRequest,
     TestCheckResponse,
+    TestDraftSaveRequest,
+    TestDraftSaveResponse,
+    TestDraftResponse,
     TestSubmissionTeacherResponse,
+    RegradeJobResponse,
+    TestAnalyticsResponse,
+    SubmissionListQuery,
+    SubmissionCountResponse,
 )
 from utils.images import save_upload_image
 from utils.files import save_upload_file
+from utils.export import ExportFormat, export_response
+from utils.pagination import NEXT_CURSOR_HEADER
 from core.config import BASE_URL 
 
 lesson_router = APIRouter()
@@ -45,7 +62,7 @@ async def update_lesson(
         lesson_id: int,
         body: dict = Body(...),
         session: AsyncSession = Depends(get_db),
-        current_user: User = Depends(get_current_user_from_token),
+        current_user: TokenClaims = Depends(get_current_principal_from_token),
 ):
     if not check_user_permissions_teahers(current_user=current_user):
         logger.error(f"У пользователя {current_user.email} не хватает прав")
@@ -64,7 +81,7 @@ async def update_lesson(
 @lesson_router.post("/upload-image/")
 async def upload_course_image(
     file: UploadFile = File(...),
-    current_user: User = Depends(get_current_user_from_token),
+    current_user: TokenClaims = Depends(get_current_principal_from_token),
 ) -> dict:
     if not check_user_permissions_teahers(current_user=current_user):
         logger.error(f"У пользователя {current_user.email} не хватает прав")
@@ -79,7 +96,7 @@ async def upload_course_image(
 async def create_lesson(
         body: LessonCreate,
         session: AsyncSession = Depends(get_db),
-        current_user: User = Depends(get_current_user_from_token),
+        current_user: TokenClaims = Depends(get_current_principal_from_token),
 ):
     if not check_user_permissions_teahers(current_user=current_user):
         logger.error(f"У пользователя {current_user.email} не хватает прав")
@@ -100,7 +117,7 @@ async def create_practica_lesson(
         deadline_days: int | None = Form(None, ge=0),
         materials: list[UploadFile] = File(default_factory=list),
         session: AsyncSession = Depends(get_db),
-        current_user: User = Depends(get_current_user_from_token),
+        current_user: TokenClaims = Depends(get_current_principal_from_token),
 ):
     if not check_user_permissions_teahers(current_user=current_user):
         logger.error(f"У пользователя {current_user.email} не хватает прав")
@@ -158,7 +175,7 @@ async def update_practica_lesson(
         deadline_days: int | None = Form(None, ge=0),
         materials: list[UploadFile] = File(default_factory=list),
         session: AsyncSession = Depends(get_db),
-        current_user: User = Depends(get_current_user_from_token),
+        current_user: TokenClaims = Depends(get_current_principal_from_token),
 ):
     if not check_user_permissions_teahers(current_user=current_user):
         logger.error(f"У пользователя {current_user.email} не хватает прав")
@@ -211,7 +228,7 @@ async def add_lesson_materials(
         lesson_slug: str,
         materials: list[UploadFile] = File(default_factory=list),
         session: AsyncSession = Depends(get_db),
-        current_user: User = Depends(get_current_user_from_token),
+        current_user: TokenClaims = Depends(get_current_principal_from_token),
 ):
     if not check_user_permissions_teahers(current_user=current_user):
         logger.error(f"У пользователя {current_user.email} не хватает прав")
@@ -253,8 +270,8 @@ async def add_lesson_materials(
 @lesson_router.get("/", response_model=LessonResponse)
 async def get_lesson(
         lesson_id: int,
-        session: AsyncSession = Depends(get_db),
-        current_user: User = Depends(get_current_user_from_token),
+        session: AsyncSession = Depends(get_read_db),
+        current_user: UserPrincipal = Depends(get_current_user_from_token),
 ):
     try:
         return await _get_lesson(lesson_id, session)
@@ -265,8 +282,8 @@ async def get_lesson(
 @lesson_router.get("/student/{slug}", response_model=LessonStudentResponse)
 async def get_lesson_by_slug_for_student(
         slug: str,
-        session: AsyncSession = Depends(get_db),
-        current_user: User = Depends(get_current_user_from_token),
+        session: AsyncSession = Depends(get_read_db),
+        current_user: UserPrincipal = Depends(get_current_user_from_token),
 ):
     try:
         return await _get_lesson_by_slug_for_student(slug, current_user.user_id, session)
@@ -279,7 +296,7 @@ async def check_test_answers(
     lesson_slug: str,
     body: TestCheckRequest,
     session: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user_from_token),
+    current_user: UserPrincipal = Depends(get_current_user_from_token),
 ):
     try:
         # импорт тут, чтобы не раздувать imports сверху
@@ -297,11 +314,50 @@ async def check_test_answers(
         raise HTTPException(status_code=status_code, detail=msg)
 
 
+@lesson_router.put("/test/{lesson_slug}/draft", response_model=TestDraftSaveResponse)
+async def save_test_draft(
+    lesson_slug: str,
+    body: TestDraftSaveRequest,
+    session: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_user_from_token),
+):
+    try:
+        return await _save_test_draft(
+            lesson_slug=lesson_slug,
+            user_id=current_user.user_id,
+            version=body.version,
+            answers=body.answers,
+            session=session,
+        )
+    except ValueError as e:
+        msg = str(e)
+        status_code = 403 if "нет доступа" in msg else 409 if "уже отправлен" in msg or "устарел" in msg else 400
+        raise HTTPException(status_code=status_code, detail=msg)
+
+
+@lesson_router.get("/test/{lesson_slug}/draft", response_model=TestDraftResponse)
+async def get_test_draft(
+    lesson_slug: str,
+    session: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_user_from_token),
+):
+    try:
+        return await _get_test_draft(
+            lesson_slug=lesson_slug,
+            user_id=current_user.user_id,
+            session=session,
+        )
+    except ValueError as e:
+        msg = str(e)
+        status_code = 403 if "нет доступа" in msg else 404 if "не найден" in msg else 400
+        raise HTTPException(status_code=status_code, detail=msg)
+
+
 @lesson_router.get("/test/{lesson_slug}/result", response_model=TestCheckResponse)
 async def get_test_result(
     lesson_slug: str,
-    session: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user_from_token),
+    session: AsyncSession = Depends(get_read_db),
+    current_user: UserPrincipal = Depends(get_current_user_from_token),
 ):
     try:
         from api.v1.routes.actions.lesson_actions import _get_test_result
@@ -320,29 +376,165 @@ async def get_test_result(
 @lesson_router.get("/test/{lesson_slug}/submissions", response_model=list[TestSubmissionTeacherResponse])
 async def get_test_submissions_for_teacher(
     lesson_slug: str,
-    session: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user_from_token),
+    response: Response,
+    query: Annotated[SubmissionListQuery, Query()],
+    session: AsyncSession = Depends(get_read_db),
+    current_user: TokenClaims = Depends(get_current_principal_from_token),
+):
+    if not check_user_permissions_teahers(current_user=current_user):
+        logger.error(f"У пользователя {current_user.email} не хватает прав")
+        raise HTTPException(status_code=403, detail="Forbidden.")
+    try:
+        items, next_cursor = await _get_test_submissions_for_teacher(
+            lesson_slug=lesson_slug, query=query, session=session,
+        )
+    except ValueError as e:
+        msg = str(e)
+        status_code = 400 if "Некорректн" in msg else 404
+        raise HTTPException(status_code=status_code, detail=msg)
+    if next_cursor is not None:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return items
+
+
+@lesson_router.get("/test/{lesson_slug}/submissions/count", response_model=SubmissionCountResponse)
+async def count_test_submissions_for_teacher(
+    lesson_slug: str,
+    query: Annotated[SubmissionListQuery, Query()],
+    session: AsyncSession = Depends(get_read_db),
+    current_user: TokenClaims = Depends(get_current_principal_from_token),
 ):
     if not check_user_permissions_teahers(current_user=current_user):
         logger.error(f"У пользователя {current_user.email} не хватает прав")
         raise HTTPException(status_code=403, detail="Forbidden.")
     try:
-        return await _get_test_submissions_for_teacher(lesson_slug=lesson_slug, session=session)
+        return await _count_test_submissions_for_teacher(lesson_slug=lesson_slug, query=query, session=session)
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
 
 
 @lesson_router.get("/test/course/{course_slug}/submissions", response_model=list[TestSubmissionTeacherResponse])
 async def get_test_submissions_for_teacher_by_course(
+    course_slug: str,
+    response: Response,
+    query: Annotated[SubmissionListQuery, Query()],
+    session: AsyncSession = Depends(get_read_db),
+    current_user: TokenClaims = Depends(get_current_principal_from_token),
+):
+    if not check_user_permissions_teahers(current_user=current_user):
+        logger.error(f"У пользователя {current_user.email} не хватает прав")
+        raise HTTPException(status_code=403, detail="Forbidden.")
+    try:
+        items, next_cursor = await _get_test_submissions_for_teacher_by_course(
+            course_slug=course_slug,
+            teacher_user_id=current_user.user_id,
+            query=query,
+            session=session,
+        )
+    except ValueError as e:
+        msg = str(e)
+        status_code = 400 if "Некорректн" in msg else 404
+        raise HTTPException(status_code=status_code, detail=msg)
+    if next_cursor is not None:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return items
+
+
+@lesson_router.get("/test/course/{course_slug}/submissions/count", response_model=SubmissionCountResponse)
+async def count_test_submissions_for_teacher_by_course(
+    course_slug: str,
+    query: Annotated[SubmissionListQuery, Query()],
+    session: AsyncSession = Depends(get_read_db),
+    current_user: TokenClaims = Depends(get_current_principal_from_token),
+):
+    if not check_user_permissions_teahers(current_user=current_user):
+        logger.error(f"У пользователя {current_user.email} не хватает прав")
+        raise HTTPException(status_code=403, detail="Forbidden.")
+    try:
+        return await _count_test_submissions_for_teacher_by_course(
+            course_slug=course_slug,
+            teacher_user_id=current_user.user_id,
+            query=query,
+            session=session,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@lesson_router.get("/test/course/{course_slug}/submissions/export")
+async def export_test_submissions_by_course(
+    course_slug: str,
+    export_format: ExportFormat = Query(ExportFormat.CSV, alias="format"),
+    session: AsyncSession = Depends(get_read_db),
+    current_user: TokenClaims = Depends(get_current_principal_from_token),
+):
+    if not check_user_permissions_teahers(current_user=current_user):
+        logger.error(f"У пользователя {current_user.email} не хватает прав")
+        raise HTTPException(status_code=403, detail="Forbidden.")
+    try:
+        rows = await _export_test_submissions(
+            course_slug=course_slug,
+            teacher_user_id=current_user.user_id,
+            session=session,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return export_response(f"test-submissions-{course_slug}", TEST_SUBMISSIONS_HEADER, rows, export_format)
+
+
+@lesson_router.get("/test/{lesson_slug}/analytics", response_model=TestAnalyticsResponse)
+async def get_test_analytics(
+    lesson_slug: str,
+    session: AsyncSession = Depends(get_read_db),
+    current_user: TokenClaims = Depends(get_current_principal_from_token),
+):
+    if not check_user_permissions_teahers(current_user=current_user):
+        logger.error(f"У пользователя {current_user.email} не хватает прав")
+        raise HTTPException(status_code=403, detail="Forbidden.")
+    try:
+        return await _get_test_analytics(
+            lesson_slug=lesson_slug,
+            teacher_user_id=current_user.user_id,
+            session=session,
+        )
+    except ValueError as e:
+        msg = str(e)
+        status_code = 404 if "не найден" in msg else 400
+        raise HTTPException(status_code=status_code, detail=msg)
+
+
+@lesson_router.post("/test/{lesson_slug}/regrade", response_model=RegradeJobResponse, status_code=202)
+async def regrade_test_submissions(
+    lesson_slug: str,
+    session: AsyncSession = Depends(get_db),
+    current_user: TokenClaims = Depends(get_current_principal_from_token),
+):
+    if not check_user_permissions_teahers(current_user=current_user):
+        logger.error(f"У пользователя {current_user.email} не хватает прав")
+        raise HTTPException(status_code=403, detail="Forbidden.")
+    try:
+        return await _start_test_regrade(
+            lesson_slug=lesson_slug,
+            teacher_user_id=current_user.user_id,
+            session=session,
+        )
+    except ValueError as e:
+        msg = str(e)
+        status_code = 404 if "не найден" in msg else 400
+        raise HTTPException(status_code=status_code, detail=msg)
+
+
+@lesson_router.post("/test/course/{course_slug}/regrade", response_model=RegradeJobResponse, status_code=202)
+async def regrade_course_test_submissions(
     course_slug: str,
     session: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user_from_token),
+    current_user: TokenClaims = Depends(get_current_principal_from_token),
 ):
     if not check_user_permissions_teahers(current_user=current_user):
         logger.error(f"У пользователя {current_user.email} не хватает прав")
         raise HTTPException(status_code=403, detail="Forbidden.")
     try:
-        return await _get_test_submissions_for_teacher_by_course(
+        return await _start_course_regrade(
             course_slug=course_slug,
             teacher_user_id=current_user.user_id,
             session=session,
@@ -351,11 +543,26 @@ async def get_test_submissions_for_teacher_by_course(
         raise HTTPException(status_code=404, detail=str(e))
 
 
+@lesson_router.get("/test/regrade/{job_id}", response_model=RegradeJobResponse)
+async def get_regrade_job(
+    job_id: int,
+    session: AsyncSession = Depends(get_db),
+    current_user: TokenClaims = Depends(get_current_principal_from_token),
+):
+    if not check_user_permissions_teahers(current_user=current_user):
+        logger.error(f"У пользователя {current_user.email} не хватает прав")
+        raise HTTPException(status_code=403, detail="Forbidden.")
+    try:
+        return await _get_regrade_job(job_id=job_id, user_id=current_user.user_id, session=session)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
 @lesson_router.get("/by-slug/{slug}", response_model=LessonResponse)
 async def get_lesson_by_slug(
         slug: str,
-        session: AsyncSession = Depends(get_db),
-        current_user: User = Depends(get_current_user_from_token),
+        session: AsyncSession = Depends(get_read_db),
+        current_user: UserPrincipal = Depends(get_current_user_from_token),
 ):
     try:
         return await _get_lesson_by_slug(slug, session)
@@ -367,7 +574,7 @@ async def get_lesson_by_slug(
 async def delete_lesson(
         lesson_id: int,
         session: AsyncSession = Depends(get_db),
-        current_user: User = Depends(get_current_user_from_token),
+        current_user: TokenClaims = Depends(get_current_principal_from_token),
 ):
     if not check_user_permissions_teahers(current_user=current_user):
         logger.error(f"У пользователя {current_user.email} не хватает прав")
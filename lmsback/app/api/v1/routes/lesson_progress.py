@@ -2,8 +2,8 @@ from uuid import UUID
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from db.session import get_db
-from db.models.user import User
+from db.session import get_db, get_read_db
+from api.v1.schemas.user_schema import UserPrincipal
 from api.v1.routes.actions.lesson_progress import _complete_lesson, _get_course_progress, _get_course_progress_full
 from api.v1.schemas.progress_schema import CourseProgressFullResponse
 from api.v1.routes.actions.auth_actions import get_current_user_from_token
@@ -18,7 +18,7 @@ progress_router = APIRouter()
 async def complete_lesson(
         lesson_slug: str,
         session: AsyncSession = Depends(get_db),
-        current_user: User = Depends(get_current_user_from_token),
+        current_user: UserPrincipal = Depends(get_current_user_from_token),
 ):
     try:
         return await _complete_lesson(lesson_slug, current_user.user_id, session)
@@ -29,8 +29,8 @@ async def complete_lesson(
 @progress_router.get("/progress/{course_slug}", status_code=200)
 async def get_course_progress(
         course_slug: str,
-        session: AsyncSession = Depends(get_db),
-        current_user: User = Depends(get_current_user_from_token),
+        session: AsyncSession = Depends(get_read_db),
+        current_user: UserPrincipal = Depends(get_current_user_from_token),
 ):
     try:
         ids = await _get_course_progress(course_slug, current_user.user_id, session)
@@ -42,8 +42,8 @@ async def get_course_progress(
 @progress_router.get("/progress-full/{course_slug}", response_model=CourseProgressFullResponse, status_code=200)
 async def get_course_progress_full(
         course_slug: str,
-        session: AsyncSession = Depends(get_db),
-        current_user: User = Depends(get_current_user_from_token),
+        session: AsyncSession = Depends(get_read_db),
+        current_user: UserPrincipal = Depends(get_current_user_from_token),
 ):
     try:
         return await _get_course_progress_full(course_slug, current_user.user_id, session)
@@ -3,15 +3,18 @@ from datetime import timedelta
 from fastapi.security import OAuth2PasswordRequestForm
 
 from fastapi import APIRouter, Depends, HTTPException, Response, Request
+from loguru import logger
 
 from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import status
 
 from api.v1.schemas.user_schema import Token
-from api.v1.routes.actions.auth_actions import authenticate_user, verify_token  
+from api.v1.routes.actions.auth_actions import (authenticate_user, verify_token, build_access_token_claims,
+                                                _get_user_by_email_for_auth)
 from db.session import get_db
 from core.config import ACCESS_TOKEN_EXPIRE_MINUTES, REFRESH_TOKEN_EXPIRE_DAYS
 from utils.security import create_access_token, create_refresh_token
+from utils.limiter import login_limiter
 
 auth_router = APIRouter()
 
@@ -21,7 +24,17 @@ async def login_for_access_token(
         form_data: OAuth2PasswordRequestForm = Depends(), 
         session: AsyncSession = Depends(get_db)
 ):
-    user = await authenticate_user(form_data.username.lower() , form_data.password, session)
+    if not login_limiter.try_acquire():
+        logger.warning("Превышен лимит одновременных попыток входа")
+        raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many login attempts, try again later",
+                headers={"Retry-After": "1"},
+                )
+    try:
+        user = await authenticate_user(form_data.username.lower() , form_data.password, session)
+    finally:
+        login_limiter.release()
     if not user:
         raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -30,7 +43,7 @@ async def login_for_access_token(
 
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-            data={"sub": user.email, "other_custom_data": [1, 2, 3, 4]},
+            data=build_access_token_claims(user),
             expires_delta=access_token_expires
     )
     refresh_token = create_refresh_token(data={"sub": user.email})
@@ -63,7 +76,15 @@ async def refresh_access_token(
                 detail="Invalid refresh token."
                 )
 
-    new_access_token = create_access_token(data={"sub": user_data.email})
+    # Роли и версия токена берутся из базы: после смены ролей клиент получает актуальные claims
+    user = await _get_user_by_email_for_auth(email=user_data.email, session=db)
+    if user is None:
+        raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid refresh token."
+                )
+
+    new_access_token = create_access_token(data=build_access_token_claims(user))
 
     return {"access_token": new_access_token, "token_type": "bearer"}
 
@@ -7,13 +7,13 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from api.v1.routes.actions.auth_actions import get_current_user_from_token
+from api.v1.routes.actions.auth_actions import get_current_principal_from_token
 from api.v1.routes.actions.user_actions import check_user_permissions_admin, check_user_permissions_teahers
 from api.v1.schemas.module_schema import ShowModule, ModuleCreate, DeleteModuleResponse, UpdateModuleRequest, UpdatedModuleResponse
 from api.v1.routes.actions.module_actions import _create_new_module, _get_module_by_id, _delete_module_by_id, _update_module, _get_module_by_slug
-from db.models.user import User 
+from api.v1.schemas.user_schema import TokenClaims
 from db.models.module import Module
-from db.session import get_db
+from db.session import get_db, get_read_db
   
 
 module_router = APIRouter()
@@ -21,7 +21,7 @@ module_router = APIRouter()
 @module_router.post("/", response_model=ShowModule)
 async def create_module(body: ModuleCreate, 
                           session: AsyncSession = Depends(get_db),
-                          current_user: User = Depends(get_current_user_from_token),
+                          current_user: TokenClaims = Depends(get_current_principal_from_token),
                           ) -> ShowModule:
     
     if not check_user_permissions_teahers(current_user=current_user):
@@ -33,7 +33,7 @@ async def create_module(body: ModuleCreate,
 
 @module_router.get("/", response_model=ShowModule)
 async def get_module_by_id(id: int, 
-                         session: AsyncSession = Depends(get_db),
+                         session: AsyncSession = Depends(get_read_db),
 ) -> Union[Module, None]:
     logger.info("Получение модуля по id")
     module = await _get_module_by_id(id, session)
@@ -44,7 +44,7 @@ async def get_module_by_id(id: int,
 
 @module_router.get("/by_slug/{slug}", response_model=ShowModule)
 async def get_module_by_slug(slug: str, 
-                         session: AsyncSession = Depends(get_db),
+                         session: AsyncSession = Depends(get_read_db),
 ) -> Union[Module, None]:
     logger.info("Получение модуля по slug")
     module = await _get_module_by_slug(slug, session)
@@ -56,7 +56,7 @@ async def get_module_by_slug(slug: str,
 @module_router.delete("/", response_model=DeleteModuleResponse)
 async def delete_module(id: int,
                           session: AsyncSession = Depends(get_db),
-                          current_user: User = Depends(get_current_user_from_token),
+                          current_user: TokenClaims = Depends(get_current_principal_from_token),
 ) -> DeleteModuleResponse:
     
     if not check_user_permissions_teahers(current_user=current_user):
@@ -79,7 +79,7 @@ async def delete_module(id: int,
 async def update_module(id: int, 
                             body: UpdateModuleRequest, 
                             session: AsyncSession = Depends(get_db),
-                            current_user: User = Depends(get_current_user_from_token),
+                            current_user: TokenClaims = Depends(get_current_principal_from_token),
 ) -> UpdatedModuleResponse:
     
     if not check_user_permissions_admin(current_user=current_user):
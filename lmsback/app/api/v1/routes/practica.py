@@ -1,16 +1,21 @@
 from pathlib import Path
-from typing import List, Optional
+from typing import Annotated, List, Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from loguru import logger
 
+from api.v1.schemas.lesson_schema import SubmissionCountResponse, SubmissionListQuery
 from api.v1.schemas.practica_schema import (
     PracticaSubmissionResponse,
     PracticaGradeRequest,
+    GradingQueueItem,
+    UngradedCounterResponse,
+    PracticaBulkGradeRequest,
+    PracticaBulkGradeResponse,
 )
-from api.v1.routes.actions.auth_actions import get_current_user_from_token
+from api.v1.routes.actions.auth_actions import get_current_user_from_token, get_current_principal_from_token
 from api.v1.routes.actions.user_actions import check_user_permissions_teahers
 from api.v1.routes.actions.practica_actions import (
     _submit_practica,
@@ -18,10 +23,20 @@ from api.v1.routes.actions.practica_actions import (
     _grade_submission,
     _get_submissions_for_practica,
     _get_submissions_for_course_practicas,
+    _count_submissions_for_practica,
+    _count_submissions_for_course_practicas,
 )
-from db.session import get_db
-from db.models.user import User
+from api.v1.routes.actions.grading_actions import (
+    _bulk_grade_submissions,
+    _get_grading_queue,
+    _get_ungraded_counters,
+)
+from api.v1.routes.actions.export_actions import _export_practica_submissions, PRACTICA_SUBMISSIONS_HEADER
+from db.session import get_db, get_read_db
+from api.v1.schemas.user_schema import TokenClaims, UserPrincipal
 from utils.files import save_multiple_files
+from utils.export import ExportFormat, export_response
+from utils.pagination import NEXT_CURSOR_HEADER
 from core.config import BASE_URL
 
 
@@ -36,7 +51,7 @@ async def submit_practica(
     text_answer: Optional[str] = Form(default=None),
     files: list[UploadFile] = File(default_factory=list),
     session: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user_from_token),
+    current_user: UserPrincipal = Depends(get_current_user_from_token),
 ):
     file_urls: Optional[List[str]] = None
     if files:
@@ -59,8 +74,8 @@ async def submit_practica(
 @practica_router.get("/{lesson_slug}/submissions/me", response_model=PracticaSubmissionResponse)
 async def get_my_practica_submission(
     lesson_slug: str,
-    session: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user_from_token),
+    session: AsyncSession = Depends(get_read_db),
+    current_user: UserPrincipal = Depends(get_current_user_from_token),
 ):
     try:
         return await _get_my_submission(
@@ -77,46 +92,139 @@ async def get_my_practica_submission(
 @practica_router.get("/{lesson_slug}/submissions", response_model=List[PracticaSubmissionResponse])
 async def get_practica_submissions_for_teacher(
     lesson_slug: str,
-    session: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user_from_token),
+    response: Response,
+    query: Annotated[SubmissionListQuery, Query()],
+    session: AsyncSession = Depends(get_read_db),
+    current_user: TokenClaims = Depends(get_current_principal_from_token),
 ):
     if not check_user_permissions_teahers(current_user=current_user):
         logger.error(f"У пользователя {current_user.email} не хватает прав")
         raise HTTPException(status_code=403, detail="Forbidden.")
 
     try:
-        return await _get_submissions_for_practica(lesson_slug=lesson_slug, session=session)
+        items, next_cursor = await _get_submissions_for_practica(
+            lesson_slug=lesson_slug, query=query, session=session,
+        )
     except ValueError as e:
         msg = str(e)
-        raise HTTPException(status_code=404, detail=msg)
+        status_code = 400 if "Некорректн" in msg else 404
+        raise HTTPException(status_code=status_code, detail=msg)
+    if next_cursor is not None:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return items
+
+
+@practica_router.get("/{lesson_slug}/submissions/count", response_model=SubmissionCountResponse)
+async def count_practica_submissions_for_teacher(
+    lesson_slug: str,
+    query: Annotated[SubmissionListQuery, Query()],
+    session: AsyncSession = Depends(get_read_db),
+    current_user: TokenClaims = Depends(get_current_principal_from_token),
+):
+    if not check_user_permissions_teahers(current_user=current_user):
+        logger.error(f"У пользователя {current_user.email} не хватает прав")
+        raise HTTPException(status_code=403, detail="Forbidden.")
+    try:
+        return await _count_submissions_for_practica(lesson_slug=lesson_slug, query=query, session=session)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
 
 
 @practica_router.get("/course/{course_slug}/submissions", response_model=List[PracticaSubmissionResponse])
 async def get_course_practica_submissions_for_teacher(
     course_slug: str,
-    session: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user_from_token),
+    response: Response,
+    query: Annotated[SubmissionListQuery, Query()],
+    session: AsyncSession = Depends(get_read_db),
+    current_user: TokenClaims = Depends(get_current_principal_from_token),
 ):
     if not check_user_permissions_teahers(current_user=current_user):
         logger.error(f"У пользователя {current_user.email} не хватает прав")
         raise HTTPException(status_code=403, detail="Forbidden.")
     try:
-        return await _get_submissions_for_course_practicas(
+        items, next_cursor = await _get_submissions_for_course_practicas(
             course_slug=course_slug,
             teacher_user_id=current_user.user_id,
+            query=query,
+            session=session,
+        )
+    except ValueError as e:
+        msg = str(e)
+        status_code = 400 if "Некорректн" in msg else 404
+        raise HTTPException(status_code=status_code, detail=msg)
+    if next_cursor is not None:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return items
+
+
+@practica_router.get("/course/{course_slug}/submissions/count", response_model=SubmissionCountResponse)
+async def count_course_practica_submissions_for_teacher(
+    course_slug: str,
+    query: Annotated[SubmissionListQuery, Query()],
+    session: AsyncSession = Depends(get_read_db),
+    current_user: TokenClaims = Depends(get_current_principal_from_token),
+):
+    if not check_user_permissions_teahers(current_user=current_user):
+        logger.error(f"У пользователя {current_user.email} не хватает прав")
+        raise HTTPException(status_code=403, detail="Forbidden.")
+    try:
+        return await _count_submissions_for_course_practicas(
+            course_slug=course_slug,
+            teacher_user_id=current_user.user_id,
+            query=query,
             session=session,
         )
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
 
 
+@practica_router.get("/course/{course_slug}/submissions/export")
+async def export_course_practica_submissions(
+    course_slug: str,
+    export_format: ExportFormat = Query(ExportFormat.CSV, alias="format"),
+    session: AsyncSession = Depends(get_read_db),
+    current_user: TokenClaims = Depends(get_current_principal_from_token),
+):
+    if not check_user_permissions_teahers(current_user=current_user):
+        logger.error(f"У пользователя {current_user.email} не хватает прав")
+        raise HTTPException(status_code=403, detail="Forbidden.")
+    try:
+        rows = await _export_practica_submissions(
+            course_slug=course_slug,
+            teacher_user_id=current_user.user_id,
+            session=session,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return export_response(f"practica-submissions-{course_slug}", PRACTICA_SUBMISSIONS_HEADER, rows, export_format)
+
+
+@practica_router.patch("/submissions/grade", response_model=PracticaBulkGradeResponse)
+async def bulk_grade_practica_submissions(
+    body: PracticaBulkGradeRequest,
+    session: AsyncSession = Depends(get_db),
+    current_user: TokenClaims = Depends(get_current_principal_from_token),
+):
+    if not check_user_permissions_teahers(current_user=current_user):
+        logger.error(f"У пользователя {current_user.email} не хватает прав")
+        raise HTTPException(status_code=403, detail="Forbidden.")
+    try:
+        return await _bulk_grade_submissions(
+            items=body.items,
+            teacher_user_id=current_user.user_id,
+            session=session,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @practica_router.patch("/{lesson_slug}/submissions/{student_user_id}/grade", response_model=PracticaSubmissionResponse)
 async def grade_practica_submission(
     lesson_slug: str,
     student_user_id: UUID,
     body: PracticaGradeRequest,
     session: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user_from_token),
+    current_user: TokenClaims = Depends(get_current_principal_from_token),
 ):
     if not check_user_permissions_teahers(current_user=current_user):
         logger.error(f"У пользователя {current_user.email} не хватает прав")
@@ -135,3 +243,43 @@ async def grade_practica_submission(
         status_code = 404 if "не найден" in msg else 400
         raise HTTPException(status_code=status_code, detail=msg)
 
+
+
+@practica_router.get("/queue", response_model=List[GradingQueueItem])
+async def get_grading_queue(
+    response: Response,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    course_slug: Optional[str] = None,
+    session: AsyncSession = Depends(get_read_db),
+    current_user: TokenClaims = Depends(get_current_principal_from_token),
+):
+    if not check_user_permissions_teahers(current_user=current_user):
+        logger.error(f"У пользователя {current_user.email} не хватает прав")
+        raise HTTPException(status_code=403, detail="Forbidden.")
+    try:
+        items, next_cursor = await _get_grading_queue(
+            teacher_user_id=current_user.user_id,
+            limit=limit,
+            cursor=cursor,
+            course_slug=course_slug,
+            session=session,
+        )
+    except ValueError as e:
+        msg = str(e)
+        status_code = 400 if "Некорректн" in msg else 404
+        raise HTTPException(status_code=status_code, detail=msg)
+    if next_cursor is not None:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return items
+
+
+@practica_router.get("/queue/counters", response_model=List[UngradedCounterResponse])
+async def get_ungraded_counters(
+    session: AsyncSession = Depends(get_read_db),
+    current_user: TokenClaims = Depends(get_current_principal_from_token),
+):
+    if not check_user_permissions_teahers(current_user=current_user):
+        logger.error(f"У пользователя {current_user.email} не хватает прав")
+        raise HTTPException(status_code=403, detail="Forbidden.")
+    return await _get_ungraded_counters(teacher_user_id=current_user.user_id, session=session)
@@ -9,9 +9,10 @@ from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from api.v1.routes.actions.auth_actions import get_current_user_from_token
+from api.v1.routes.actions.auth_actions import get_current_user_from_token, _get_user_credentials_by_email
 from api.v1.schemas.user_schema import (ShowUser, UserCreate, DeleteUserResponse, UpdatedUserResponse, 
-                                        UpdateUserRequest, AddRoleRequest, RemoveRoleRequest, SetRolesRequest)
+                                        UpdateUserRequest, AddRoleRequest, RemoveRoleRequest, SetRolesRequest,
+                                        UserPrincipal)
 from api.v1.routes.actions.user_actions import (_change_user_password, _create_new_user, _delete_user, _get_user_by_id, 
                                                 _update_user, check_user_permissions, _get_user_by_email, 
                                                 _get_user_all, _add_role_to_user, _remove_role_from_user,
@@ -29,7 +30,7 @@ USER_UPLOAD_DIR = Path("media/users")
 @user_router.post("/upload-image/")
 async def upload_user_avatar_image(
     file: UploadFile = File(...),
-    current_user: User = Depends(get_current_user_from_token),
+    current_user: UserPrincipal = Depends(get_current_user_from_token),
 ) -> dict:
     image_url = await save_upload_image(file, USER_UPLOAD_DIR, BASE_URL)
     logger.info(f"Аватар загружен пользователем {current_user.email}: {image_url}")
@@ -38,7 +39,7 @@ async def upload_user_avatar_image(
 
 @user_router.get("/me", response_model=ShowUser)
 async def get_current_user(session: AsyncSession = Depends(get_db),
-                           current_user: User = Depends(get_current_user_from_token)
+                           current_user: UserPrincipal = Depends(get_current_user_from_token)
 ) -> Union[User, None]:
     user = await _get_user_by_id(current_user.user_id, session)
     return user
@@ -46,7 +47,7 @@ async def get_current_user(session: AsyncSession = Depends(get_db),
 @user_router.get("/", response_model=ShowUser)
 async def get_user_by_id(user_id: UUID, 
                          session: AsyncSession = Depends(get_db),
-                         current_user: User = Depends(get_current_user_from_token),
+                         current_user: UserPrincipal = Depends(get_current_user_from_token),
 ) -> Union[User, None]:
     logger.info("Получение пользователя по id")
     user = await _get_user_by_id(user_id, session)
@@ -57,7 +58,7 @@ async def get_user_by_id(user_id: UUID,
 
 @user_router.get("/all", response_model=List[ShowUser])
 async def get_user_all(session: AsyncSession = Depends(get_db),
-                       current_user: User = Depends(get_current_user_from_token),
+                       current_user: UserPrincipal = Depends(get_current_user_from_token),
                        ):
     logger.info("Получение пользоватей")
     users = await _get_user_all(session)
@@ -80,7 +81,7 @@ async def create_user(body: UserCreate, session: AsyncSession = Depends(get_db))
 @user_router.delete("/", response_model=DeleteUserResponse)
 async def delete_user(user_id: UUID,
                       session: AsyncSession = Depends(get_db),
-                      current_user: User = Depends(get_current_user_from_token),
+                      current_user: UserPrincipal = Depends(get_current_user_from_token),
 ) -> DeleteUserResponse:
     user_for_deletion = await _get_user_by_id(user_id, session)
     if user_for_deletion is None:
@@ -104,7 +105,7 @@ async def delete_user(user_id: UUID,
 
 @user_router.delete("/me", response_model=DeleteUserResponse)
 async def delete_current_user(session: AsyncSession = Depends(get_db),
-                              current_user: User = Depends(get_current_user_from_token),
+                              current_user: UserPrincipal = Depends(get_current_user_from_token),
 ) -> DeleteUserResponse:
     logger.info(f"Происходит удаление пользователя {current_user.user_id}.")
     deleted_user_id = await _delete_user(current_user.user_id, session)
@@ -118,7 +119,7 @@ async def delete_current_user(session: AsyncSession = Depends(get_db),
 async def update_user_by_id(user_id: UUID, 
                             body: UpdateUserRequest, 
                             session: AsyncSession = Depends(get_db),
-                            current_user: User = Depends(get_current_user_from_token),
+                            current_user: UserPrincipal = Depends(get_current_user_from_token),
 ) -> UpdatedUserResponse:
     updated_user_params = body.dict(exclude_none=True)
     if updated_user_params == {}:
@@ -145,7 +146,7 @@ async def update_user_by_id(user_id: UUID,
 @user_router.patch("/me", response_model=UpdatedUserResponse)
 async def update_current_user(body: UpdateUserRequest, 
                               session: AsyncSession = Depends(get_db),
-                              current_user: User = Depends(get_current_user_from_token),
+                              current_user: UserPrincipal = Depends(get_current_user_from_token),
 ) -> UpdatedUserResponse:
     updated_user_params = body.dict(exclude_none=True)
     if updated_user_params == {}:
@@ -164,7 +165,7 @@ async def change_password_current_user(
         current_password: str,
         new_password: str,
         session: AsyncSession = Depends(get_db),
-        current_user: User = Depends(get_current_user_from_token)
+        current_user: UserPrincipal = Depends(get_current_user_from_token)
 ): 
     logger.info(f"Пользователь {current_user.email} : Смена пароля")
     # Проверка сложности пароля (опционально)
@@ -173,8 +174,13 @@ async def change_password_current_user(
             status_code=400,
             detail={"name": "Пароль должен содержать минимум 8 символов"}
         )
-    # Проверяем текущий пароль (используем current_user из роутера)
-    if not Hasher.verify_password(current_password, current_user.hashed_password):
+    # Хеш пароля не входит в principal — читаем его из базы
+    user_credentials = await _get_user_credentials_by_email(current_user.email, session)
+    if user_credentials is None:
+        raise HTTPException(status_code=404, detail=f"User with id {current_user.user_id} not found.")
+
+    # Проверяем текущий пароль
+    if not await Hasher.verify_password_async(current_password, user_credentials.hashed_password):
         logger.error(f"Неверный текущий пароль для пользователя {current_user.user_id}")
         raise HTTPException(
             status_code=400,
@@ -182,7 +188,7 @@ async def change_password_current_user(
         )
 
     # Проверяем, что новый пароль не совпадает со старым
-    if Hasher.verify_password(new_password, current_user.hashed_password):
+    if await Hasher.verify_password_async(new_password, user_credentials.hashed_password):
         logger.error(f"Новый пароль совпадает со старым для пользователя {current_user.user_id}")
         raise HTTPException(
             status_code=400,
@@ -190,7 +196,7 @@ async def change_password_current_user(
         )
     
     # Хешируем новый пароль
-    hashed_password = Hasher.get_password_hash(new_password)
+    hashed_password = await Hasher.get_password_hash_async(new_password)
 
     try:
         update_user_id = await _change_user_password(
@@ -226,7 +232,7 @@ async def change_password_current_user(
 async def add_role_to_user(user_id: UUID,
                            role_request: AddRoleRequest,
                            session: AsyncSession = Depends(get_db),
-                           current_user: User = Depends(get_current_user_from_token),
+                           current_user: UserPrincipal = Depends(get_current_user_from_token),
 ) -> UpdatedUserResponse:
     target_user = await _get_user_by_id(user_id, session)
     if target_user is None:
@@ -257,7 +263,7 @@ async def add_role_to_user(user_id: UUID,
 async def remove_role_from_user(user_id: UUID,
                            role_request: RemoveRoleRequest,
                            session: AsyncSession = Depends(get_db),
-                           current_user: User = Depends(get_current_user_from_token),
+                           current_user: UserPrincipal = Depends(get_current_user_from_token),
 ) -> UpdatedUserResponse:
     target_user = await _get_user_by_id(user_id, session)
     if target_user is None:
@@ -1,4 +1,5 @@
 import uuid
+from enum import Enum
 from pydantic import BaseModel
 from pydantic import EmailStr
 
@@ -78,3 +79,31 @@ class UpdateSettingsRequest(TunedModel):
     smtp_user: Optional[str] = None
     smtp_password: Optional[str] = None
     smtp_from: Optional[str] = None
+
+
+class UserImportStatus(str, Enum):
+    CREATED = "created"
+    EXISTS = "exists"
+    INVALID = "invalid"
+    DUPLICATE = "duplicate"
+
+
+class UserImportRow(BaseModel):
+    row: int
+    email: str
+    status: UserImportStatus
+    user_id: Optional[uuid.UUID] = None
+    # Только сгенерированный пароль: заданный в файле администратор и так знает
+    password: Optional[str] = None
+    enrollment: Optional[str] = None
+    error: Optional[str] = None
+
+
+class UserImportResponse(BaseModel):
+    total: int
+    created: int
+    exists: int
+    invalid: int
+    duplicate: int
+    enrolled: int
+    rows: List[UserImportRow]
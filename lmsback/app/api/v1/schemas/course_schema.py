@@ -1,5 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from uuid import UUID
+from enum import Enum
 
 from typing import Optional
 from typing import List
@@ -165,3 +166,84 @@ class RemoveTeachersFromCourse(BaseModel):
 class RemoveStudentsFromCourse(BaseModel):
     student_ids: List[UUID]
 
+
+class CourseMembershipPair(BaseModel):
+    user_id: UUID
+    course_id: int
+
+class CourseMembershipRequest(BaseModel):
+    pairs: List[CourseMembershipPair] = Field(..., min_length=1, max_length=1000)
+
+class CourseMembership(BaseModel):
+    user_id: UUID
+    course_id: int
+    is_student: bool
+    is_teacher: bool
+
+
+class RosterRowStatus(str, Enum):
+    ENROLLED = "enrolled"
+    ALREADY_ENROLLED = "already_enrolled"
+    NOT_FOUND = "not_found"
+    INVALID = "invalid"
+    DUPLICATE = "duplicate"
+
+class RosterImportRow(BaseModel):
+    row: int
+    email: str
+    status: RosterRowStatus
+
+class RosterImportResponse(BaseModel):
+    course_id: int
+    total: int
+    enrolled: int
+    already_enrolled: int
+    not_found: int
+    invalid: int
+    duplicate: int
+    rows: List[RosterImportRow]
+
+
+class GradebookStudents(BaseModel):
+    user_id: List[UUID]
+    last_name: List[str]
+    first_name: List[str]
+    email: List[str]
+
+class GradebookLessons(BaseModel):
+    id: List[int]
+    slug: List[str]
+    name: List[str]
+    lesson_type: List[str]
+    # Максимальный балл практики; для остальных уроков — null
+    max_score: List[Optional[int]]
+
+class GradebookCompleted(BaseModel):
+    # Пройденные уроки: student и lesson — номера в students и lessons
+    student: List[int]
+    lesson: List[int]
+
+class GradebookTestScores(BaseModel):
+    student: List[int]
+    lesson: List[int]
+    score: List[float]
+
+class GradebookPracticaScores(BaseModel):
+    student: List[int]
+    lesson: List[int]
+    score: List[Optional[int]]
+    # false — практика сдана и ждёт проверки
+    graded: List[bool]
+
+class GradebookCells(BaseModel):
+    # Только непустые клетки; порядок произвольный, но общий для массивов одной группы
+    completed: GradebookCompleted
+    tests: GradebookTestScores
+    practicas: GradebookPracticaScores
+
+class GradebookResponse(BaseModel):
+    course_id: int
+    course_slug: str
+    students: GradebookStudents
+    lessons: GradebookLessons
+    cells: GradebookCells
@@ -3,6 +3,7 @@ from enum import Enum
 from pydantic import Field
 from pydantic import model_validator
 from datetime import datetime
+from uuid import UUID
 from db.models.lesson import LessonType
 
 from api.v1.schemas.base_schema import TunedModel
@@ -214,6 +215,43 @@ class TestStudentTextAnswer(TunedModel):
     text: str = ""
 
 
+class TestDraftAnswer(TunedModel):
+    question_index: int = Field(..., ge=0)
+    answer: Union[
+        TestStudentSingleAnswer,
+        TestStudentMultipleAnswer,
+        TestStudentTextAnswer,
+        int,
+        List[int],
+        str,
+        None,
+    ] = None
+
+
+class TestDraftSaveRequest(TunedModel):
+    # Версия из последнего ответа сервера; 0 — черновика ещё нет
+    version: int = Field(..., ge=0)
+    # Только изменённые вопросы
+    answers: List[TestDraftAnswer] = Field(..., min_length=1)
+
+
+class TestDraftSaveResponse(TunedModel):
+    version: int
+
+
+class TestDraftAnswerResponse(TunedModel):
+    question_index: int
+    question_type: str
+    selected_option: Optional[int] = None
+    selected_options: Optional[List[int]] = None
+    text_answer: Optional[str] = None
+
+
+class TestDraftResponse(TunedModel):
+    version: int
+    answers: List[TestDraftAnswerResponse]
+
+
 class TestCorrectSingleAnswer(TunedModel):
     answer_type: Literal["single"] = "single"
     correct_option: int = Field(..., ge=0)
@@ -266,4 +304,78 @@ class TestSubmissionTeacherResponse(TunedModel):
     checked_questions: int
     total_score: float
     submitted_at: datetime
-    answers: List[TestSubmissionAnswerTeacherResponse]
+    # None в кратком режиме списка (summary)
+    answers: Optional[List[TestSubmissionAnswerTeacherResponse]] = None
+
+
+class SubmissionListQuery(TunedModel):
+    """Параметры списков отправок для преподавателя. Без limit возвращается весь список."""
+    limit: Optional[int] = Field(default=None, ge=1, le=500)
+    # Значение заголовка X-Next-Cursor предыдущей страницы
+    cursor: Optional[str] = None
+    # Урок внутри курса (для списков по курсу)
+    lesson_slug: Optional[str] = None
+    student_id: Optional[UUID] = None
+    graded: Optional[bool] = None
+    submitted_from: Optional[datetime] = None
+    # Не включительно
+    submitted_to: Optional[datetime] = None
+    # Без ответов: для тестов — без answers, для практик — без текста, файлов и отзыва
+    summary: bool = False
+
+
+class SubmissionCountResponse(TunedModel):
+    total: int
+
+
+class RegradeJobResponse(TunedModel):
+    id: int
+    course_id: int
+    test_lesson_id: Optional[int] = None
+    status: str
+    total: int
+    processed: int
+    # Отправок, у которых изменилась оценка
+    changed: int
+    progress: float
+    error: Optional[str] = None
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+
+
+class TestOptionStat(TunedModel):
+    option: int
+    text: Optional[str] = None
+    is_correct: bool
+    count: int
+    # Доля ответивших на вопрос, выбравших вариант
+    share: float
+
+
+class TestWrongAnswerStat(TunedModel):
+    answer: str
+    count: int
+
+
+class TestItemAnalysis(TunedModel):
+    question_index: int
+    question_type: Optional[str] = None
+    prompt: Optional[str] = None
+    answered: int
+    # Ответов с автопроверкой
+    attempts: int
+    correct: int
+    # Доля правильных ответов (p-value); None, если автопроверки не было
+    difficulty: Optional[float] = None
+    # Точечно-бисериальная корреляция с баллом за остальные вопросы
+    discrimination: Optional[float] = None
+    options: List[TestOptionStat] = Field(default_factory=list)
+    wrong_answers: List[TestWrongAnswerStat] = Field(default_factory=list)
+
+
+class TestAnalyticsResponse(TunedModel):
+    test_lesson_id: int
+    lesson_slug: str
+    submissions: int
+    mean_score: Optional[float] = None
+    items: List[TestItemAnalysis]
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from enum import Enum
 from typing import Optional, List
 from uuid import UUID
 from datetime import datetime
@@ -14,6 +15,35 @@ class PracticaGradeRequest(TunedModel):
     feedback: Optional[str] = Field(default=None, min_length=1)
 
 
+class PracticaBulkGradeItem(PracticaGradeRequest):
+    lesson_slug: str
+    student_user_id: UUID
+
+
+class PracticaBulkGradeRequest(TunedModel):
+    items: List[PracticaBulkGradeItem] = Field(..., min_length=1)
+
+
+class BulkGradeStatus(str, Enum):
+    GRADED = "graded"
+    NOT_FOUND = "not_found"
+    DUPLICATE = "duplicate"
+
+
+class PracticaBulkGradeResult(TunedModel):
+    """Итог по одной оценке запроса; порядок результатов совпадает с порядком items"""
+    lesson_slug: str
+    student_user_id: UUID
+    status: BulkGradeStatus
+    submission_id: Optional[int] = None
+    detail: Optional[str] = None
+
+
+class PracticaBulkGradeResponse(TunedModel):
+    graded: int
+    results: List[PracticaBulkGradeResult]
+
+
 class PracticaSubmissionResponse(TunedModel):
     id: int
     practica_id: int
@@ -33,3 +63,25 @@ class PracticaSubmissionResponse(TunedModel):
     updated_at: datetime
     is_graded: bool
 
+
+
+class GradingQueueItem(TunedModel):
+    """Непроверенная отправка практики в очереди преподавателя"""
+    id: int
+    practica_id: int
+    lesson_slug: str
+    lesson_name: str
+    course_id: int
+    course_slug: str
+    user_id: UUID
+    user_email: Optional[str] = None
+    user_first_name: Optional[str] = None
+    user_last_name: Optional[str] = None
+    submitted_at: datetime
+
+
+class UngradedCounterResponse(TunedModel):
+    course_id: int
+    course_slug: str
+    course_name: str
+    ungraded: int
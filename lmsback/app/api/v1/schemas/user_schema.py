@@ -146,6 +146,36 @@ class Token(BaseModel):
 class TokenData(BaseModel):
     email: str
 
+class UserPrincipal(TunedModel):
+    """
+    Облегчённый пользователь для аутентификации: только собственные поля,
+    без связанных курсов, диалогов и хеша пароля.
+    """
+    user_id: uuid.UUID
+    email: str
+    last_name: str
+    first_name: str
+    patronymic: Optional[str] = None
+    roles: List[str]
+    avatar: Optional[str] = None
+    is_active: bool
+    token_version: int
+
+class TokenClaims(BaseModel):
+    """
+    Подписанные claims access-токена.
+    Достаточно для проверки ролей без обращения к базе.
+    """
+    sub: str
+    user_id: uuid.UUID
+    roles: List[str]
+    token_version: int
+    token_type: str = "access"
+
+    @property
+    def email(self) -> str:
+        return self.sub
+
 class AddRoleRequest(BaseModel):
     role: PortalRole
 
@@ -0,0 +1,87 @@
+"""
+Автопроверка теста: разбор правильных ответов на каждую проверку против скомпилированного ключа.
+
+Запуск из lmsback/app:
+    python -m benchmarks.answer_key [--number 20000] [--questions 40]
+"""
+import argparse
+import timeit
+from types import SimpleNamespace
+
+from api.v1.routes.actions.lesson_actions import _normalize_student_answer
+from utils.grading import compile_answer_key, grade_answers
+
+
+def _make_test(count: int):
+    questions, correct, answers = [], {}, []
+    for idx in range(count):
+        kind = ("single", "multiple", "text")[idx % 3]
+        questions.append({"prompt": f"Вопрос {idx}", "question_type": kind, "options": ["a", "b", "c", "d"]})
+        if kind == "single":
+            correct[idx] = SimpleNamespace(correct_option=1, correct_options=None, correct_text=None)
+            answers.append({"answer_type": "single", "selected_option": idx % 2})
+        elif kind == "multiple":
+            correct[idx] = SimpleNamespace(correct_option=None, correct_options=[0, 2], correct_text=None)
+            answers.append({"answer_type": "multiple", "selected_options": [0, 2]})
+        else:
+            correct[idx] = SimpleNamespace(correct_option=None, correct_options=None, correct_text=" Москва ")
+            answers.append({"answer_type": "text", "text": "москва"})
+    return questions, correct, answers
+
+
+def _grade_per_request(questions, correct_answers_map, answers):
+    """Проверка в том виде, как она шла до скомпилированного ключа."""
+    checked, total_score, results = 0, 0.0, []
+    for idx, q in enumerate(questions):
+        q_type = q.get("question_type") or "single"
+        user_answer = _normalize_student_answer(answers[idx] if idx < len(answers) else None, q_type)
+        score, is_correct = 0.0, None
+        correct_row = correct_answers_map.get(idx)
+        if q_type == "single":
+            correct = correct_row.correct_option if correct_row is not None else None
+            if correct is not None and isinstance(user_answer, int):
+                is_correct = user_answer == correct
+        elif q_type == "multiple":
+            correct = correct_row.correct_options if correct_row is not None else None
+            if isinstance(correct, list) and all(isinstance(i, int) for i in correct) and isinstance(user_answer, list):
+                is_correct = {int(i) for i in user_answer if isinstance(i, int)} == set(correct)
+        elif q_type == "text":
+            correct_text = correct_row.correct_text if correct_row is not None else None
+            if isinstance(correct_text, str) and isinstance(user_answer, str) and correct_text.strip():
+                is_correct = user_answer.strip().lower() == correct_text.strip().lower()
+        if is_correct is not None:
+            checked += 1
+            score = 1.0 if is_correct else 0.0
+        total_score += score
+        results.append((is_correct, score))
+    return checked, total_score, results
+
+
+def main(number: int, questions_count: int):
+    questions, correct, answers = _make_test(questions_count)
+    key = compile_answer_key(1, None, questions, correct)
+
+    def compiled():
+        user_answers = [_normalize_student_answer(answer, q_type)
+                        for q_type, answer in zip(key.question_types, answers)]
+        return grade_answers(key, user_answers)
+
+    expected = _grade_per_request(questions, correct, answers)
+    result = compiled()
+    assert (result.checked, result.total_score, result.results) == expected
+
+    results = {
+        "по строкам ответов": timeit.timeit(lambda: _grade_per_request(questions, correct, answers), number=number),
+        "компиляция ключа": timeit.timeit(lambda: compile_answer_key(1, None, questions, correct), number=number),
+        "ключ из кэша": timeit.timeit(compiled, number=number),
+    }
+    for name, seconds in results.items():
+        print(f"{name:<22}{seconds / number * 1e6:>10.2f} us/op")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--number", type=int, default=20000)
+    parser.add_argument("--questions", type=int, default=40)
+    args = parser.parse_args()
+    main(args.number, args.questions)
@@ -0,0 +1,82 @@
+"""
+Количество SQL-запросов на аутентификацию одного запроса.
+
+Сравнивает старую загрузку пользователя целиком (select(User) + selectin
+по teacher_courses/student_courses) с облегчённым principal.
+
+Запуск из lmsback/app:
+    python -m benchmarks.auth_query_count teacher@example.com [--repeat 200]
+"""
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import event
+
+from api.v1.schemas.user_schema import UserPrincipal
+from db.session import async_session, engine
+from services.user_service import UserDAL
+
+
+class StatementCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+
+async def _load_full_user(email: str):
+    async with async_session() as session:
+        async with session.begin():
+            user = await UserDAL(session).get_user_by_email(email=email)
+            return len(user.teacher_courses) + len(user.student_courses)
+
+
+async def _load_principal(email: str):
+    async with async_session() as session:
+        async with session.begin():
+            user_row = await UserDAL(session).get_user_principal_by_email(email=email)
+            UserPrincipal.model_validate(user_row)
+            return 0
+
+
+async def _measure(loader, email: str, repeat: int) -> dict:
+    counter = StatementCounter()
+    event.listen(engine.sync_engine, "before_cursor_execute", counter)
+    try:
+        courses = await loader(email)
+        counter.count = 0
+        started = time.perf_counter()
+        for _ in range(repeat):
+            await loader(email)
+        elapsed = time.perf_counter() - started
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", counter)
+
+    return {
+        "queries_per_request": counter.count / repeat,
+        "course_rows": courses,
+        "ms_per_request": elapsed / repeat * 1000,
+    }
+
+
+async def main(email: str, repeat: int):
+    before = await _measure(_load_full_user, email, repeat)
+    after = await _measure(_load_principal, email, repeat)
+    await engine.dispose()
+
+    print(f"{'':<12}{'queries':>10}{'course rows':>14}{'ms':>10}")
+    for name, result in (("full User", before), ("principal", after)):
+        print(
+            f"{name:<12}{result['queries_per_request']:>10.1f}"
+            f"{result['course_rows']:>14}{result['ms_per_request']:>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("email")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.email, args.repeat))
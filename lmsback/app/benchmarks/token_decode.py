@@ -0,0 +1,62 @@
+"""
+Проверка JWT на каждый запрос: jwt.decode против кэша проверенных токенов.
+
+Запуск из lmsback/app:
+    python -m benchmarks.token_decode [--number 20000] [--tokens 1000]
+"""
+import argparse
+import timeit
+import uuid
+
+from jose import jwt
+
+from core.config import SECRET_KEY, ALGORITHM
+from utils.cache import token_claims_cache
+from utils.security import create_access_token, decode_token
+
+
+def _make_tokens(count: int) -> list[str]:
+    return [
+        create_access_token(data={
+            "sub": f"user{i}@example.com",
+            "user_id": str(uuid.uuid4()),
+            "roles": ["ROLE_PORTAL_USER"],
+            "token_version": 0,
+        })
+        for i in range(count)
+    ]
+
+
+def main(number: int, tokens_count: int):
+    tokens = _make_tokens(tokens_count)
+    state = {"i": 0}
+
+    def next_token() -> str:
+        state["i"] = (state["i"] + 1) % tokens_count
+        return tokens[state["i"]]
+
+    def uncached():
+        jwt.decode(next_token(), SECRET_KEY, algorithms=[ALGORITHM])
+
+    def cached():
+        decode_token(next_token())
+
+    token_claims_cache.clear()
+    for token in tokens:
+        decode_token(token)
+
+    results = {
+        "jwt.decode": timeit.timeit(uncached, number=number),
+        "decode_token (кэш)": timeit.timeit(cached, number=number),
+    }
+    for name, seconds in results.items():
+        print(f"{name:<20}{seconds / number * 1e6:>10.2f} us/op")
+    print(token_claims_cache.stats())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--number", type=int, default=20000)
+    parser.add_argument("--tokens", type=int, default=1000)
+    args = parser.parse_args()
+    main(args.number, args.tokens)
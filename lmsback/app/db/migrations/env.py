@@ -17,6 +17,7 @@ if config.config_file_name is not None:
 
 # add your model's MetaData object here
 # for 'autogenerate' support
+from core.config import get_engine_settings
 from db.base import Base
 
 from db.models.user import User
@@ -43,6 +44,8 @@ target_metadata = Base.metadata
 
 url = os.environ.get("ALEMBIC_DATABASE_URL", config.get_main_option("sqlalchemy.url"))
 
+engine_settings = get_engine_settings("migrations")
+
 
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode.
@@ -75,10 +78,14 @@ def run_migrations_online() -> None:
     and associate a connection with the context.
 
     """
+    section = config.get_section(config.config_ini_section, {})
+    section["sqlalchemy.url"] = url
     connectable = engine_from_config(
-        config.get_section(config.config_ini_section, {}),
+        section,
         prefix="sqlalchemy.",
         poolclass=pool.NullPool,
+        echo=engine_settings.echo,
+        connect_args={"options": f"-c statement_timeout={engine_settings.statement_timeout_ms}"},
     )
 
     with connectable.connect() as connection:
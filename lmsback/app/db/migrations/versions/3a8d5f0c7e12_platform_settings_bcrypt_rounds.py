@@ -0,0 +1,28 @@
+"""platform settings bcrypt rounds
+
+Revision ID: 3a8d5f0c7e12
+Revises: c7e1a3d95b24
+Create Date: 2026-10-19 10:20:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3a8d5f0c7e12'
+down_revision: Union[str, Sequence[str], None] = 'c7e1a3d95b24'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('platform_settings', sa.Column('bcrypt_rounds', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('platform_settings', 'bcrypt_rounds')
@@ -0,0 +1,40 @@
+"""regrade job heartbeat
+
+Revision ID: 6e2f9b4d1a87
+Revises: 3a8d5f0c7e12
+Create Date: 2026-10-19 11:05:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6e2f9b4d1a87'
+down_revision: Union[str, Sequence[str], None] = '3a8d5f0c7e12'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('test_regrade_jobs', sa.Column('heartbeat_at', sa.DateTime(), nullable=True))
+    # Незавершённые задачи без обработчика (упавшие до появления heartbeat) закрываем,
+    # иначе они нарушат уникальный индекс и навсегда займут свою область
+    op.execute("""
+        UPDATE test_regrade_jobs
+        SET status = 'failed', error = 'Прерван: обработчик остановлен', finished_at = now() at time zone 'utc'
+        WHERE status IN ('pending', 'running')
+    """)
+    op.create_index('uq_test_regrade_jobs_active_scope', 'test_regrade_jobs',
+                    ['course_id', sa.text('coalesce(test_lesson_id, 0)')], unique=True,
+                    postgresql_where=sa.text("status IN ('pending', 'running')"))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('uq_test_regrade_jobs_active_scope', table_name='test_regrade_jobs',
+                  postgresql_where=sa.text("status IN ('pending', 'running')"))
+    op.drop_column('test_regrade_jobs', 'heartbeat_at')
@@ -0,0 +1,34 @@
+"""submission keyset indexes
+
+Revision ID: 9d4a6c2e8b51
+Revises: 5b9e3c7a2f18
+Create Date: 2026-10-18 21:40:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d4a6c2e8b51'
+down_revision: Union[str, Sequence[str], None] = '5b9e3c7a2f18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_practica_submissions_practica_submitted', 'practica_submissions',
+                    ['practica_id', 'submitted_at', 'id'], unique=False)
+    op.create_index('ix_test_submissions_lesson_submitted', 'test_submissions',
+                    ['test_lesson_id', 'submitted_at', 'id'], unique=False,
+                    postgresql_where=sa.text('NOT is_draft'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_test_submissions_lesson_submitted', table_name='test_submissions',
+                  postgresql_where=sa.text('NOT is_draft'))
+    op.drop_index('ix_practica_submissions_practica_submitted', table_name='practica_submissions')
@@ -0,0 +1,54 @@
+"""hot filter indexes
+
+Revision ID: a7c1e5d93b20
+Revises: 4d7e2b9a1c3f
+Create Date: 2026-10-18 14:20:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7c1e5d93b20'
+down_revision: Union[str, Sequence[str], None] = '4d7e2b9a1c3f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(op.f('ix_lessons_module_id'), 'lessons', ['module_id'], unique=False)
+    op.create_index('ix_lessons_module_active', 'lessons', ['module_id', 'display_order'], unique=False,
+                    postgresql_where=sa.text('is_active'))
+    op.create_index(op.f('ix_modules_course_id'), 'modules', ['course_id'], unique=False)
+    op.create_index('ix_modules_course_active', 'modules', ['course_id', 'display_order'], unique=False,
+                    postgresql_where=sa.text('is_active'))
+    op.create_index('ix_courses_active', 'courses', ['display_order'], unique=False,
+                    postgresql_where=sa.text('is_active'))
+    op.create_index('ix_student_courses_course_id', 'student_courses', ['course_id'], unique=False)
+    op.create_index('ix_teacher_courses_course_id', 'teacher_courses', ['course_id'], unique=False)
+    # lesson_id в конце индекса: список пройденных уроков читается без обращения к таблице
+    op.create_index('ix_lesson_progress_user_completed', 'lesson_progress', ['user_id', 'is_completed', 'lesson_id'],
+                    unique=False)
+
+    # (dialog_id, created_at) покрывает и выборку по dialog_id, старый индекс не нужен
+    op.create_index('idx_message_dialog_created', 'messages', ['dialog_id', 'created_at'], unique=False)
+    op.drop_index('idx_message_dialog', table_name='messages')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index('idx_message_dialog', 'messages', ['dialog_id'], unique=False)
+    op.drop_index('idx_message_dialog_created', table_name='messages')
+
+    op.drop_index('ix_lesson_progress_user_completed', table_name='lesson_progress')
+    op.drop_index('ix_teacher_courses_course_id', table_name='teacher_courses')
+    op.drop_index('ix_student_courses_course_id', table_name='student_courses')
+    op.drop_index('ix_courses_active', table_name='courses', postgresql_where=sa.text('is_active'))
+    op.drop_index('ix_modules_course_active', table_name='modules', postgresql_where=sa.text('is_active'))
+    op.drop_index(op.f('ix_modules_course_id'), table_name='modules')
+    op.drop_index('ix_lessons_module_active', table_name='lessons', postgresql_where=sa.text('is_active'))
+    op.drop_index(op.f('ix_lessons_module_id'), table_name='lessons')
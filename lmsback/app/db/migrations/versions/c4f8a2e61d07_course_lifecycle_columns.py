@@ -0,0 +1,51 @@
+"""course lifecycle columns
+
+Revision ID: c4f8a2e61d07
+Revises: a7c1e5d93b20
+Create Date: 2026-10-18 15:40:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4f8a2e61d07'
+down_revision: Union[str, Sequence[str], None] = 'a7c1e5d93b20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Выражения совпадают с db/models/course.py на момент миграции
+IS_PUBLISHED_SQL = "status @> ARRAY['PUBLISHED']::varchar[]"
+STATUS_ORDER_SQL = (
+    "CASE status[1] WHEN 'PUBLISHED' THEN 1 WHEN 'DRAFT' THEN 2 WHEN 'TRASH' THEN 3 ELSE 4 END"
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Статус курса — первый элемент массива: пустые и неизвестные значения становятся черновиком
+    op.execute(
+        "UPDATE courses SET status = ARRAY['DRAFT']::varchar[] "
+        "WHERE cardinality(status) = 0 OR status[1] IS NULL "
+        "OR status[1] NOT IN ('DRAFT', 'PUBLISHED', 'TRASH')"
+    )
+
+    op.add_column('courses', sa.Column('is_published', sa.Boolean(),
+                                       sa.Computed(IS_PUBLISHED_SQL, persisted=True), nullable=True))
+    op.add_column('courses', sa.Column('status_order', sa.Integer(),
+                                       sa.Computed(STATUS_ORDER_SQL, persisted=True), nullable=True))
+
+    op.create_index('ix_courses_published', 'courses', ['display_order'], unique=False,
+                    postgresql_where=sa.text('is_active AND is_published'))
+    op.create_index('ix_courses_status', 'courses', ['status'], unique=False, postgresql_using='gin')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_courses_status', table_name='courses', postgresql_using='gin')
+    op.drop_index('ix_courses_published', table_name='courses', postgresql_where=sa.text('is_active AND is_published'))
+    op.drop_column('courses', 'status_order')
+    op.drop_column('courses', 'is_published')
@@ -0,0 +1,48 @@
+"""practica grading queue
+
+Revision ID: c7e1a3d95b24
+Revises: 9d4a6c2e8b51
+Create Date: 2026-10-18 23:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7e1a3d95b24'
+down_revision: Union[str, Sequence[str], None] = '9d4a6c2e8b51'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Частичный индекс и очередь считают непроверенными только is_graded = false
+    op.execute("UPDATE practica_submissions SET is_graded = false WHERE is_graded IS NULL")
+    op.create_index('ix_practica_submissions_ungraded', 'practica_submissions',
+                    ['submitted_at', 'id'], unique=False,
+                    postgresql_where=sa.text('NOT is_graded'))
+    op.create_table('course_grading_counters',
+                    sa.Column('course_id', sa.Integer(), nullable=False),
+                    sa.Column('ungraded_practicas', sa.Integer(), server_default=sa.text('0'), nullable=False),
+                    sa.ForeignKeyConstraint(['course_id'], ['courses.id'], ondelete='CASCADE'),
+                    sa.PrimaryKeyConstraint('course_id'))
+    op.execute("""
+        INSERT INTO course_grading_counters (course_id, ungraded_practicas)
+        SELECT modules.course_id, count(*)
+        FROM practica_submissions
+        JOIN lessons ON lessons.id = practica_submissions.practica_id
+        JOIN modules ON modules.id = lessons.module_id
+        WHERE NOT practica_submissions.is_graded
+        GROUP BY modules.course_id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('course_grading_counters')
+    op.drop_index('ix_practica_submissions_ungraded', table_name='practica_submissions',
+                  postgresql_where=sa.text('NOT is_graded'))
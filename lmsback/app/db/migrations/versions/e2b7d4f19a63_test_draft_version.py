@@ -0,0 +1,31 @@
+"""test draft version
+
+Revision ID: e2b7d4f19a63
+Revises: c4f8a2e61d07
+Create Date: 2026-10-18 18:05:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2b7d4f19a63'
+down_revision: Union[str, Sequence[str], None] = 'c4f8a2e61d07'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        'test_submissions',
+        sa.Column('draft_version', sa.Integer(), server_default='0', nullable=False),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('test_submissions', 'draft_version')
@@ -10,6 +10,9 @@ from sqlalchemy import DateTime
 from sqlalchemy import Table
 from sqlalchemy import ForeignKey
 from sqlalchemy import DECIMAL
+from sqlalchemy import Index
+from sqlalchemy import Computed
+from sqlalchemy import text
 from sqlalchemy.orm import relationship
 
 from db.base import Base
@@ -20,11 +23,14 @@ category_courses = Table('category_courses', Base.metadata,
 )
 teacher_courses = Table('teacher_courses', Base.metadata,
     Column('teacher_id', ForeignKey('users.user_id'), primary_key=True),
-    Column('course_id', ForeignKey('courses.id'), primary_key=True)
+    Column('course_id', ForeignKey('courses.id'), primary_key=True),
+    # Первичный ключ начинается с teacher_id, для выборки по курсу нужен отдельный индекс
+    Index('ix_teacher_courses_course_id', 'course_id'),
 )
 student_courses = Table('student_courses', Base.metadata,
     Column('student_id', ForeignKey('users.user_id'), primary_key=True),
-    Column('course_id', ForeignKey('courses.id'), primary_key=True)
+    Column('course_id', ForeignKey('courses.id'), primary_key=True),
+    Index('ix_student_courses_course_id', 'course_id'),
 )
 
 class Status(str, Enum):
@@ -33,6 +39,16 @@ class Status(str, Enum):
     TRASH = "TRASH"
 
 
+# Порядок статусов в списках курсов; статус курса — первый элемент массива
+STATUS_ORDER = {Status.PUBLISHED: 1, Status.DRAFT: 2, Status.TRASH: 3}
+
+IS_PUBLISHED_SQL = f"status @> ARRAY['{Status.PUBLISHED.value}']::varchar[]"
+STATUS_ORDER_SQL = "CASE status[1] {} ELSE {} END".format(
+    " ".join(f"WHEN '{status.value}' THEN {order}" for status, order in STATUS_ORDER.items()),
+    len(STATUS_ORDER) + 1,
+)
+
+
 class Course(Base):
     __tablename__ = "courses"
 
@@ -44,6 +60,9 @@ class Course(Base):
     image = Column(String, nullable=True)
     price = Column(DECIMAL(precision=10, scale=2), nullable=False, default=0)
     status = Column(ARRAY(String), nullable=False)
+    # Вычисляются базой из status, по ним фильтруют и сортируют вместо выражений над массивом
+    is_published = Column(Boolean, Computed(IS_PUBLISHED_SQL, persisted=True))
+    status_order = Column(Integer, Computed(STATUS_ORDER_SQL, persisted=True))
     display_order = Column(Integer, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -57,3 +76,9 @@ class Course(Base):
 
     dialogs = relationship("Dialog", back_populates='course', cascade='all, delete-orphan')
 
+    __table_args__ = (
+        Index('ix_courses_active', 'display_order', postgresql_where=text('is_active')),
+        Index('ix_courses_published', 'display_order', postgresql_where=text('is_active AND is_published')),
+        Index('ix_courses_status', 'status', postgresql_using='gin'),
+    )
+
@@ -57,5 +57,5 @@ class Message(Base):
     sender = relationship("User", back_populates="messages")
 
     __table_args__ = (
-        Index('idx_message_dialog', 'dialog_id'),
+        Index('idx_message_dialog_created', 'dialog_id', 'created_at'),
     )
@@ -11,6 +11,8 @@ from sqlalchemy import DateTime
 from sqlalchemy import ForeignKey
 from sqlalchemy import JSON
 from sqlalchemy import UniqueConstraint
+from sqlalchemy import Index
+from sqlalchemy import text
 from sqlalchemy.orm import relationship
 
 from db.base import Base
@@ -27,7 +29,7 @@ class LessonBase(Base):
     __tablename__ = "lessons"
 
     id = Column(Integer, primary_key=True, autoincrement=True)
-    module_id = Column(Integer, ForeignKey("modules.id"))
+    module_id = Column(Integer, ForeignKey("modules.id"), index=True)
     name = Column(String, nullable=False)
     slug = Column(String, nullable=False, unique=True)
     display_order = Column(Integer, nullable=False)
@@ -46,6 +48,11 @@ class LessonBase(Base):
         
     modules = relationship("Module", back_populates="lessons", order_by="Module.display_order", lazy="selectin")
 
+    __table_args__ = (
+        # Почти все выборки уроков идут по модулю и только по активным
+        Index("ix_lessons_module_active", "module_id", "display_order", postgresql_where=text("is_active")),
+    )
+
 class Lecture(LessonBase):
     __tablename__ = "lectures"
 
@@ -138,9 +145,21 @@ class PracticaSubmission(Base):
 
     __table_args__ = (
         UniqueConstraint("practica_id", "user_id", name="uq_user_practica"),
+        # Списки отправок для преподавателя: keyset-пагинация по (submitted_at, id)
+        Index("ix_practica_submissions_practica_submitted", "practica_id", "submitted_at", "id"),
+        # Очередь проверки: самые старые непроверенные отправки
+        Index("ix_practica_submissions_ungraded", "submitted_at", "id", postgresql_where=text("NOT is_graded")),
     )
 
 
+class CourseGradingCounter(Base):
+    """Счётчик непроверенных отправок практик курса; ведётся при отправке и оценивании"""
+    __tablename__ = "course_grading_counters"
+
+    course_id = Column(Integer, ForeignKey("courses.id", ondelete="CASCADE"), primary_key=True)
+    ungraded_practicas = Column(Integer, nullable=False, default=0, server_default=text("0"))
+
+
 class TestCorrectAnswer(Base):
     __tablename__ = "test_correct_answers"
 
@@ -175,6 +194,8 @@ class TestSubmission(Base):
     total_score = Column(Float, nullable=False, default=0.0)
     submitted_at = Column(DateTime, default=datetime.utcnow)
     is_draft = Column(Boolean, default=False, nullable=False)
+    # Версия черновика: растёт на каждом автосохранении, устаревшие записи отклоняются
+    draft_version = Column(Integer, nullable=False, default=0, server_default="0")
 
     test_lesson = relationship("TestLesson", back_populates="submissions")
     answers = relationship(
@@ -185,6 +206,8 @@ class TestSubmission(Base):
 
     __table_args__ = (
         UniqueConstraint("test_lesson_id", "user_id", "is_draft", name="uq_user_test_submission_draft"),
+        Index("ix_test_submissions_lesson_submitted", "test_lesson_id", "submitted_at", "id",
+              postgresql_where=text("NOT is_draft")),
     )
 
 
@@ -209,6 +232,41 @@ class TestSubmissionAnswer(Base):
         UniqueConstraint("submission_id", "question_index", name="uq_test_submission_answer"),
     )
 
+class RegradeStatus(str, Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+
+class TestRegradeJob(Base):
+    """Пересчёт оценок отправок теста (или всех тестов курса) после исправления ключа ответов"""
+    __tablename__ = "test_regrade_jobs"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    course_id = Column(Integer, ForeignKey("courses.id"), nullable=False)
+    # None — пересчитываются все тесты курса
+    test_lesson_id = Column(Integer, ForeignKey("test_lessons.id"), nullable=True)
+    created_by = Column(UUID, ForeignKey("users.user_id"), nullable=False)
+
+    status = Column(String, nullable=False, default=RegradeStatus.PENDING.value)
+    total = Column(Integer, nullable=False, default=0)
+    processed = Column(Integer, nullable=False, default=0)
+    changed = Column(Integer, nullable=False, default=0)
+    error = Column(Text, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    # Обновляется на каждой пачке: задача без обновлений дольше REGRADE_STALE_SECONDS считается упавшей
+    heartbeat_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        # Одна незавершённая задача на область (тест или весь курс — test_lesson_id IS NULL)
+        Index("uq_test_regrade_jobs_active_scope", "course_id", text("coalesce(test_lesson_id, 0)"),
+              unique=True, postgresql_where=text("status IN ('pending', 'running')")),
+    )
+
+
 class LessonProgress(Base):
     __tablename__ = "lesson_progress"
 
@@ -220,6 +278,7 @@ class LessonProgress(Base):
 
     __table_args__ = (
         UniqueConstraint("user_id", "lesson_id", name="uq_user_lesson"),
+        Index("ix_lesson_progress_user_completed", "user_id", "is_completed", "lesson_id"),
     )
 
 class LessonMaterial(Base):
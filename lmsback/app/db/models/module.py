@@ -6,6 +6,8 @@ from sqlalchemy import String
 from sqlalchemy import Integer
 from sqlalchemy import DateTime
 from sqlalchemy import ForeignKey
+from sqlalchemy import Index
+from sqlalchemy import text
 from sqlalchemy.orm import relationship
 from sqlalchemy.util import walk_subclasses
 
@@ -15,7 +17,7 @@ class Module(Base):
     __tablename__ = "modules"
 
     id = Column(Integer, primary_key=True, autoincrement=True)
-    course_id = Column(Integer, ForeignKey("courses.id"))
+    course_id = Column(Integer, ForeignKey("courses.id"), index=True)
     name = Column(String, nullable=False)
     slug = Column(String, nullable=False, unique=True)
     description = Column(Text, nullable=True)
@@ -29,3 +31,7 @@ class Module(Base):
                            back_populates="modules", 
                            order_by="LessonBase.display_order",
                            lazy="selectin")
+
+    __table_args__ = (
+        Index("ix_modules_course_active", "course_id", "display_order", postgresql_where=text("is_active")),
+    )
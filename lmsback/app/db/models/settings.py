@@ -21,5 +21,7 @@ class PlatformSettings(Base):
     smtp_user = Column(String, nullable=True)
     smtp_password = Column(String, nullable=True)  # хранить зашифрованным
     smtp_from = Column(String, nullable=True)
+    # Стоимость bcrypt, подобранная при первом старте (если BCRYPT_ROUNDS не задан)
+    bcrypt_rounds = Column(Integer, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
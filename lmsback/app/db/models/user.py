@@ -5,6 +5,7 @@ from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy import Column
 from sqlalchemy import Boolean
 from sqlalchemy import String
+from sqlalchemy import Integer
 from sqlalchemy import Date
 from sqlalchemy import DECIMAL
 
@@ -41,6 +42,8 @@ class User(Base):
     balance = Column(DECIMAL(precision=10, scale=2), nullable=False, default=0)
     is_active = Column(Boolean, default=True)
     hashed_password = Column(String, nullable=False)
+    # Увеличивается при смене ролей/деактивации — старые access-токены становятся недействительными
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")
 
     teacher_courses = relationship("Course", 
                                    secondary="teacher_courses", 
@@ -1,25 +1,178 @@
-from typing import Generator
+import time
+from typing import Any, Generator, Optional
+from uuid import UUID
 
-from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi.requests import HTTPConnection
+from jose import JWTError
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
 from sqlalchemy.ext.asyncio import create_async_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.util.queue import AsyncAdaptedQueue
 
-from core.config import REAL_DATABASE_URL
+from core.config import (REAL_DATABASE_URL, READ_DATABASE_URL, SQL_STATS_ENABLED, EngineSettings,
+                         get_engine_settings)
+from utils.cache import invalidate_cached_user, is_pinned_to_primary, pin_to_primary
+from utils.metrics import LatencyStats, register_metrics_source
+from utils.security import decode_token
+from utils.sql_stats import instrument_engine
+
+
+class _MeasuredQueue(AsyncAdaptedQueue):
+    """Очередь свободных соединений пула: замеряет ожидание соединения из очереди."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait = LatencyStats()
+
+    def get(self, block: bool = True, timeout: Optional[float] = None):
+        started_at = time.perf_counter()
+        try:
+            return super().get(block, timeout)
+        finally:
+            self.wait.observe(time.perf_counter() - started_at)
+
+
+class MeasuredAsyncQueuePool(AsyncAdaptedQueuePool):
+    """
+    Пул соединений, замеряющий время ожидания свободного соединения.
+    Замер идёт по очереди пула, поэтому открытие новых соединений
+    (пока пул не заполнен до pool_size + max_overflow) в него не попадает.
+    """
+
+    _queue_class = _MeasuredQueue
+
+    @property
+    def checkout_wait(self) -> LatencyStats:
+        return self._pool.wait
+
+
+def engine_options(settings: EngineSettings) -> dict[str, Any]:
+    return {
+        "echo": settings.echo,
+        "poolclass": MeasuredAsyncQueuePool,
+        "pool_size": settings.pool_size,
+        "max_overflow": settings.max_overflow,
+        "pool_timeout": settings.pool_timeout,
+        "pool_recycle": settings.pool_recycle,
+        "pool_pre_ping": settings.pool_pre_ping,
+        "connect_args": {
+            "prepared_statement_cache_size": settings.prepared_statement_cache_size,
+            "server_settings": {"statement_timeout": str(settings.statement_timeout_ms)},
+        },
+    }
+
+
+def pool_stats(engine: AsyncEngine) -> dict[str, Any]:
+    pool = engine.pool
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": pool.overflow(),
+        "checkout_wait": pool.checkout_wait.stats(),
+    }
 
 
 # create async engine for interaction with database
 
-engine = create_async_engine(REAL_DATABASE_URL, future=True, echo=True)
+engine = create_async_engine(REAL_DATABASE_URL, future=True, **engine_options(get_engine_settings()))
+register_metrics_source("db_pool", lambda: pool_stats(engine))
+
+# Реплика для чтения (необязательная)
+if READ_DATABASE_URL:
+    read_engine = create_async_engine(READ_DATABASE_URL, future=True, **engine_options(get_engine_settings()))
+    register_metrics_source("db_read_pool", lambda: pool_stats(read_engine))
+else:
+    read_engine = engine
+
+if SQL_STATS_ENABLED:
+    instrument_engine(engine.sync_engine)
+    if read_engine is not engine:
+        instrument_engine(read_engine.sync_engine)
 
 
 
 # create session for the interaction with database
 
 async_session = sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+async_read_session = sessionmaker(read_engine, expire_on_commit=False, class_=AsyncSession)
+
+
+def _request_subject(connection: HTTPConnection) -> Optional[str]:
+    # Токен из заголовка Authorization, у WebSocket — из query-параметра token
+    scheme, _, token = connection.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() != "bearer":
+        token = connection.query_params.get("token")
+    if not token:
+        return None
+    try:
+        return decode_token(token).get("sub")
+    except JWTError:
+        return None
+
 
-async def get_db() -> Generator:
+def _pin_session_subject(session: Session) -> None:
+    subject = session.info.get("subject")
+    if subject is not None:
+        pin_to_primary(subject)
+
+
+@event.listens_for(Session, "after_flush")
+def _pin_after_flush(session, flush_context):
+    _pin_session_subject(session)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _pin_after_dml(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        _pin_session_subject(orm_execute_state.session)
+
+
+def invalidate_user_on_commit(session: AsyncSession, user_id: UUID) -> None:
+    """
+    Сбросить кэши пользователя после коммита транзакции сессии. Сброс до коммита
+    не помогает: параллельный запрос успеет закэшировать ещё не изменённую строку.
+    """
+    session.info.setdefault("invalidated_users", set()).add(user_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_users_after_commit(session):
+    for user_id in session.info.pop("invalidated_users", ()):
+        invalidate_cached_user(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_invalidated_users(session):
+    session.info.pop("invalidated_users", None)
+
+
+async def get_db(connection: HTTPConnection) -> Generator:
     try:
         session: AsyncSession = async_session()
+        if read_engine is not engine:
+            # После записи пользователь какое-то время читает из основной базы
+            session.info["subject"] = _request_subject(connection)
+        yield session
+
+    finally:
+        await session.close()
+
+async def get_read_db(connection: HTTPConnection) -> Generator:
+    """
+    Сессия только для чтения: реплика, если она настроена и пользователь
+    не писал в базу последние READ_YOUR_WRITES_SECONDS секунд.
+    """
+    subject = _request_subject(connection) if read_engine is not engine else None
+    if subject is not None and is_pinned_to_primary(subject):
+        session_factory = async_session
+    else:
+        session_factory = async_read_session
+    try:
+        session: AsyncSession = session_factory()
+        session.info["subject"] = subject
         yield session
 
     finally:
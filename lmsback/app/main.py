@@ -1,3 +1,4 @@
+from contextlib import asynccontextmanager
 from pathlib import Path
 
 import uvicorn
@@ -5,13 +6,28 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from loguru import logger
 from api.router import main_api_router
-from core.config import APP_PORT
+from core.config import APP_PORT, SQL_STATS_ENABLED
 from fastapi.staticfiles import StaticFiles
+from utils.background import background_jobs
+from api.v1.routes.actions.admin_actions import _configure_password_hashing
+from utils.hashing import bulk_password_hasher
+from utils.pagination import NEXT_CURSOR_HEADER
+from utils.sql_stats import SQLStatsMiddleware
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await _configure_password_hashing()
+    yield
+    await background_jobs.shutdown()
+    bulk_password_hasher.shutdown()
+
 
 app = FastAPI(
         title="LMS Mashinarium",
         description="Learning Management System",
-        version="0.1.0"
+        version="0.1.0",
+        lifespan=lifespan,
 )
 
 # Логирование (каталог logs/ — в Docker монтируется томом)
@@ -41,8 +57,14 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Курсор следующей страницы списков отправок
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
+# Количество и время SQL-запросов на каждый запрос (Server-Timing)
+if SQL_STATS_ENABLED:
+    app.add_middleware(SQLStatsMiddleware)
+
 # Media
 app.mount("/media", StaticFiles(directory="media"), name="media")
 
@@ -8,19 +8,20 @@ from sqlalchemy import and_
 from sqlalchemy import select
 from sqlalchemy import update
 from sqlalchemy import func
-from sqlalchemy import case
 from sqlalchemy import desc
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 from sqlalchemy.orm import selectin_polymorphic
 from services.category_service import CategoryDAL
 from services.user_service import UserDAL
-from db.models.course import Course, Status
+from db.models.course import Course
 from db.models.user import User
 from db.models.category import Category
 from db.models.module import Module
 from db.models.lesson import LessonBase, Lecture, VideoLesson, Practica, TestLesson
 from db.models.settings import PlatformSettings 
+from db.session import invalidate_user_on_commit
 
 class AdminDAL:
     def __init__(self, db_session: AsyncSession):
@@ -45,10 +46,11 @@ class AdminDAL:
     async def delete_user(self, user_id: UUID) -> Union[UUID, None]:
         query = update(User).\
                 where(and_(User.user_id == user_id, User.is_active)).\
-                values(is_active=False).\
+                values(is_active=False, token_version=User.token_version + 1).\
                 returning(User.user_id)
 
         result = await self.db_session.execute(query)
+        invalidate_user_on_commit(self.db_session, user_id)
         deleted_user_id_row = result.fetchone()
         if deleted_user_id_row is not None:
             return deleted_user_id_row[0]
@@ -60,6 +62,7 @@ class AdminDAL:
                 returning(User.user_id)
 
         result = await self.db_session.execute(query)
+        invalidate_user_on_commit(self.db_session, user_id)
         restored_user_id_row = result.fetchone()
         if restored_user_id_row is not None:
             return restored_user_id_row[0]
@@ -80,15 +83,6 @@ class AdminDAL:
         return None
 
     async def get_course_all(self) -> List[Course]:
-        status_order = case(
-            {
-                Status.PUBLISHED.value: 1,
-                Status.DRAFT.value: 2,
-                Status.TRASH.value: 3
-            },
-            value=Course.status[1]
-        )
-        
         modules_count = select(func.count(Module.id)).\
                         where(Module.course_id == Course.id).\
                         scalar_subquery()
@@ -101,7 +95,7 @@ class AdminDAL:
                 ).\
                 options(selectinload(Course.teachers)).\
                 options(selectinload(Course.students)).\
-                order_by(desc(Course.is_active), status_order, desc(modules_count), desc(Course.updated_at))
+                order_by(desc(Course.is_active), Course.status_order, desc(modules_count), desc(Course.updated_at))
 
         result = await self.db_session.execute(query)
         course = result.scalars().all()
@@ -136,6 +130,21 @@ class AdminDAL:
         )
         return result.scalar_one_or_none()
 
+    async def store_bcrypt_rounds(self, rounds: int) -> int:
+        """
+        Сохраняет стоимость bcrypt, только повышая прежнюю, и возвращает сохранённую.
+        Воркер, откалибровавший меньшее значение, получает уже сохранённое большее.
+        """
+        table = PlatformSettings.__table__
+        query = pg_insert(table).\
+                values(id=1, bcrypt_rounds=rounds).\
+                on_conflict_do_update(
+                    index_elements=[table.c.id],
+                    set_={"bcrypt_rounds": func.greatest(table.c.bcrypt_rounds, rounds)},
+                ).\
+                returning(table.c.bcrypt_rounds)
+        return (await self.db_session.execute(query)).scalar_one()
+
     async def upsert_settings(self, **kwargs) -> PlatformSettings:
         settings = await self.get_settings()
         if settings is None:
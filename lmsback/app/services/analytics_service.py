@@ -0,0 +1,201 @@
+from typing import Dict, List, NamedTuple, Optional, Sequence
+from uuid import UUID
+
+from sqlalchemy import String, and_, case, cast, func, literal_column, select, true, union_all
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.models.course import student_courses
+from db.models.lesson import (LessonBase, LessonProgress, Practica, PracticaSubmission, TestSubmission,
+                              TestSubmissionAnswer)
+from db.models.module import Module
+from db.models.user import User
+
+
+class SubmissionStamp(NamedTuple):
+    """Сводка отправок теста; меняется с каждой новой отправкой."""
+    submissions: int
+    last_id: Optional[int]
+    mean_score: Optional[float]
+
+
+def _final_answers(test_lesson_id: int):
+    return and_(
+        TestSubmissionAnswer.submission_id == TestSubmission.id,
+        TestSubmission.test_lesson_id == test_lesson_id,
+        TestSubmission.is_draft == False,
+    )
+
+
+def _gradebook_students(course_id: int):
+    # Порядок строк журнала; idx — номер строки, по нему клетки ссылаются на студента
+    return select(
+               User.user_id,
+               User.last_name,
+               User.first_name,
+               User.email,
+               (func.row_number().over(order_by=(User.last_name, User.first_name, User.user_id)) - 1).label("idx"),
+           ).\
+           join(student_courses, student_courses.c.student_id == User.user_id).\
+           where(student_courses.c.course_id == course_id).\
+           cte("gradebook_students")
+
+
+def _gradebook_lessons(course_id: int):
+    # Порядок колонок журнала — порядок уроков в курсе. Таблица practicas берётся напрямую:
+    # join сущности Practica подтянул бы её родительскую таблицу lessons ещё раз
+    practicas = Practica.__table__
+    return select(
+               LessonBase.id,
+               LessonBase.slug,
+               LessonBase.name,
+               LessonBase.lesson_type,
+               practicas.c.max_score,
+               (func.row_number().over(order_by=(Module.display_order, Module.id,
+                                                 LessonBase.display_order, LessonBase.id)) - 1).label("idx"),
+           ).\
+           join(Module, Module.id == LessonBase.module_id).\
+           outerjoin(practicas, practicas.c.id == LessonBase.id).\
+           where(Module.course_id == course_id, Module.is_active, LessonBase.is_active).\
+           cte("gradebook_lessons")
+
+
+class AnalyticsDAL:
+    """Агрегаты по отправкам: вся арифметика — в SQL, в приложение приходят готовые колонки."""
+
+    def __init__(self, db_session: AsyncSession):
+        self.db_session = db_session
+
+    async def get_test_submission_stamp(self, test_lesson_id: int) -> SubmissionStamp:
+        query = select(func.count(TestSubmission.id), func.max(TestSubmission.id), func.avg(TestSubmission.total_score)).\
+                where(TestSubmission.test_lesson_id == test_lesson_id, TestSubmission.is_draft == False)
+        submissions, last_id, mean_score = (await self.db_session.execute(query)).one()
+        return SubmissionStamp(submissions, last_id, float(mean_score) if mean_score is not None else None)
+
+    async def get_test_item_stats(self, test_lesson_id: int) -> List[Row]:
+        """
+        По вопросам: ответов, проверенных, правильных и точечно-бисериальная корреляция
+        правильности с суммой баллов за остальные вопросы (corr по 0/1 — это она и есть).
+        """
+        item = case((TestSubmissionAnswer.is_correct, 1.0), else_=0.0)
+        rest_score = TestSubmission.total_score - TestSubmissionAnswer.score
+        query = select(
+                    TestSubmissionAnswer.question_index,
+                    func.count().label("answered"),
+                    func.count(TestSubmissionAnswer.is_correct).label("attempts"),
+                    func.count().filter(TestSubmissionAnswer.is_correct == True).label("correct"),
+                    func.corr(item, rest_score).filter(TestSubmissionAnswer.is_correct.is_not(None)).
+                        label("discrimination"),
+                ).\
+                where(_final_answers(test_lesson_id)).\
+                group_by(TestSubmissionAnswer.question_index).\
+                order_by(TestSubmissionAnswer.question_index)
+        result = await self.db_session.execute(query)
+        return list(result.all())
+
+    async def get_test_option_counts(self, test_lesson_id: int) -> List[Row]:
+        """Сколько раз выбран каждый вариант: (question_index, option — текстом, count)."""
+        single = select(
+                     TestSubmissionAnswer.question_index,
+                     cast(TestSubmissionAnswer.selected_option, String).label("option"),
+                 ).\
+                 where(_final_answers(test_lesson_id), TestSubmissionAnswer.selected_option.is_not(None))
+        element = func.json_array_elements_text(TestSubmissionAnswer.selected_options).\
+                  table_valued("value").lateral("element")
+        multiple = select(TestSubmissionAnswer.question_index, element.c.value.label("option")).\
+                   select_from(TestSubmissionAnswer).\
+                   join(TestSubmission, TestSubmission.id == TestSubmissionAnswer.submission_id).\
+                   join(element, literal_column("true")).\
+                   where(TestSubmission.test_lesson_id == test_lesson_id,
+                         TestSubmission.is_draft == False,
+                         func.json_typeof(TestSubmissionAnswer.selected_options) == "array")
+        chosen = union_all(single, multiple).subquery("chosen")
+        query = select(chosen.c.question_index, chosen.c.option, func.count().label("count")).\
+                group_by(chosen.c.question_index, chosen.c.option)
+        result = await self.db_session.execute(query)
+        return list(result.all())
+
+    async def get_test_wrong_text_answers(self, test_lesson_id: int, limit: int) -> List[Row]:
+        """Самые частые неправильные текстовые ответы: не больше limit на вопрос."""
+        answer = func.lower(func.btrim(TestSubmissionAnswer.text_answer))
+        counted = select(
+                      TestSubmissionAnswer.question_index,
+                      answer.label("answer"),
+                      func.count().label("count"),
+                      func.row_number().over(
+                          partition_by=TestSubmissionAnswer.question_index,
+                          order_by=(func.count().desc(), answer),
+                      ).label("rank"),
+                  ).\
+                  where(_final_answers(test_lesson_id),
+                        TestSubmissionAnswer.is_correct == False,
+                        TestSubmissionAnswer.text_answer.is_not(None)).\
+                  group_by(TestSubmissionAnswer.question_index, answer).\
+                  subquery("counted")
+        query = select(counted.c.question_index, counted.c.answer, counted.c.count).\
+                where(counted.c.rank <= limit).\
+                order_by(counted.c.question_index, counted.c.rank)
+        result = await self.db_session.execute(query)
+        return list(result.all())
+
+    async def get_gradebook_students(self, course_id: int) -> List[Row]:
+        students = _gradebook_students(course_id)
+        query = select(students.c.user_id, students.c.last_name, students.c.first_name, students.c.email).\
+                order_by(students.c.idx)
+        result = await self.db_session.execute(query)
+        return list(result.all())
+
+    async def get_gradebook_lessons(self, course_id: int) -> List[Row]:
+        lessons = _gradebook_lessons(course_id)
+        query = select(lessons.c.id, lessons.c.slug, lessons.c.name, lessons.c.lesson_type, lessons.c.max_score).\
+                order_by(lessons.c.idx)
+        result = await self.db_session.execute(query)
+        return list(result.all())
+
+    async def get_gradebook_cells(self, course_id: int,
+                                  user_ids: Optional[Sequence[UUID]] = None) -> Dict[str, Dict[str, list]]:
+        """
+        Прохождение, баллы за тесты и оценки за практики по всем студентам курса
+        (или только по user_ids — для выгрузки пачками) одним запросом.
+        Каждый источник уже уникален по паре (студент, урок), поэтому группировка не нужна:
+        строки просто сворачиваются в массивы (array_agg) — без сортировки и хеш-агрегата
+        на сотни тысяч клеток. Порядок клеток не определён, но одинаков во всех массивах группы.
+        """
+        students = _gradebook_students(course_id)
+        lessons = _gradebook_lessons(course_id)
+        groups = {
+            "completed": (LessonProgress.user_id, LessonProgress.lesson_id, {},
+                          [LessonProgress.is_completed == True]),
+            "tests": (TestSubmission.user_id, TestSubmission.test_lesson_id,
+                      {"score": TestSubmission.total_score},
+                      [TestSubmission.is_draft == False]),
+            "practicas": (PracticaSubmission.user_id, PracticaSubmission.practica_id,
+                          {"score": PracticaSubmission.score,
+                           "graded": func.coalesce(PracticaSubmission.is_graded, False)},
+                          []),
+        }
+        subqueries = []
+        for name, (user_id, lesson_id, columns, where) in groups.items():
+            columns = {"student": students.c.idx, "lesson": lessons.c.idx, **columns}
+            if user_ids is not None:
+                where = [*where, user_id.in_(user_ids)]
+            subqueries.append(
+                select(*(func.array_agg(value).label(f"{name}__{field}") for field, value in columns.items())).\
+                select_from(user_id.table).\
+                join(students, students.c.user_id == user_id).\
+                join(lessons, lessons.c.id == lesson_id).\
+                where(*where).\
+                subquery(name)
+            )
+        first, *rest = subqueries
+        query = select(first, *rest).select_from(first)
+        for subquery in rest:
+            query = query.join(subquery, true())
+        row = (await self.db_session.execute(query)).one()
+
+        cells: Dict[str, Dict[str, list]] = {name: {} for name in groups}
+        for label, values in row._mapping.items():
+            name, field = label.split("__")
+            # array_agg по пустому набору — NULL
+            cells[name][field] = list(values or [])
+        return cells
@@ -2,20 +2,33 @@ from decimal import Decimal
 from typing import Union
 from typing import Optional
 from typing import List
+from typing import Tuple
 from uuid import UUID
 from fastapi import HTTPException
 from sqlalchemy import and_
 from sqlalchemy import select
 from sqlalchemy import update
 from sqlalchemy import func
-from sqlalchemy import case
 from sqlalchemy import desc
+from sqlalchemy import exists
+from sqlalchemy import values
+from sqlalchemy import column
+from sqlalchemy import Integer
+from sqlalchemy import String
+from sqlalchemy import delete
+from sqlalchemy import literal
+from sqlalchemy import any_
+from sqlalchemy import bindparam
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import raiseload
 from sqlalchemy.orm import selectin_polymorphic
 from services.category_service import CategoryDAL
 from services.user_service import UserDAL
-from db.models.course import Course, Status
+from db.models.course import Course, Status, student_courses, teacher_courses
 from db.models.user import User
 from db.models.category import Category
 from db.models.module import Module
@@ -32,7 +45,7 @@ class CourseDAL:
             options(selectinload(Course.modules)).\
             options(selectinload(Course.teachers)).\
             options(selectinload(Course.students)).\
-            where(and_(Course.id == id, Course.is_active, Course.status.contains([Status.PUBLISHED.value])))
+            where(and_(Course.id == id, Course.is_active, Course.is_published))
         )
         result = await self.db_session.execute(query)
         course_row = result.fetchone()
@@ -61,7 +74,7 @@ class CourseDAL:
                 options(selectinload(Course.modules)).\
                 options(selectinload(Course.teachers)).\
                 options(selectinload(Course.students)).\
-                where(and_(Course.slug == slug, Course.is_active, Course.status.contains([Status.PUBLISHED.value])))
+                where(and_(Course.slug == slug, Course.is_active, Course.is_published))
         result = await self.db_session.execute(query)
         course_row = result.fetchone()
         if course_row is not None:
@@ -72,7 +85,7 @@ class CourseDAL:
                 options(selectinload(Course.categories)).\
                 options(selectinload(Course.teachers)).\
                 options(selectinload(Course.students)).\
-                where(and_(Course.students.any(User.user_id == user_id), Course.is_active, Course.status.contains([Status.PUBLISHED.value])))
+                where(and_(Course.students.any(User.user_id == user_id), Course.is_active, Course.is_published))
         result = await self.db_session.execute(query)
         course = result.scalars().all()
         return list(course)
@@ -87,22 +100,13 @@ class CourseDAL:
                 ).\
                 options(selectinload(Course.teachers)).\
                 options(selectinload(Course.students)).\
-                where(and_(Course.students.any(User.user_id == user_id), Course.slug == slug, Course.is_active, Course.status.contains([Status.PUBLISHED.value])))
+                where(and_(Course.students.any(User.user_id == user_id), Course.slug == slug, Course.is_active, Course.is_published))
         result = await self.db_session.execute(query)
         course_row = result.fetchone()
         if course_row is not None:
             return course_row[0]
 
     async def get_user_courses_as_teacher(self, user_id:UUID) -> List[Course]:
-        status_order = case(
-            {
-                Status.PUBLISHED.value: 1,
-                Status.DRAFT.value: 2,
-                Status.TRASH.value: 3
-            },
-            value=Course.status[1]  # Предполагаем, что статус в первом элементе массива
-        )
-        
         modules_count = select(func.count(Module.id)).\
                         where(Module.course_id == Course.id).\
                         scalar_subquery()
@@ -116,7 +120,7 @@ class CourseDAL:
                 options(selectinload(Course.teachers)).\
                 options(selectinload(Course.students)).\
                 where(and_(Course.teachers.any(User.user_id == user_id), Course.is_active)).\
-                order_by(status_order, desc(modules_count), desc(Course.updated_at))
+                order_by(Course.status_order, desc(modules_count), desc(Course.updated_at))
 
         result = await self.db_session.execute(query)
         course = result.scalars().all()
@@ -167,8 +171,9 @@ class CourseDAL:
         query = select(Course).\
                 options(selectinload(Course.categories)).\
                 where(Course.is_active,
-                      Course.status.contains([Status.PUBLISHED.value]),
-                  ~Course.students.any(User.user_id == user_id))
+                      Course.is_published,
+                  ~Course.students.any(User.user_id == user_id)).\
+                order_by(Course.display_order)
         result = await self.db_session.execute(query)
         course = result.scalars().all()
         return list(course)
@@ -176,7 +181,8 @@ class CourseDAL:
     async def get_course_by_categories(self, categories_slug) -> List[Course]:
         query = select(Course).\
                 options(selectinload(Course.categories)).\
-                where(and_(Course.categories.any(Category.slug == categories_slug), Course.is_active, Course.status.contains([Status.PUBLISHED.value])))
+                where(and_(Course.categories.any(Category.slug == categories_slug), Course.is_active, Course.is_published)).\
+                order_by(Course.display_order)
 
         result = await self.db_session.execute(query)
         course = result.scalars().all()
@@ -307,60 +313,151 @@ class CourseDAL:
         return course
 
     async def add_students_to_course(self, course_id: int, student_ids: List[UUID]) -> Union[Course, None]:
-        course = await self.get_course_by_id(course_id)
-        if course is None:
+        if not await self.course_exists(course_id):
             return None
 
-        user_dal = UserDAL(self.db_session)
-        students = await user_dal.get_user_by_ids(student_ids)
-
-        if len(students) != len(student_ids):
+        enrolled = await self.enroll_students(course_id, student_ids)
+        if len(enrolled) != len(set(student_ids)):
             raise ValueError("Some users not found")
 
-        existing_ids = {student.user_id for student in course.students}
-        for student in students:
-            if student.user_id not in existing_ids:
-                course.students.append(student)
-
-        await self.db_session.flush()
-        return course
+        return await self.get_course_by_id(course_id)
 
 
     async def remove_students_from_course(self, course_id: int, student_ids: List[UUID]) -> Union[Course, None]:
-        course = await self.get_course_by_id(course_id)
-        if course is None:
+        if not await self.course_exists(course_id):
             return None
 
-        remaining_students = [
-            student for student in course.students
-            if student.user_id not in student_ids
-        ]
+        await self.unenroll_students(course_id, student_ids)
+        return await self.get_course_by_id(course_id)
+
+    async def course_exists(self, course_id: int) -> bool:
+        return bool(await self.db_session.scalar(select(_published_course(course_id))))
+
+    async def enroll_students(self, course_id: int, student_ids: List[UUID]) -> dict[UUID, bool]:
+        """
+        Запись активных пользователей на курс одним INSERT ... ON CONFLICT DO NOTHING.
+        Возвращает {user_id: True — записан сейчас, False — уже был записан};
+        ненайденных пользователей в ответе нет.
+        """
+        if not student_ids:
+            return {}
+        found = select(User.user_id.label("key"), User.user_id).\
+                where(User.user_id == any_(_array(list(set(student_ids)), PG_UUID(as_uuid=True))), User.is_active)
+        return await self._enroll(course_id, found)
+
+    async def enroll_students_by_email(self, course_id: int, emails: List[str]) -> dict[str, bool]:
+        """То же, что enroll_students, но пользователи ищутся по email."""
+        if not emails:
+            return {}
+        found = select(User.email.label("key"), User.user_id).\
+                where(User.email == any_(_array(list(set(emails)), String)), User.is_active)
+        return await self._enroll(course_id, found)
+
+    async def _enroll(self, course_id: int, found) -> dict:
+        found = found.cte("found")
+        inserted = pg_insert(student_courses).\
+                   from_select(["student_id", "course_id"],
+                               select(found.c.user_id, literal(course_id, Integer))).\
+                   on_conflict_do_nothing().\
+                   returning(student_courses.c.student_id).\
+                   cte("inserted")
+        query = select(found.c.key, inserted.c.student_id.is_not(None)).\
+                select_from(found.outerjoin(inserted, inserted.c.student_id == found.c.user_id))
+        result = await self.db_session.execute(query)
+        return {key: added for key, added in result.all()}
 
-        course.students = remaining_students
-        await self.db_session.flush()
-        return course
+    async def unenroll_students(self, course_id: int, student_ids: List[UUID]) -> List[UUID]:
+        """Отчисление одним DELETE ... WHERE student_id = ANY(...). Возвращает отчисленных."""
+        if not student_ids:
+            return []
+        query = delete(student_courses).\
+                where(student_courses.c.course_id == course_id,
+                      student_courses.c.student_id == any_(_array(list(set(student_ids)), PG_UUID(as_uuid=True)))).\
+                returning(student_courses.c.student_id)
+        result = await self.db_session.execute(query)
+        return list(result.scalars().all())
 
 
     async def get_course_students(self, course_id: int) -> List[User]:
-        course = await self.get_course_by_id(course_id)
-        if course is None:
-            return []
-        return course.students
+        query = select(User).\
+                options(raiseload(User.teacher_courses), raiseload(User.student_courses)).\
+                join(student_courses, student_courses.c.student_id == User.user_id).\
+                where(student_courses.c.course_id == course_id, _published_course(course_id))
+        result = await self.db_session.execute(query)
+        return list(result.scalars().all())
 
     async def get_course_teachers(self, course_id: int) -> List[User]:
-        course = await self.get_course_by_id(course_id)
-        if course is None:
-            return []
-        return course.teachers
+        query = select(User).\
+                options(raiseload(User.teacher_courses), raiseload(User.student_courses)).\
+                join(teacher_courses, teacher_courses.c.teacher_id == User.user_id).\
+                where(teacher_courses.c.course_id == course_id, _active_course(course_id))
+        result = await self.db_session.execute(query)
+        return list(result.scalars().all())
 
     async def is_user_enrolled(self, course_id: int, user_id: UUID) -> bool:
-        course = await self.get_course_by_id(course_id)
-        if course is None:
-            return False
-        return any(student.user_id == user_id for student in course.students)
+        query = select(exists().where(
+            student_courses.c.course_id == course_id,
+            student_courses.c.student_id == user_id,
+            _published_course(course_id),
+        ))
+        return bool(await self.db_session.scalar(query))
 
     async def is_user_teacher(self, course_id: int, user_id: UUID) -> bool:
-        course = await self.get_course_by_id(course_id)
-        if course is None:
-            return False
-        return any(teacher.user_id == user_id for teacher in course.teachers)
+        query = select(exists().where(
+            teacher_courses.c.course_id == course_id,
+            teacher_courses.c.teacher_id == user_id,
+            _active_course(course_id),
+        ))
+        return bool(await self.db_session.scalar(query))
+
+    async def get_teacher_course_id(self, user_id: UUID, slug: str) -> Optional[int]:
+        """id активного курса по slug, если пользователь — его преподаватель; без загрузки курса."""
+        query = select(Course.id).where(
+            Course.slug == slug,
+            Course.is_active,
+            exists().where(teacher_courses.c.course_id == Course.id, teacher_courses.c.teacher_id == user_id),
+        )
+        return await self.db_session.scalar(query)
+
+    async def get_course_memberships(self, pairs: List[Tuple[UUID, int]]) -> dict[Tuple[UUID, int], Tuple[bool, bool]]:
+        """
+        Проверка членства для многих пар (пользователь, курс) одним запросом.
+        Возвращает {(user_id, course_id): (is_student, is_teacher)}.
+        """
+        if not pairs:
+            return {}
+
+        requested = values(
+            column("user_id", PG_UUID(as_uuid=True)),
+            column("course_id", Integer),
+            name="requested",
+        ).data(list(dict.fromkeys(pairs)))
+
+        is_student = exists().where(
+            student_courses.c.student_id == requested.c.user_id,
+            student_courses.c.course_id == requested.c.course_id,
+            _published_course(requested.c.course_id),
+        )
+        is_teacher = exists().where(
+            teacher_courses.c.teacher_id == requested.c.user_id,
+            teacher_courses.c.course_id == requested.c.course_id,
+            _active_course(requested.c.course_id),
+        )
+        query = select(requested.c.user_id, requested.c.course_id, is_student, is_teacher)
+        result = await self.db_session.execute(query)
+        return {(user_id, course_id): (student, teacher) for user_id, course_id, student, teacher in result.all()}
+
+
+def _array(items: list, item_type):
+    # Один параметр-массив вместо списка параметров: размер пачки не ограничен числом параметров
+    return bindparam(None, items, type_=ARRAY(item_type))
+
+
+def _active_course(course_id):
+    # Преподаватели работают и с неопубликованными курсами
+    return exists().where(Course.id == course_id, Course.is_active)
+
+
+def _published_course(course_id):
+    # Студентам доступны только опубликованные курсы, как в get_course_by_id
+    return exists().where(Course.id == course_id, Course.is_active, Course.is_published)
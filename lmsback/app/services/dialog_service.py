@@ -7,6 +7,7 @@ from sqlalchemy import update
 from sqlalchemy import and_
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
+from db.models.course import Course
 from db.models.dialog import Dialog
 from db.models.user import User
 from services.user_service import UserDAL
@@ -96,6 +97,17 @@ class DialogDAL:
         if updated_dialog is not None:
             return updated_dialog[0]
 
+    async def sync_active_with_course(self, course_id: int) -> Union[int, None]:
+        """Диалог курса активен, пока курс опубликован (courses.is_published)."""
+        query = update(Dialog).\
+                where(and_(Dialog.course_id == course_id, Dialog.course_id == Course.id)).\
+                values(is_active=Course.is_published).\
+                returning(Dialog.id)
+        result = await self.db_session.execute(query)
+        updated_dialog = result.fetchone()
+        if updated_dialog is not None:
+            return updated_dialog[0]
+
     async def add_members_to_dialog(self, dialog_id: int, members_ids: List[UUID]) -> Union[Dialog, None]:
         dialog = await self.get_dialog_by_id(dialog_id)
         if dialog is None:
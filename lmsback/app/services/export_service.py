@@ -0,0 +1,67 @@
+from typing import AsyncIterator, Sequence
+
+from sqlalchemy import Select, func, select
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.models.lesson import LessonBase, Practica, PracticaSubmission, TestSubmission
+from db.models.module import Module
+from db.models.user import User
+
+
+class ExportDAL:
+    """Выгрузки: строки читаются серверным курсором пачками, целиком в память не попадают."""
+
+    def __init__(self, db_session: AsyncSession):
+        self.db_session = db_session
+
+    async def _stream(self, query: Select, batch_size: int) -> AsyncIterator[Sequence[Row]]:
+        async with self.db_session.begin():
+            result = await self.db_session.stream(query.execution_options(yield_per=batch_size))
+            async for partition in result.partitions():
+                yield partition
+
+    def stream_test_submissions(self, course_id: int, batch_size: int) -> AsyncIterator[Sequence[Row]]:
+        query = select(
+                    LessonBase.name,
+                    LessonBase.slug,
+                    User.email,
+                    User.last_name,
+                    User.first_name,
+                    TestSubmission.submitted_at,
+                    TestSubmission.checked_questions,
+                    TestSubmission.total_questions,
+                    TestSubmission.total_score,
+                ).\
+                join(LessonBase, LessonBase.id == TestSubmission.test_lesson_id).\
+                join(Module, Module.id == LessonBase.module_id).\
+                join(User, User.user_id == TestSubmission.user_id).\
+                where(Module.course_id == course_id, TestSubmission.is_draft == False).\
+                order_by(Module.display_order, LessonBase.display_order, LessonBase.id,
+                         TestSubmission.submitted_at, TestSubmission.id)
+        return self._stream(query, batch_size)
+
+    def stream_practica_submissions(self, course_id: int, batch_size: int) -> AsyncIterator[Sequence[Row]]:
+        practicas = Practica.__table__
+        query = select(
+                    LessonBase.name,
+                    LessonBase.slug,
+                    User.email,
+                    User.last_name,
+                    User.first_name,
+                    PracticaSubmission.submitted_at,
+                    PracticaSubmission.updated_at,
+                    func.coalesce(PracticaSubmission.is_graded, False),
+                    PracticaSubmission.score,
+                    practicas.c.max_score,
+                    PracticaSubmission.feedback,
+                    PracticaSubmission.text_answer,
+                ).\
+                join(practicas, practicas.c.id == PracticaSubmission.practica_id).\
+                join(LessonBase, LessonBase.id == practicas.c.id).\
+                join(Module, Module.id == LessonBase.module_id).\
+                join(User, User.user_id == PracticaSubmission.user_id).\
+                where(Module.course_id == course_id).\
+                order_by(Module.display_order, LessonBase.display_order, LessonBase.id,
+                         PracticaSubmission.submitted_at, PracticaSubmission.id)
+        return self._stream(query, batch_size)
@@ -0,0 +1,174 @@
+from datetime import datetime
+from typing import List, Optional, Sequence
+from uuid import UUID
+
+from sqlalchemy import Integer, Text, and_, column, func, select, tuple_, update, values
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.models.course import Course, teacher_courses
+from db.models.lesson import CourseGradingCounter, LessonBase, LessonType, PracticaSubmission
+from db.models.module import Module
+from db.models.user import User
+
+
+def _practica_course_id(practica_id: int):
+    return select(Module.course_id).\
+           join(LessonBase, LessonBase.module_id == Module.id).\
+           where(LessonBase.id == practica_id).\
+           scalar_subquery()
+
+
+class GradingDAL:
+    """Очередь проверки практик и счётчики непроверенных отправок по курсам."""
+
+    def __init__(self, db_session: AsyncSession):
+        self.db_session = db_session
+
+    async def add_ungraded_practicas(self, practica_id: int, delta: int) -> None:
+        """Сдвигает счётчик курса практики на delta; строка счётчика создаётся при первой отправке."""
+        counter = CourseGradingCounter.__table__
+        query = pg_insert(counter).\
+                values(course_id=_practica_course_id(practica_id), ungraded_practicas=delta).\
+                on_conflict_do_update(
+                    index_elements=[counter.c.course_id],
+                    set_={"ungraded_practicas": counter.c.ungraded_practicas + delta},
+                )
+        await self.db_session.execute(query)
+
+    async def add_ungraded_by_course(self, deltas: dict[int, int]) -> None:
+        """Сдвиг счётчиков нескольких курсов одним UPDATE ... FROM (VALUES (course_id, delta), ...)."""
+        deltas = [(course_id, delta) for course_id, delta in deltas.items() if delta]
+        if not deltas:
+            return
+        rows = values(column("course_id", Integer), column("delta", Integer), name="deltas").data(deltas)
+        counter = CourseGradingCounter.__table__
+        query = update(counter).\
+                where(counter.c.course_id == rows.c.course_id).\
+                values(ungraded_practicas=counter.c.ungraded_practicas + rows.c.delta)
+        await self.db_session.execute(query)
+
+    async def lock_practica_submissions(self, pairs: Sequence[tuple[int, UUID]]) -> List[Row]:
+        """
+        Отправки по парам (practica_id, user_id): (id, practica_id, user_id, is_graded).
+        Строки блокируются до конца транзакции — прежнее is_graded нужно для счётчиков.
+        """
+        if not pairs:
+            return []
+        rows = values(column("practica_id", Integer), column("user_id", PG_UUID(as_uuid=True)),
+                      name="pairs").data(list(pairs))
+        query = select(PracticaSubmission.id, PracticaSubmission.practica_id,
+                       PracticaSubmission.user_id, PracticaSubmission.is_graded).\
+                join(rows, and_(PracticaSubmission.practica_id == rows.c.practica_id,
+                                PracticaSubmission.user_id == rows.c.user_id)).\
+                with_for_update(of=PracticaSubmission)
+        result = await self.db_session.execute(query)
+        return list(result.all())
+
+    async def set_practica_grades(self, grades: Sequence[tuple[int, int, Optional[str]]]) -> None:
+        """Оценки отправок одним UPDATE ... FROM (VALUES (id, score, feedback), ...)."""
+        if not grades:
+            return
+        rows = values(column("id", Integer), column("score", Integer), column("feedback", Text),
+                      name="grades").data(list(grades))
+        table = PracticaSubmission.__table__
+        query = update(table).\
+                where(table.c.id == rows.c.id).\
+                values(score=rows.c.score, feedback=rows.c.feedback, is_graded=True, updated_at=datetime.utcnow())
+        await self.db_session.execute(query)
+
+    async def recount_ungraded_practicas(self, course_ids: Sequence[int]) -> None:
+        """Пересчитывает счётчики курсов с нуля: для данных, загруженных в обход LessonDAL."""
+        if not course_ids:
+            return
+        counter = CourseGradingCounter.__table__
+        counts = select(Course.id, func.count(PracticaSubmission.id)).\
+                 outerjoin(Module, Module.course_id == Course.id).\
+                 outerjoin(LessonBase, LessonBase.module_id == Module.id).\
+                 outerjoin(PracticaSubmission, (PracticaSubmission.practica_id == LessonBase.id)
+                           & (PracticaSubmission.is_graded == False)).\
+                 where(Course.id.in_(course_ids)).\
+                 group_by(Course.id)
+        query = pg_insert(counter).from_select(["course_id", "ungraded_practicas"], counts)
+        query = query.on_conflict_do_update(
+            index_elements=[counter.c.course_id],
+            set_={"ungraded_practicas": query.excluded.ungraded_practicas},
+        )
+        await self.db_session.execute(query)
+
+    async def get_teacher_ungraded_counters(self, teacher_id: UUID) -> List[Row]:
+        """(course_id, slug, name, ungraded) по курсам преподавателя — без подсчёта отправок."""
+        query = select(
+                    Course.id.label("course_id"),
+                    Course.slug,
+                    Course.name,
+                    func.coalesce(CourseGradingCounter.ungraded_practicas, 0).label("ungraded"),
+                ).\
+                join(teacher_courses, teacher_courses.c.course_id == Course.id).\
+                outerjoin(CourseGradingCounter, CourseGradingCounter.course_id == Course.id).\
+                where(teacher_courses.c.teacher_id == teacher_id, Course.is_active == True).\
+                order_by(Course.id)
+        result = await self.db_session.execute(query)
+        return list(result.all())
+
+    async def get_teacher_practicas(
+        self,
+        teacher_id: UUID,
+        course_slug: Optional[str] = None,
+        slugs: Optional[Sequence[str]] = None,
+    ) -> List[Row]:
+        """Практики курсов преподавателя: (id, slug, name, course_id, course_slug)."""
+        query = select(
+                    LessonBase.id,
+                    LessonBase.slug,
+                    LessonBase.name,
+                    Course.id.label("course_id"),
+                    Course.slug.label("course_slug"),
+                ).\
+                join(Module, Module.id == LessonBase.module_id).\
+                join(Course, Course.id == Module.course_id).\
+                join(teacher_courses, teacher_courses.c.course_id == Course.id).\
+                where(teacher_courses.c.teacher_id == teacher_id,
+                      Course.is_active == True,
+                      LessonBase.lesson_type == LessonType.PRACTICA.value)
+        if course_slug is not None:
+            query = query.where(Course.slug == course_slug)
+        if slugs is not None:
+            query = query.where(LessonBase.slug.in_(slugs))
+        result = await self.db_session.execute(query)
+        return list(result.all())
+
+    async def get_ungraded_page(
+        self,
+        practica_ids: Sequence[int],
+        after: Optional[tuple[datetime, int]] = None,
+        limit: int = 20,
+    ) -> List[Row]:
+        """
+        Самые старые непроверенные отправки по практикам: строки (id, practica_id, user_id,
+        submitted_at, email, first_name, last_name). Порядок совпадает с частичным индексом
+        ix_practica_submissions_ungraded, поэтому страница читается без сортировки.
+        Возвращается на одну строку больше limit — признак следующей страницы.
+        """
+        if not practica_ids:
+            return []
+        query = select(
+                    PracticaSubmission.id,
+                    PracticaSubmission.practica_id,
+                    PracticaSubmission.user_id,
+                    PracticaSubmission.submitted_at,
+                    User.email,
+                    User.first_name,
+                    User.last_name,
+                ).\
+                join(User, User.user_id == PracticaSubmission.user_id).\
+                where(PracticaSubmission.is_graded == False,
+                      PracticaSubmission.practica_id.in_(practica_ids)).\
+                order_by(PracticaSubmission.submitted_at, PracticaSubmission.id).\
+                limit(limit + 1)
+        if after is not None:
+            query = query.where(tuple_(PracticaSubmission.submitted_at, PracticaSubmission.id) > tuple_(*after))
+        result = await self.db_session.execute(query)
+        return list(result.all())
@@ -1,8 +1,11 @@
+from typing import NamedTuple
 from typing import TypeVar
 from typing import Optional
 from uuid import UUID
-from sqlalchemy import delete, select
+from sqlalchemy import delete, func, select, tuple_
 from sqlalchemy import update
+from sqlalchemy.engine import Row
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 from db.models.lesson import (
@@ -23,9 +26,46 @@ from db.models.user import User
 from db.models.course import Course
 from db.models.module import Module
 from datetime import datetime
+from services.grading_service import GradingDAL
+from utils.cache import invalidate_answer_key, invalidate_test_analytics
 
 T = TypeVar("T", bound=LessonBase)
 
+
+class SubmissionFilters(NamedTuple):
+    """Фильтры списков отправок для преподавателя; submitted_to — не включительно."""
+    student_id: Optional[UUID] = None
+    graded: Optional[bool] = None
+    submitted_from: Optional[datetime] = None
+    submitted_to: Optional[datetime] = None
+
+
+def _submission_filters(model, graded, filters: SubmissionFilters, after: Optional[tuple[datetime, int]]) -> list:
+    conditions = []
+    if filters.student_id is not None:
+        conditions.append(model.user_id == filters.student_id)
+    if filters.graded is not None:
+        conditions.append(graded if filters.graded else ~graded)
+    if filters.submitted_from is not None:
+        conditions.append(model.submitted_at >= filters.submitted_from)
+    if filters.submitted_to is not None:
+        conditions.append(model.submitted_at < filters.submitted_to)
+    if after is not None:
+        # Keyset: строго после последней выданной записи в порядке (submitted_at, id)
+        conditions.append(tuple_(model.submitted_at, model.id) > tuple_(*after))
+    return conditions
+
+
+def _test_submission_filters(filters: SubmissionFilters, after: Optional[tuple[datetime, int]] = None) -> list:
+    # Тест проверен, если автопроверка прошла по всем вопросам
+    graded = TestSubmission.checked_questions >= TestSubmission.total_questions
+    return [TestSubmission.is_draft == False, *_submission_filters(TestSubmission, graded, filters, after)]
+
+
+def _practica_submission_filters(filters: SubmissionFilters, after: Optional[tuple[datetime, int]] = None) -> list:
+    graded = func.coalesce(PracticaSubmission.is_graded, False)
+    return _submission_filters(PracticaSubmission, graded, filters, after)
+
 class LessonDAL:
     def __init__(self, db_session: AsyncSession):
         self.db_session = db_session
@@ -174,13 +214,16 @@ class LessonDAL:
         self,
         practica_id: int,
         user_id: UUID,
+        for_update: bool = False,
     ) -> Optional[PracticaSubmission]:
-        result = await self.db_session.execute(
-            select(PracticaSubmission).where(
-                PracticaSubmission.practica_id == practica_id,
-                PracticaSubmission.user_id == user_id,
-            )
+        query = select(PracticaSubmission).where(
+            PracticaSubmission.practica_id == practica_id,
+            PracticaSubmission.user_id == user_id,
         )
+        if for_update:
+            # Переход «проверено» <-> «не проверено» сдвигает счётчик курса ровно один раз
+            query = query.with_for_update()
+        result = await self.db_session.execute(query)
         return result.scalars().first()
 
     async def upsert_practica_submission(
@@ -193,9 +236,12 @@ class LessonDAL:
         """
         Создаёт или обновляет решение студента по конкретной практике.
         """
-        existing = await self.get_practica_submission(practica_id=practica_id, user_id=user_id)
+        existing = await self.get_practica_submission(practica_id=practica_id, user_id=user_id, for_update=True)
 
         if existing:
+            if existing.is_graded:
+                # Повторная отправка снимает оценку: решение снова ждёт проверки
+                await GradingDAL(self.db_session).add_ungraded_practicas(practica_id, 1)
             # Если поле не прислали, сохраняем предыдущее значение,
             # чтобы не затирать ответ при частичном обновлении.
             if text_answer is not None:
@@ -220,6 +266,7 @@ class LessonDAL:
         )
         self.db_session.add(submission)
         await self.db_session.flush()
+        await GradingDAL(self.db_session).add_ungraded_practicas(practica_id, 1)
         await self.db_session.refresh(submission)
         return submission
 
@@ -230,10 +277,12 @@ class LessonDAL:
         score: int,
         feedback: Optional[str],
     ) -> Optional[PracticaSubmission]:
-        submission = await self.get_practica_submission(practica_id=practica_id, user_id=user_id)
+        submission = await self.get_practica_submission(practica_id=practica_id, user_id=user_id, for_update=True)
         if submission is None:
             return None
 
+        if not submission.is_graded:
+            await GradingDAL(self.db_session).add_ungraded_practicas(practica_id, -1)
         submission.score = score
         submission.feedback = feedback
         submission.is_graded = True
@@ -241,24 +290,47 @@ class LessonDAL:
         await self.db_session.refresh(submission)
         return submission
 
-    async def get_practica_submissions(
+    async def get_practica_submission_page(
         self,
-        practica_id: int,
-    ) -> list[PracticaSubmission]:
-        result = await self.db_session.execute(
-            select(PracticaSubmission).where(
-                PracticaSubmission.practica_id == practica_id,
-            )
-        )
-        return list(result.scalars().all())
-
-    async def get_practica_submissions_by_ids(self, practica_ids: list[int]) -> list[PracticaSubmission]:
+        practica_ids: list[int],
+        filters: SubmissionFilters,
+        after: Optional[tuple[datetime, int]] = None,
+        limit: Optional[int] = None,
+    ) -> list[Row]:
+        """
+        Страница отправок практик по (submitted_at, id) вместе с данными студента:
+        строки (PracticaSubmission, email, first_name, last_name). При limit
+        возвращается на одну строку больше — признак следующей страницы.
+        """
         if not practica_ids:
             return []
-        result = await self.db_session.execute(
-            select(PracticaSubmission).where(PracticaSubmission.practica_id.in_(practica_ids))
-        )
-        return list(result.scalars().all())
+        query = select(PracticaSubmission, User.email, User.first_name, User.last_name).\
+                join(User, User.user_id == PracticaSubmission.user_id).\
+                where(PracticaSubmission.practica_id.in_(practica_ids),
+                      *_practica_submission_filters(filters, after)).\
+                order_by(PracticaSubmission.submitted_at, PracticaSubmission.id)
+        if limit is not None:
+            query = query.limit(limit + 1)
+        result = await self.db_session.execute(query)
+        return list(result.all())
+
+    async def count_practica_submissions(self, practica_ids: list[int], filters: SubmissionFilters) -> int:
+        if not practica_ids:
+            return 0
+        query = select(func.count()).select_from(PracticaSubmission).\
+                where(PracticaSubmission.practica_id.in_(practica_ids), *_practica_submission_filters(filters))
+        return (await self.db_session.execute(query)).scalar_one()
+
+    async def get_course_lessons_of_type(self, course_id: int, lesson_type: LessonType) -> list[Row]:
+        """Активные уроки курса одного типа: (id, slug, name) в порядке курса."""
+        query = select(LessonBase.id, LessonBase.slug, LessonBase.name).\
+                join(Module, Module.id == LessonBase.module_id).\
+                where(Module.course_id == course_id,
+                      LessonBase.lesson_type == lesson_type.value,
+                      LessonBase.is_active == True).\
+                order_by(Module.display_order, LessonBase.display_order, LessonBase.id)
+        result = await self.db_session.execute(query)
+        return list(result.all())
 
     async def get_practica_ids_with_submission_for_user(
         self,
@@ -291,6 +363,7 @@ class LessonDAL:
         return set(result.scalars().all())
 
     async def replace_test_correct_answers(self, test_lesson_id: int, questions: list[dict]) -> None:
+        invalidate_answer_key(test_lesson_id)
         await self.db_session.execute(
             delete(TestCorrectAnswer).where(TestCorrectAnswer.test_lesson_id == test_lesson_id)
         )
@@ -348,65 +421,40 @@ class LessonDAL:
         user_id: UUID,
         total_questions: int,
         answers: list[dict],
-    ) -> TestSubmission:
-        """Сохранить черновик теста"""
-        # Проверяем, есть ли уже черновик
-        existing = await self.get_test_draft(test_lesson_id, user_id)
-        
-        if existing:
-            # Удаляем старые ответы черновика
-            for ans in (existing.answers or []):
-                await self.db_session.delete(ans)
-            await self.db_session.flush()
-            
-            # Обновляем черновик
-            existing.total_questions = total_questions
-            await self.db_session.flush()
-            
-            # Добавляем новые ответы
-            for item in answers:
-                answer = TestSubmissionAnswer(
-                    submission_id=existing.id,
-                    question_index=item["question_index"],
-                    question_type=item["question_type"],
-                    selected_option=item.get("selected_option"),
-                    selected_options=item.get("selected_options"),
-                    text_answer=item.get("text_answer"),
-                )
-                self.db_session.add(answer)
-            
-            await self.db_session.flush()
-            await self.db_session.refresh(existing)
-            return existing
-        else:
-            # Создаем новый черновик
-            submission = TestSubmission(
-                test_lesson_id=test_lesson_id,
-                user_id=user_id,
-                total_questions=total_questions,
-                checked_questions=0,
-                total_score=0.0,
-                submitted_at=datetime.utcnow(),
-                is_draft=True,
-            )
-            self.db_session.add(submission)
-            await self.db_session.flush()
-            
-            # Добавляем ответы
-            for item in answers:
-                answer = TestSubmissionAnswer(
-                    submission_id=submission.id,
-                    question_index=item["question_index"],
-                    question_type=item["question_type"],
-                    selected_option=item.get("selected_option"),
-                    selected_options=item.get("selected_options"),
-                    text_answer=item.get("text_answer"),
-                )
-                self.db_session.add(answer)
-            
-            await self.db_session.flush()
-            await self.db_session.refresh(submission)
-            return submission
+        version: int,
+    ) -> Optional[int]:
+        """
+        Автосохранение черновика теста: заголовок черновика и переданные ответы
+        записываются двумя INSERT ... ON CONFLICT DO UPDATE, остальные ответы не трогаются.
+        Существующий черновик обновляется, только если его версия равна version,
+        иначе возвращается None (запись устарела). Возвращает новую версию черновика.
+        """
+        draft = pg_insert(TestSubmission).values(
+            test_lesson_id=test_lesson_id,
+            user_id=user_id,
+            total_questions=total_questions,
+            checked_questions=0,
+            total_score=0.0,
+            submitted_at=datetime.utcnow(),
+            is_draft=True,
+            draft_version=1,
+        )
+        draft = draft.on_conflict_do_update(
+            constraint="uq_user_test_submission_draft",
+            set_={
+                "total_questions": draft.excluded.total_questions,
+                "submitted_at": draft.excluded.submitted_at,
+                "draft_version": TestSubmission.draft_version + 1,
+            },
+            where=TestSubmission.draft_version == version,
+        ).returning(TestSubmission.id, TestSubmission.draft_version)
+        row = (await self.db_session.execute(draft)).first()
+        if row is None:
+            return None
+        submission_id, new_version = row
+
+        await self._upsert_test_answers(submission_id, answers, graded=False)
+        return new_version
 
     async def convert_draft_to_submission(
         self,
@@ -414,50 +462,60 @@ class LessonDAL:
         user_id: UUID,
         checked_questions: int,
         total_score: float,
-    ) -> Optional[TestSubmission]:
-        """Преобразовать черновик в финальную отправку"""
-        draft = await self.get_test_draft(test_lesson_id, user_id)
-        if not draft:
-            return None
-        
-        # Удаляем черновик и создаем финальную отправку
-        draft_id = draft.id
-        answers = list(draft.answers or [])
-        
-        # Удаляем черновик (каскадом удалятся и ответы)
-        await self.db_session.delete(draft)
-        await self.db_session.flush()
-        
-        # Создаем финальную отправку
-        submission = TestSubmission(
-            test_lesson_id=test_lesson_id,
-            user_id=user_id,
-            total_questions=draft.total_questions,
-            checked_questions=checked_questions,
-            total_score=total_score,
-            submitted_at=datetime.utcnow(),
-            is_draft=False,
-        )
-        self.db_session.add(submission)
-        await self.db_session.flush()
-        
-        # Копируем ответы
-        for item in answers:
-            answer = TestSubmissionAnswer(
-                submission_id=submission.id,
-                question_index=item.question_index,
-                question_type=item.question_type,
-                selected_option=item.selected_option,
-                selected_options=item.selected_options,
-                text_answer=item.text_answer,
-                is_correct=item.is_correct,
-                score=item.score,
+        total_questions: Optional[int] = None,
+    ) -> Optional[int]:
+        """
+        Преобразовать черновик в финальную отправку на месте: один UPDATE переключает is_draft,
+        строки ответов остаются теми же. Возвращает id отправки или None, если черновика нет.
+        """
+        values = {
+            "is_draft": False,
+            "checked_questions": checked_questions,
+            "total_score": total_score,
+            "submitted_at": datetime.utcnow(),
+        }
+        if total_questions is not None:
+            values["total_questions"] = total_questions
+        result = await self.db_session.execute(
+            update(TestSubmission)
+            .where(
+                TestSubmission.test_lesson_id == test_lesson_id,
+                TestSubmission.user_id == user_id,
+                TestSubmission.is_draft == True,
             )
-            self.db_session.add(answer)
-        
-        await self.db_session.flush()
-        await self.db_session.refresh(submission)
-        return submission
+            .values(**values)
+            .returning(TestSubmission.id)
+        )
+        return result.scalar_one_or_none()
+
+    async def _upsert_test_answers(self, submission_id: int, answers: list[dict], graded: bool) -> None:
+        """
+        Ответы одним INSERT ... ON CONFLICT (submission_id, question_index) DO UPDATE.
+        graded=False (черновик) не трогает оценки уже сохранённых ответов.
+        """
+        if not answers:
+            return
+        query = pg_insert(TestSubmissionAnswer).values([
+            {
+                "submission_id": submission_id,
+                "question_index": item["question_index"],
+                "question_type": item["question_type"],
+                "selected_option": item.get("selected_option"),
+                "selected_options": item.get("selected_options"),
+                "text_answer": item.get("text_answer"),
+                "is_correct": item.get("is_correct"),
+                "score": item.get("score", 0.0),
+            }
+            for item in answers
+        ])
+        columns = ["question_type", "selected_option", "selected_options", "text_answer"]
+        if graded:
+            columns += ["is_correct", "score"]
+        query = query.on_conflict_do_update(
+            constraint="uq_test_submission_answer",
+            set_={column: query.excluded[column] for column in columns},
+        )
+        await self.db_session.execute(query)
 
     async def get_test_submission_with_answers(self, test_lesson_id: int, user_id: UUID) -> Optional[TestSubmission]:
         result = await self.db_session.execute(
@@ -466,27 +524,42 @@ class LessonDAL:
             .where(
                 TestSubmission.test_lesson_id == test_lesson_id,
                 TestSubmission.user_id == user_id,
+                TestSubmission.is_draft == False,
             )
         )
         return result.scalars().first()
 
-    async def get_test_submissions_with_answers(self, test_lesson_id: int) -> list[TestSubmission]:
-        result = await self.db_session.execute(
-            select(TestSubmission)
-            .options(selectinload(TestSubmission.answers))
-            .where(TestSubmission.test_lesson_id == test_lesson_id)
-        )
-        return list(result.scalars().all())
-
-    async def get_test_submissions_with_answers_by_ids(self, test_lesson_ids: list[int]) -> list[TestSubmission]:
+    async def get_test_submission_page(
+        self,
+        test_lesson_ids: list[int],
+        filters: SubmissionFilters,
+        after: Optional[tuple[datetime, int]] = None,
+        limit: Optional[int] = None,
+        with_answers: bool = True,
+    ) -> list[Row]:
+        """
+        Страница отправок тестов по (submitted_at, id): строки (TestSubmission, email,
+        first_name, last_name). Ответы подгружаются только при with_answers.
+        """
         if not test_lesson_ids:
             return []
-        result = await self.db_session.execute(
-            select(TestSubmission)
-            .options(selectinload(TestSubmission.answers))
-            .where(TestSubmission.test_lesson_id.in_(test_lesson_ids))
-        )
-        return list(result.scalars().all())
+        query = select(TestSubmission, User.email, User.first_name, User.last_name).\
+                join(User, User.user_id == TestSubmission.user_id).\
+                where(TestSubmission.test_lesson_id.in_(test_lesson_ids), *_test_submission_filters(filters, after)).\
+                order_by(TestSubmission.submitted_at, TestSubmission.id)
+        if with_answers:
+            query = query.options(selectinload(TestSubmission.answers))
+        if limit is not None:
+            query = query.limit(limit + 1)
+        result = await self.db_session.execute(query)
+        return list(result.all())
+
+    async def count_test_submissions(self, test_lesson_ids: list[int], filters: SubmissionFilters) -> int:
+        if not test_lesson_ids:
+            return 0
+        query = select(func.count()).select_from(TestSubmission).\
+                where(TestSubmission.test_lesson_id.in_(test_lesson_ids), *_test_submission_filters(filters))
+        return (await self.db_session.execute(query)).scalar_one()
 
     async def create_test_submission(
         self,
@@ -496,32 +569,43 @@ class LessonDAL:
         checked_questions: int,
         total_score: float,
         answers: list[dict],
-    ) -> TestSubmission:
-        submission = TestSubmission(
+    ) -> int:
+        """
+        Финальная отправка теста. Черновик, если он есть, становится отправкой на месте,
+        ответы записываются и оцениваются одним upsert; ответы черновика на вопросы,
+        которых нет в answers, удаляются. Возвращает id отправки.
+        """
+        submission_id = await self.convert_draft_to_submission(
             test_lesson_id=test_lesson_id,
             user_id=user_id,
-            total_questions=total_questions,
             checked_questions=checked_questions,
             total_score=total_score,
-            submitted_at=datetime.utcnow(),
+            total_questions=total_questions,
         )
-        self.db_session.add(submission)
-        await self.db_session.flush()
-
-        for item in answers:
-            answer = TestSubmissionAnswer(
-                submission_id=submission.id,
-                question_index=item["question_index"],
-                question_type=item["question_type"],
-                selected_option=item.get("selected_option"),
-                selected_options=item.get("selected_options"),
-                text_answer=item.get("text_answer"),
-                is_correct=item.get("is_correct"),
-                score=item.get("score", 0.0),
+        if submission_id is None:
+            result = await self.db_session.execute(
+                pg_insert(TestSubmission)
+                .values(
+                    test_lesson_id=test_lesson_id,
+                    user_id=user_id,
+                    total_questions=total_questions,
+                    checked_questions=checked_questions,
+                    total_score=total_score,
+                    submitted_at=datetime.utcnow(),
+                    is_draft=False,
+                )
+                .returning(TestSubmission.id)
+            )
+            submission_id = result.scalar_one()
+        else:
+            await self.db_session.execute(
+                delete(TestSubmissionAnswer).where(
+                    TestSubmissionAnswer.submission_id == submission_id,
+                    TestSubmissionAnswer.question_index.not_in([item["question_index"] for item in answers]),
+                )
             )
-            self.db_session.add(answer)
 
-        await self.db_session.flush()
-        await self.db_session.refresh(submission)
-        return submission
+        await self._upsert_test_answers(submission_id, answers, graded=True)
+        invalidate_test_analytics(test_lesson_id)
+        return submission_id
 
@@ -0,0 +1,162 @@
+from datetime import datetime
+from typing import List, Optional, Sequence
+from uuid import UUID
+
+from sqlalchemy import Boolean, Float, Integer, column, func, select, update, values
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.models.lesson import (
+    LessonBase,
+    RegradeStatus,
+    TestLesson,
+    TestRegradeJob,
+    TestSubmission,
+    TestSubmissionAnswer,
+)
+from db.models.module import Module
+
+ACTIVE_STATUSES = [RegradeStatus.PENDING.value, RegradeStatus.RUNNING.value]
+
+
+class RegradeDAL:
+    def __init__(self, db_session: AsyncSession):
+        self.db_session = db_session
+
+    async def get_course_test_lessons(self, course_id: int) -> List[TestLesson]:
+        query = select(TestLesson).\
+                join(Module, Module.id == TestLesson.module_id).\
+                where(Module.course_id == course_id, Module.is_active, TestLesson.is_active).\
+                order_by(TestLesson.id)
+        result = await self.db_session.execute(query)
+        return list(result.scalars().all())
+
+    async def get_test_lessons(self, test_lesson_ids: Sequence[int]) -> List[TestLesson]:
+        query = select(TestLesson).where(TestLesson.id.in_(test_lesson_ids)).order_by(TestLesson.id)
+        result = await self.db_session.execute(query)
+        return list(result.scalars().all())
+
+    async def get_lesson_course_id(self, lesson_id: int) -> Optional[int]:
+        query = select(Module.course_id).join(LessonBase, LessonBase.module_id == Module.id).\
+                where(LessonBase.id == lesson_id)
+        result = await self.db_session.execute(query)
+        return result.scalar_one_or_none()
+
+    async def count_submissions(self, test_lesson_ids: Sequence[int]) -> int:
+        if not test_lesson_ids:
+            return 0
+        query = select(func.count(TestSubmission.id)).\
+                where(TestSubmission.test_lesson_id.in_(test_lesson_ids), TestSubmission.is_draft == False)
+        result = await self.db_session.execute(query)
+        return result.scalar_one()
+
+    async def get_active_job(self, course_id: int, test_lesson_id: Optional[int]) -> Optional[TestRegradeJob]:
+        """Незавершённый пересчёт той же области: повторный запуск возвращает его же."""
+        query = select(TestRegradeJob).\
+                where(TestRegradeJob.course_id == course_id,
+                      TestRegradeJob.test_lesson_id.is_(None) if test_lesson_id is None
+                      else TestRegradeJob.test_lesson_id == test_lesson_id,
+                      TestRegradeJob.status.in_(ACTIVE_STATUSES)).\
+                execution_options(populate_existing=True)
+        result = await self.db_session.execute(query)
+        return result.scalars().first()
+
+    async def create_job(self, course_id: int, test_lesson_id: Optional[int], created_by: UUID,
+                         total: int) -> Optional[TestRegradeJob]:
+        """
+        Новая задача; None, если незавершённая задача той же области уже есть
+        (её только что создал параллельный запрос — уникальный индекс не даст второй).
+        """
+        table = TestRegradeJob.__table__
+        now = datetime.utcnow()
+        query = pg_insert(table).\
+                values(course_id=course_id, test_lesson_id=test_lesson_id, created_by=created_by,
+                       status=RegradeStatus.PENDING.value, total=total, processed=0, changed=0,
+                       created_at=now, heartbeat_at=now).\
+                on_conflict_do_nothing(
+                    index_elements=[table.c.course_id, func.coalesce(table.c.test_lesson_id, 0)],
+                    index_where=table.c.status.in_(ACTIVE_STATUSES),
+                ).\
+                returning(table.c.id)
+        job_id = (await self.db_session.execute(query)).scalar_one_or_none()
+        return await self.get_job(job_id) if job_id is not None else None
+
+    async def fail_stale_job(self, job_id: int, stale_before: datetime, error: str) -> bool:
+        """Помечает задачу упавшей, если от неё нет отметок с stale_before; True — если пометили."""
+        query = update(TestRegradeJob).\
+                where(TestRegradeJob.id == job_id,
+                      TestRegradeJob.status.in_(ACTIVE_STATUSES),
+                      func.coalesce(TestRegradeJob.heartbeat_at, TestRegradeJob.created_at) < stale_before).\
+                values(status=RegradeStatus.FAILED.value, error=error, finished_at=datetime.utcnow()).\
+                returning(TestRegradeJob.id)
+        return (await self.db_session.execute(query)).scalar_one_or_none() is not None
+
+    async def get_job(self, job_id: int) -> Optional[TestRegradeJob]:
+        result = await self.db_session.execute(select(TestRegradeJob).where(TestRegradeJob.id == job_id))
+        return result.scalar_one_or_none()
+
+    async def update_job(self, job_id: int, processed: int = 0, changed: int = 0, **kwargs) -> None:
+        """Прогресс прибавляется к сохранённому, остальные поля перезаписываются; заодно — отметка о работе."""
+        query = update(TestRegradeJob).\
+                where(TestRegradeJob.id == job_id).\
+                values(processed=TestRegradeJob.processed + processed,
+                       changed=TestRegradeJob.changed + changed, heartbeat_at=datetime.utcnow(), **kwargs)
+        await self.db_session.execute(query)
+
+    async def finish_job(self, job_id: int, status: RegradeStatus, error: Optional[str] = None) -> None:
+        await self.update_job(job_id, status=status.value, error=error, finished_at=datetime.utcnow())
+
+    async def get_submissions_batch(self, test_lesson_id: int, after_id: int, limit: int) -> List[Row]:
+        """
+        Следующая пачка отправок теста (по id) вместе с ответами. Отправка без ответов
+        возвращается одной строкой с answer_id = NULL.
+        """
+        submissions = select(TestSubmission.id, TestSubmission.checked_questions, TestSubmission.total_score).\
+                      where(TestSubmission.test_lesson_id == test_lesson_id,
+                            TestSubmission.is_draft == False,
+                            TestSubmission.id > after_id).\
+                      order_by(TestSubmission.id).\
+                      limit(limit).\
+                      cte("batch")
+        query = select(
+                    submissions.c.id.label("submission_id"),
+                    submissions.c.checked_questions,
+                    submissions.c.total_score,
+                    TestSubmissionAnswer.id.label("answer_id"),
+                    TestSubmissionAnswer.question_index,
+                    TestSubmissionAnswer.selected_option,
+                    TestSubmissionAnswer.selected_options,
+                    TestSubmissionAnswer.text_answer,
+                    TestSubmissionAnswer.is_correct,
+                    TestSubmissionAnswer.score,
+                ).\
+                select_from(submissions.outerjoin(TestSubmissionAnswer,
+                                                  TestSubmissionAnswer.submission_id == submissions.c.id)).\
+                order_by(submissions.c.id)
+        result = await self.db_session.execute(query)
+        return list(result.all())
+
+    async def set_answer_grades(self, grades: List[tuple[int, Optional[bool], float]]) -> None:
+        """Оценки ответов одним UPDATE ... FROM (VALUES (id, is_correct, score), ...)."""
+        if not grades:
+            return
+        rows = values(column("id", Integer), column("is_correct", Boolean), column("score", Float),
+                      name="grades").data(grades)
+        table = TestSubmissionAnswer.__table__
+        query = update(table).\
+                where(table.c.id == rows.c.id).\
+                values(is_correct=rows.c.is_correct, score=rows.c.score)
+        await self.db_session.execute(query)
+
+    async def set_submission_totals(self, totals: List[tuple[int, int, float]]) -> None:
+        """Итоги отправок одним UPDATE ... FROM (VALUES (id, checked_questions, total_score), ...)."""
+        if not totals:
+            return
+        rows = values(column("id", Integer), column("checked_questions", Integer), column("total_score", Float),
+                      name="totals").data(totals)
+        table = TestSubmission.__table__
+        query = update(table).\
+                where(table.c.id == rows.c.id).\
+                values(checked_questions=rows.c.checked_questions, total_score=rows.c.total_score)
+        await self.db_session.execute(query)
@@ -10,8 +10,16 @@ from decimal import Decimal
 from sqlalchemy import and_
 from sqlalchemy import select
 from sqlalchemy import update
+from sqlalchemy import any_
+from sqlalchemy import bindparam
+from sqlalchemy import String
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import raiseload
 from sqlalchemy.ext.asyncio import AsyncSession
 from db.models.user import User, PortalRole, Gender
+from db.session import invalidate_user_on_commit
 
 class UserDAL:
     def __init__(self, db_session: AsyncSession):
@@ -43,6 +51,37 @@ class UserDAL:
         if user_row is not None:
             return user_row[0]
 
+    async def get_user_principal_by_email(self, email: str) -> Union[Row, None]:
+        # Только колонки users: связанные курсы (lazy="selectin") не подгружаются
+        query = select(
+            User.user_id,
+            User.email,
+            User.last_name,
+            User.first_name,
+            User.patronymic,
+            User.roles,
+            User.avatar,
+            User.is_active,
+            User.token_version,
+        ).where(and_(User.email == email, User.is_active))
+        result = await self.db_session.execute(query)
+        return result.first()
+
+    async def get_user_credentials_by_email(self, email: str) -> Union[User, None]:
+        # Пользователь для проверки пароля; обращение к курсам запрещено
+        query = (
+            select(User)
+            .options(raiseload(User.teacher_courses), raiseload(User.student_courses))
+            .where(and_(User.email == email, User.is_active))
+        )
+        result = await self.db_session.execute(query)
+        return result.scalar_one_or_none()
+
+    async def get_token_version(self, user_id: UUID) -> Union[int, None]:
+        query = select(User.token_version).where(and_(User.user_id == user_id, User.is_active))
+        result = await self.db_session.execute(query)
+        return result.scalar_one_or_none()
+
     async def create_user(
             self,
             last_name: str,
@@ -81,13 +120,35 @@ class UserDAL:
         await self.db_session.flush()
         return new_user
 
+    async def get_existing_emails(self, emails: List[str]) -> set[str]:
+        """Занятые email (в том числе у неактивных пользователей) — одним запросом."""
+        if not emails:
+            return set()
+        query = select(User.email).where(User.email == any_(bindparam(None, emails, type_=ARRAY(String))))
+        result = await self.db_session.execute(query)
+        return set(result.scalars().all())
+
+    async def create_users_bulk(self, users: List[dict]) -> dict[str, UUID]:
+        """
+        Вставка пачки пользователей одним INSERT. Email, занятые к моменту вставки,
+        пропускаются (ON CONFLICT DO NOTHING). Возвращает {email: user_id} созданных.
+        """
+        if not users:
+            return {}
+        query = pg_insert(User).\
+                on_conflict_do_nothing(index_elements=[User.email]).\
+                returning(User.email, User.user_id)
+        result = await self.db_session.execute(query, users)
+        return {email: user_id for email, user_id in result.all()}
+
     async def delete_user(self, user_id: UUID) -> Union[UUID, None]:
         query = update(User).\
                 where(and_(User.user_id == user_id, User.is_active)).\
-                values(is_active=False).\
+                values(is_active=False, token_version=User.token_version + 1).\
                 returning(User.user_id)
 
         result = await self.db_session.execute(query)
+        invalidate_user_on_commit(self.db_session, user_id)
         deleted_user_id_row = result.fetchone()
         if deleted_user_id_row is not None:
             return deleted_user_id_row[0]
@@ -98,6 +159,7 @@ class UserDAL:
                 values(kwargs).\
                 returning(User.user_id)
         result = await self.db_session.execute(query)
+        invalidate_user_on_commit(self.db_session, user_id)
         updated_user_id_row = result.fetchone()
         if updated_user_id_row is not None:
             return updated_user_id_row[0]
@@ -109,6 +171,7 @@ class UserDAL:
                 returning(User.user_id)
     
         result = await self.db_session.execute(query)
+        invalidate_user_on_commit(self.db_session, user_id)
         updated_user_id_row = result.fetchone()
         if updated_user_id_row is not None:
             return updated_user_id_row[0]
@@ -123,7 +186,9 @@ class UserDAL:
             user = user_row[0]
             if role not in user.roles:
                 user.roles = user.roles + [role]
+                user.token_version = User.token_version + 1
                 await self.db_session.flush()
+                invalidate_user_on_commit(self.db_session, user_id)
             return user
         return None
 
@@ -138,16 +203,19 @@ class UserDAL:
             user = user_row[0]
             if role in user.roles:
                 user.roles = [r for r in user.roles if r != role]
+                user.token_version = User.token_version + 1
                 await self.db_session.flush()
+                invalidate_user_on_commit(self.db_session, user_id)
             return user
         return None
 
     async def set_user_roles(self, user_id: UUID, roles: List[PortalRole]) -> Union[UUID, None]:
         query = update(User).\
                 where(and_(User.user_id == user_id, User.is_active)).\
-                values(roles=roles).\
+                values(roles=roles, token_version=User.token_version + 1).\
                 returning(User.user_id)
         result = await self.db_session.execute(query)
+        invalidate_user_on_commit(self.db_session, user_id)
         updated_user_id_row = result.fetchone()
         if updated_user_id_row is not None:
             return updated_user_id_row[0]
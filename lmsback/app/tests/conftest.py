@@ -0,0 +1,92 @@
+"""
+Тесты работают с базой TEST_DATABASE_URL: схема пересоздаётся миграциями
+alembic, затем заполняется набором данных из tests/seed.py.
+"""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(APP_DIR))
+
+os.environ.setdefault("DB_ENGINE_PROFILE", "tests")
+os.environ["READ_DATABASE_URL"] = ""
+os.environ["SQL_STATS_ENABLED"] = "true"
+
+from core import config  # noqa: E402
+
+# Приложение подключается к тестовой базе
+config.REAL_DATABASE_URL = config.TEST_DATABASE_URL
+
+# main.py монтирует media/ и пишет logs/ относительно рабочего каталога
+_WORK_DIR = Path(tempfile.mkdtemp(prefix="lms-tests-"))
+(_WORK_DIR / "media").mkdir()
+os.chdir(_WORK_DIR)
+
+import httpx  # noqa: E402
+import psycopg2  # noqa: E402
+import pytest  # noqa: E402
+from alembic import command  # noqa: E402
+from alembic.config import Config  # noqa: E402
+
+from api.v1.routes.actions.auth_actions import build_access_token_claims  # noqa: E402
+from utils.security import create_access_token  # noqa: E402
+
+SYNC_TEST_DATABASE_URL = config.TEST_DATABASE_URL.replace("+asyncpg", "")
+
+
+def _reset_schema() -> None:
+    connection = psycopg2.connect(SYNC_TEST_DATABASE_URL)
+    connection.autocommit = True
+    with connection.cursor() as cursor:
+        cursor.execute("DROP SCHEMA public CASCADE")
+        cursor.execute("CREATE SCHEMA public")
+    connection.close()
+
+
+def _upgrade_schema() -> None:
+    os.environ["ALEMBIC_DATABASE_URL"] = SYNC_TEST_DATABASE_URL
+    command.upgrade(Config(str(APP_DIR / "alembic.ini")), "heads")
+
+
+@pytest.fixture(scope="session")
+def database():
+    try:
+        _reset_schema()
+    except psycopg2.OperationalError as err:
+        pytest.skip(f"Тестовая база недоступна: {err}")
+    _upgrade_schema()
+
+
+@pytest.fixture(scope="session")
+async def dataset(database):
+    from db.session import async_session, engine
+    from tests.seed import seed_dataset
+
+    async with async_session() as session:
+        async with session.begin():
+            data = await seed_dataset(session)
+    # Статистика и карта видимости для планировщика, как на рабочей базе
+    async with engine.connect() as connection:
+        connection = await connection.execution_options(isolation_level="AUTOCOMMIT")
+        await connection.exec_driver_sql("VACUUM ANALYZE")
+    yield data
+    await engine.dispose()
+
+
+@pytest.fixture(scope="session")
+async def client(dataset):
+    from main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
+
+
+@pytest.fixture(scope="session")
+def auth_headers():
+    def make_headers(user) -> dict[str, str]:
+        token = create_access_token(data=build_access_token_claims(user))
+        return {"Authorization": f"Bearer {token}"}
+    return make_headers
@@ -0,0 +1,214 @@
+"""
+Набор данных для тестов, близкий к реальной нагрузке: несколько курсов
+с модулями и уроками всех типов, десятки студентов на курс, отправки тестов
+и практик, прогресс и диалоги курсов.
+"""
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+
+from passlib.hash import bcrypt
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.models.category import Category
+from db.models.course import Course, Status, category_courses, student_courses, teacher_courses
+from db.models.dialog import Dialog, Message, dialog_members
+from db.models.lesson import (Lecture, LessonMaterial, LessonProgress, Practica, PracticaSubmission,
+                              TestCorrectAnswer, TestLesson, TestSubmission, TestSubmissionAnswer,
+                              VideoLesson)
+from db.models.module import Module
+from db.models.user import Gender, PortalRole, User
+from services.grading_service import GradingDAL
+
+PASSWORD = "password123"
+
+COURSES = 4
+TEACHERS = 3
+STUDENTS = 60
+STUDENTS_PER_COURSE = 40
+MODULES_PER_COURSE = 4
+MESSAGES_PER_DIALOG = 50
+
+QUESTIONS = [
+    {"prompt": "2 + 2", "question_type": "single", "options": ["3", "4", "5"]},
+    {"prompt": "Чётные числа", "question_type": "multiple", "options": ["1", "2", "3", "4"]},
+    {"prompt": "Столица России", "question_type": "text", "options": None},
+]
+CORRECT_ANSWERS = [
+    {"question_type": "single", "correct_option": 1},
+    {"question_type": "multiple", "correct_options": [1, 3]},
+    {"question_type": "text", "correct_text": "Москва"},
+]
+
+
+@dataclass
+class SeededCourse:
+    course: Course
+    teacher: User
+    students: list[User]
+    test_lessons: list[TestLesson] = field(default_factory=list)
+    practicas: list[Practica] = field(default_factory=list)
+    dialog: Dialog | None = None
+
+
+@dataclass
+class Dataset:
+    admin: User
+    teachers: list[User]
+    students: list[User]
+    courses: list[SeededCourse]
+
+
+def _user(index: int, role: PortalRole, hashed_password: str) -> User:
+    return User(
+        user_id=uuid.uuid4(),
+        last_name="Иванов",
+        first_name=f"Пользователь{index}",
+        email=f"{role.value.lower()}{index}@example.com",
+        roles=[PortalRole.ROLE_PORTAL_USER.value] + ([role.value] if role != PortalRole.ROLE_PORTAL_USER else []),
+        gender=[Gender.OTHER.value],
+        balance=0,
+        is_active=True,
+        hashed_password=hashed_password,
+    )
+
+
+def _lessons_for_module(module: Module, course_index: int, module_index: int) -> list:
+    prefix = f"c{course_index}-m{module_index}"
+    lecture = Lecture(module_id=module.id, name="Лекция", slug=f"{prefix}-lecture", display_order=1,
+                      lesson_type="lecture", content="Текст лекции", images=[])
+    lecture.materials = [
+        LessonMaterial(title=f"Материал {i}", file_url=f"/media/{prefix}-{i}.pdf", file_type="pdf", display_order=i)
+        for i in range(2)
+    ]
+    return [
+        lecture,
+        VideoLesson(module_id=module.id, name="Видео", slug=f"{prefix}-video", display_order=2,
+                    lesson_type="video", video_url="https://example.com/video.mp4", duration=600),
+        TestLesson(module_id=module.id, name="Тест", slug=f"{prefix}-test", display_order=3,
+                   lesson_type="test", questions=QUESTIONS),
+        Practica(module_id=module.id, name="Практика", slug=f"{prefix}-practica", display_order=4,
+                 lesson_type="practica", content="Задание", attachments=[], max_score=100),
+        Lecture(module_id=module.id, name="Итоги", slug=f"{prefix}-summary", display_order=5,
+                lesson_type="lecture", content="Итоги модуля", images=[]),
+    ]
+
+
+def _test_submission(test_lesson: TestLesson, student: User, submitted_at: datetime, correct: bool) -> TestSubmission:
+    submission = TestSubmission(
+        test_lesson_id=test_lesson.id,
+        user_id=student.user_id,
+        total_questions=len(QUESTIONS),
+        checked_questions=len(QUESTIONS),
+        total_score=3.0 if correct else 1.0,
+        submitted_at=submitted_at,
+        is_draft=False,
+    )
+    submission.answers = [
+        TestSubmissionAnswer(question_index=0, question_type="single",
+                             selected_option=1 if correct else 0, is_correct=correct, score=1.0 if correct else 0.0),
+        TestSubmissionAnswer(question_index=1, question_type="multiple",
+                             selected_options=[1, 3] if correct else [1], is_correct=correct,
+                             score=1.0 if correct else 0.0),
+        TestSubmissionAnswer(question_index=2, question_type="text",
+                             text_answer="Москва", is_correct=True, score=1.0),
+    ]
+    return submission
+
+
+async def seed_dataset(session: AsyncSession) -> Dataset:
+    # Один дешёвый хеш на всех пользователей
+    hashed_password = bcrypt.using(rounds=4).hash(PASSWORD)
+
+    admin = _user(0, PortalRole.ROLE_PORTAL_ADMIN, hashed_password)
+    teachers = [_user(i, PortalRole.ROLE_PORTAL_TEACHER, hashed_password) for i in range(TEACHERS)]
+    students = [_user(i, PortalRole.ROLE_PORTAL_USER, hashed_password) for i in range(STUDENTS)]
+    session.add_all([admin, *teachers, *students])
+
+    categories = [Category(name=f"Категория {i}", slug=f"category-{i}", display_order=i) for i in range(3)]
+    session.add_all(categories)
+
+    courses = [
+        Course(name=f"Курс {i}", slug=f"course-{i}", short_description="Описание", description="Описание",
+               image="/media/course.png", price=0, status=[Status.PUBLISHED.value], display_order=i)
+        for i in range(COURSES)
+    ]
+    session.add_all(courses)
+    await session.flush()
+
+    seeded: list[SeededCourse] = []
+    for index, course in enumerate(courses):
+        teacher = teachers[index % TEACHERS]
+        course_students = [students[(index * 7 + i) % STUDENTS] for i in range(STUDENTS_PER_COURSE)]
+        seeded.append(SeededCourse(course=course, teacher=teacher, students=course_students))
+
+        await session.execute(insert(category_courses).values(
+            category_id=categories[index % len(categories)].id, course_id=course.id))
+        await session.execute(insert(teacher_courses).values(teacher_id=teacher.user_id, course_id=course.id))
+        await session.execute(insert(student_courses), [
+            {"student_id": student.user_id, "course_id": course.id} for student in course_students
+        ])
+
+        modules = [
+            Module(course_id=course.id, name=f"Модуль {m}", slug=f"c{index}-m{m}", description="Описание модуля",
+                   display_order=m)
+            for m in range(MODULES_PER_COURSE)
+        ]
+        session.add_all(modules)
+        await session.flush()
+
+        lessons = []
+        for module_index, module in enumerate(modules):
+            lessons.extend(_lessons_for_module(module, index, module_index))
+        session.add_all(lessons)
+        await session.flush()
+
+        seeded[-1].test_lessons = [lesson for lesson in lessons if isinstance(lesson, TestLesson)]
+        seeded[-1].practicas = [lesson for lesson in lessons if isinstance(lesson, Practica)]
+
+        for test_lesson in seeded[-1].test_lessons:
+            session.add_all([
+                TestCorrectAnswer(test_lesson_id=test_lesson.id, question_index=i, **answer)
+                for i, answer in enumerate(CORRECT_ANSWERS)
+            ])
+
+        started_at = datetime(2025, 9, 1)
+        for student_index, student in enumerate(course_students):
+            submitted_at = started_at + timedelta(hours=student_index)
+            # Прогресс: студенты проходят разную долю курса
+            completed = lessons[: len(lessons) * (student_index % 4 + 1) // 4]
+            session.add_all([
+                LessonProgress(user_id=student.user_id, lesson_id=lesson.id, is_completed=True,
+                               completed_at=submitted_at)
+                for lesson in completed
+            ])
+            for test_lesson in seeded[-1].test_lessons:
+                if test_lesson in completed:
+                    session.add(_test_submission(test_lesson, student, submitted_at, correct=student_index % 3 != 0))
+            for practica in seeded[-1].practicas:
+                if practica in completed:
+                    graded = student_index % 2 == 0
+                    session.add(PracticaSubmission(
+                        practica_id=practica.id, user_id=student.user_id, text_answer="Решение",
+                        files=[], submitted_at=submitted_at, is_graded=graded,
+                        score=80 if graded else None, feedback="Хорошо" if graded else None,
+                    ))
+
+        dialog = Dialog(name=course.name, slug=f"dialog-{course.slug}", course_id=course.id, is_active=True)
+        session.add(dialog)
+        await session.flush()
+        seeded[-1].dialog = dialog
+        members = [teacher, *course_students]
+        await session.execute(insert(dialog_members), [
+            {"user_id": member.user_id, "dialog_id": dialog.id} for member in members
+        ])
+        session.add_all([
+            Message(dialog_id=dialog.id, sender_id=members[i % len(members)].user_id, content=f"Сообщение {i}")
+            for i in range(MESSAGES_PER_DIALOG)
+        ])
+        await session.flush()
+
+    # Отправки практик вставлены напрямую, счётчики непроверенных считаются один раз в конце
+    await GradingDAL(session).recount_ungraded_practicas([item.course.id for item in seeded])
+    return Dataset(admin=admin, teachers=teachers, students=students, courses=seeded)
@@ -0,0 +1,51 @@
+from utils.security import create_access_token, create_refresh_token
+
+
+def _bearer(token: str) -> dict[str, str]:
+    return {"Authorization": f"Bearer {token}"}
+
+
+async def test_pre_rollout_access_token_is_accepted(client, dataset):
+    seeded = dataset.courses[0]
+    # Токен в формате до появления user_id, ролей и версии в claims
+    legacy = _bearer(create_access_token(data={"sub": seeded.teacher.email}))
+    response = await client.get(f"/course/teachers/{seeded.course.slug}/gradebook", headers=legacy)
+    assert response.status_code == 200, response.text
+
+    student = seeded.students[0]
+    response = await client.get(f"/practica/{seeded.practicas[0].slug}/submissions/me",
+                                headers=_bearer(create_access_token(data={"sub": student.email})))
+    assert response.status_code == 200, response.text
+
+
+async def test_refresh_token_is_not_a_bearer_token(client, dataset):
+    seeded = dataset.courses[0]
+    teacher_refresh = _bearer(create_refresh_token(data={"sub": seeded.teacher.email}))
+    response = await client.get(f"/course/teachers/{seeded.course.slug}/gradebook", headers=teacher_refresh)
+    assert response.status_code == 401
+
+    student_refresh = _bearer(create_refresh_token(data={"sub": seeded.students[0].email}))
+    response = await client.get(f"/practica/{seeded.practicas[0].slug}/submissions/me", headers=student_refresh)
+    assert response.status_code == 401
+
+
+async def test_user_cache_is_invalidated_after_commit(dataset):
+    from db.session import async_session
+    from services.user_service import UserDAL
+    from utils.cache import token_version_cache
+
+    student = dataset.courses[3].students[0]
+    async with async_session() as session:
+        async with session.begin():
+            await UserDAL(session).update_user(student.user_id, first_name=student.first_name)
+            # Параллельный запрос до коммита кэширует прежнюю версию токена
+            token_version_cache.set(student.user_id, -1)
+        assert token_version_cache.get(student.user_id) is None
+
+        token_version_cache.set(student.user_id, -1)
+        async with session.begin():
+            await UserDAL(session).update_user(student.user_id, first_name=student.first_name)
+            await session.rollback()
+        # Откат ничего не изменил — кэш остаётся
+        assert token_version_cache.get(student.user_id) == -1
+    token_version_cache.invalidate(student.user_id)
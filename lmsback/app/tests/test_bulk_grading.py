@@ -0,0 +1,53 @@
+import re
+
+_SERVER_TIMING_QUERIES = re.compile(r'desc="(\d+) queries"')
+
+
+async def test_bulk_grading(client, dataset, auth_headers):
+    seeded = dataset.courses[2]
+    headers = auth_headers(seeded.teacher)
+    counters = (await client.get("/practica/queue/counters", headers=headers)).json()
+    ungraded = next(item["ungraded"] for item in counters if item["course_id"] == seeded.course.id)
+
+    pending = []
+    for practica in seeded.practicas[:2]:
+        submissions = (await client.get(f"/practica/{practica.slug}/submissions", headers=headers,
+                                        params={"graded": False, "limit": 2})).json()
+        pending += [(practica.slug, item["user_id"], item["id"]) for item in submissions]
+    assert len(pending) == 4
+
+    foreign = dataset.courses[0].practicas[0]
+    items = [{"lesson_slug": slug, "student_user_id": user_id, "score": 70 + i, "feedback": f"Отзыв {i}"}
+             for i, (slug, user_id, _) in enumerate(pending)]
+    items += [
+        {"lesson_slug": pending[0][0], "student_user_id": pending[0][1], "score": 10},
+        {"lesson_slug": foreign.slug, "student_user_id": pending[0][1], "score": 10},
+        {"lesson_slug": pending[0][0], "student_user_id": str(dataset.admin.user_id), "score": 10},
+    ]
+    response = await client.patch("/practica/submissions/grade", headers=headers, json={"items": items})
+    assert response.status_code == 200, response.text
+    # Практики, блокировка отправок, UPDATE оценок, UPDATE счётчиков (и проверка токена)
+    assert int(_SERVER_TIMING_QUERIES.search(response.headers["server-timing"]).group(1)) <= 5
+
+    body = response.json()
+    assert body["graded"] == 4
+    assert [result["status"] for result in body["results"]] == ["graded"] * 4 + ["duplicate", "not_found", "not_found"]
+    assert [result["submission_id"] for result in body["results"][:4]] == [submission_id for *_, submission_id in pending]
+
+    counters = (await client.get("/practica/queue/counters", headers=headers)).json()
+    assert next(item["ungraded"] for item in counters if item["course_id"] == seeded.course.id) == ungraded - 4
+    graded = (await client.get(f"/practica/{pending[0][0]}/submissions", headers=headers,
+                               params={"student_id": pending[0][1]})).json()
+    assert (graded[0]["score"], graded[0]["feedback"], graded[0]["is_graded"]) == (70, "Отзыв 0", True)
+
+    # Повторная отправка студентами возвращает решения на проверку
+    students = {str(student.user_id): student for student in seeded.students}
+    for slug, user_id, _ in pending:
+        response = await client.post(f"/practica/{slug}/submissions", headers=auth_headers(students[user_id]),
+                                     data={"text_answer": "Решение"})
+        assert response.status_code == 200, response.text
+    counters = (await client.get("/practica/queue/counters", headers=headers)).json()
+    assert next(item["ungraded"] for item in counters if item["course_id"] == seeded.course.id) == ungraded
+
+    response = await client.patch("/practica/submissions/grade", headers=headers, json={"items": []})
+    assert response.status_code == 422
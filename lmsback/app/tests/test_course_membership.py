@@ -0,0 +1,45 @@
+from services.course_service import CourseDAL
+
+
+async def test_membership_checks(dataset):
+    from db.session import async_session
+
+    seeded = dataset.courses[0]
+    outsider = next(student for student in dataset.students if student not in seeded.students)
+
+    async with async_session() as session:
+        course_dal = CourseDAL(session)
+        assert await course_dal.is_user_enrolled(seeded.course.id, seeded.students[0].user_id)
+        assert not await course_dal.is_user_enrolled(seeded.course.id, outsider.user_id)
+        assert await course_dal.is_user_teacher(seeded.course.id, seeded.teacher.user_id)
+        assert not await course_dal.is_user_teacher(seeded.course.id, seeded.students[0].user_id)
+
+        students = await course_dal.get_course_students(seeded.course.id)
+        assert {student.user_id for student in students} == {student.user_id for student in seeded.students}
+        teachers = await course_dal.get_course_teachers(seeded.course.id)
+        assert [teacher.user_id for teacher in teachers] == [seeded.teacher.user_id]
+
+
+async def test_membership_batch_is_one_query(client, dataset, auth_headers):
+    pairs = [
+        {"user_id": str(user.user_id), "course_id": seeded.course.id}
+        for seeded in dataset.courses
+        for user in (seeded.teacher, *dataset.students)
+    ]
+    headers = auth_headers(dataset.admin)
+    # Первый запрос прогревает кэш версии токена
+    await client.post("/course/memberships", json={"pairs": pairs[:1]}, headers=headers)
+    response = await client.post("/course/memberships", json={"pairs": pairs}, headers=headers)
+    assert response.status_code == 200, response.text
+    assert 'desc="1 queries"' in response.headers["server-timing"]
+
+    memberships = response.json()
+    assert [(item["user_id"], item["course_id"]) for item in memberships] == \
+        [(pair["user_id"], pair["course_id"]) for pair in pairs]
+    for seeded in dataset.courses:
+        enrolled = {str(student.user_id) for student in seeded.students}
+        for item in memberships:
+            if item["course_id"] != seeded.course.id:
+                continue
+            assert item["is_student"] == (item["user_id"] in enrolled)
+            assert item["is_teacher"] == (item["user_id"] == str(seeded.teacher.user_id))
@@ -0,0 +1,58 @@
+import uuid
+
+from services.course_service import CourseDAL
+
+
+async def test_bulk_enroll_and_unenroll(dataset):
+    from db.session import async_session
+
+    seeded = dataset.courses[0]
+    outsiders = [student for student in dataset.students if student not in seeded.students]
+    missing = uuid.uuid4()
+
+    async with async_session() as session:
+        await session.begin()
+        course_dal = CourseDAL(session)
+
+        enrolled = await course_dal.enroll_students(
+            seeded.course.id, [seeded.students[0].user_id, *(s.user_id for s in outsiders), missing],
+        )
+        assert enrolled[seeded.students[0].user_id] is False
+        assert all(enrolled[student.user_id] for student in outsiders)
+        assert missing not in enrolled
+
+        removed = await course_dal.unenroll_students(seeded.course.id, [s.user_id for s in outsiders] + [missing])
+        assert set(removed) == {student.user_id for student in outsiders}
+        await session.rollback()
+
+
+async def test_roster_import_reports_every_row(client, dataset, auth_headers):
+    from db.session import async_session
+
+    seeded = dataset.courses[1]
+    outsider = next(student for student in dataset.students if student not in seeded.students)
+    roster = "\n".join([
+        "Фамилия;Email",
+        f"Иванов;{seeded.students[0].email.upper()}",
+        f"Иванов;{outsider.email}",
+        "Иванов;nobody@example.com",
+        "Иванов;not-an-email",
+        f"Иванов;{outsider.email}",
+    ])
+
+    response = await client.post(
+        f"/course/students/import?course_id={seeded.course.id}",
+        files={"file": ("roster.csv", roster.encode(), "text/csv")},
+        headers=auth_headers(dataset.admin),
+    )
+    assert response.status_code == 200, response.text
+
+    async with async_session() as session:
+        async with session.begin():
+            await CourseDAL(session).unenroll_students(seeded.course.id, [outsider.user_id])
+
+    report = response.json()
+    assert [(row["row"], row["status"]) for row in report["rows"]] == [
+        (2, "already_enrolled"), (3, "enrolled"), (4, "not_found"), (5, "invalid"), (6, "duplicate"),
+    ]
+    assert report["total"] == 5 and report["enrolled"] == 1
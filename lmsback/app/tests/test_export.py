@@ -0,0 +1,47 @@
+import csv
+import io
+
+from openpyxl import load_workbook
+
+
+def _csv(response) -> list[list[str]]:
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"].startswith("text/csv")
+    assert "attachment" in response.headers["content-disposition"]
+    return list(csv.reader(io.StringIO(response.content.decode("utf-8-sig")), delimiter=";"))
+
+
+async def test_export_submissions_and_gradebook(client, dataset, auth_headers):
+    seeded = dataset.courses[0]
+    headers = auth_headers(seeded.teacher)
+    slug = seeded.course.slug
+
+    rows = _csv(await client.get(f"/lesson/test/course/{slug}/submissions/export", headers=headers))
+    submissions = (await client.get(f"/lesson/test/course/{slug}/submissions", headers=headers)).json()
+    assert rows[0][:3] == ["Урок", "Slug", "Email"]
+    assert len(rows) - 1 == len(submissions)
+    assert {row[-1] for row in rows[1:]} == {"3.0", "1.0"}
+
+    rows = _csv(await client.get(f"/practica/course/{slug}/submissions/export?format=csv", headers=headers))
+    practica_submissions = (await client.get(f"/practica/course/{slug}/submissions", headers=headers)).json()
+    assert len(rows) - 1 == len(practica_submissions)
+    assert {(row[7], row[8]) for row in rows[1:]} == {("True", "80"), ("False", "")}
+
+    response = await client.get(f"/practica/course/{slug}/submissions/export?format=xlsx", headers=headers)
+    assert response.status_code == 200, response.text
+    workbook = load_workbook(io.BytesIO(response.content), read_only=True)
+    assert len(list(workbook.active.iter_rows(values_only=True))) == len(rows)
+
+    rows = _csv(await client.get(f"/course/teachers/{slug}/gradebook/export", headers=headers))
+    gradebook = (await client.get(f"/course/teachers/{slug}/gradebook", headers=headers)).json()
+    assert len(rows[0]) == 3 + len(gradebook["lessons"]["id"])
+    assert [row[0] for row in rows[1:]] == gradebook["students"]["email"]
+    test_column = 3 + gradebook["lessons"]["lesson_type"].index("test")
+    practica_column = 3 + gradebook["lessons"]["lesson_type"].index("practica")
+    # Первый тест и первую практику курса проходят все студенты
+    assert {row[test_column] for row in rows[1:]} == {"3.0", "1.0"}
+    assert {row[practica_column] for row in rows[1:]} == {"80", "на проверке"}
+
+    other_teacher = next(teacher for teacher in dataset.teachers if teacher != seeded.teacher)
+    response = await client.get(f"/course/teachers/{slug}/gradebook/export", headers=auth_headers(other_teacher))
+    assert response.status_code == 404
@@ -0,0 +1,33 @@
+async def test_gradebook_matrix(client, dataset, auth_headers):
+    seeded = dataset.courses[0]
+    response = await client.get(f"/course/teachers/{seeded.course.slug}/gradebook", headers=auth_headers(seeded.teacher))
+    assert response.status_code == 200, response.text
+
+    gradebook = response.json()
+    students, lessons, cells = gradebook["students"], gradebook["lessons"], gradebook["cells"]
+    assert sorted(students["email"]) == sorted(student.email for student in seeded.students)
+    assert set(len(column) for column in lessons.values()) == {len(lessons["id"])}
+
+    def _cells(group: str) -> dict:
+        columns = cells[group]
+        assert len(set(len(column) for column in columns.values())) == 1
+        return {
+            (students["email"][row], lessons["id"][col]): values
+            for row, col, *values in zip(*columns.values())
+        }
+
+    completed, tests, practicas = _cells("completed"), _cells("tests"), _cells("practicas")
+    test_ids = {lesson.id for lesson in seeded.test_lessons}
+    practica_ids = {lesson.id for lesson in seeded.practicas}
+    for student_index, student in enumerate(seeded.students):
+        expected = lessons["id"][: len(lessons["id"]) * (student_index % 4 + 1) // 4]
+        assert {lesson_id for email, lesson_id in completed if email == student.email} == set(expected)
+        for lesson_id in expected:
+            if lesson_id in test_ids:
+                assert tests[(student.email, lesson_id)] == [3.0 if student_index % 3 != 0 else 1.0]
+            if lesson_id in practica_ids:
+                assert practicas[(student.email, lesson_id)] == ([80, True] if student_index % 2 == 0 else [None, False])
+
+    other_teacher = next(teacher for teacher in dataset.teachers if teacher != seeded.teacher)
+    response = await client.get(f"/course/teachers/{seeded.course.slug}/gradebook", headers=auth_headers(other_teacher))
+    assert response.status_code == 404
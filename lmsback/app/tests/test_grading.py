@@ -0,0 +1,50 @@
+from types import SimpleNamespace
+
+from services.lesson_service import LessonDAL
+from utils.cache import answer_key_cache
+from utils.grading import compile_answer_key, grade_answers
+
+
+def _correct(option=None, options=None, text=None):
+    return SimpleNamespace(correct_option=option, correct_options=options, correct_text=text)
+
+
+def test_answer_key_grading():
+    questions = [
+        {"question_type": "single"},
+        {"question_type": "multiple"},
+        {"question_type": "text"},
+        {"question_type": "text"},
+        "legacy",
+        {"question_type": "single"},
+    ]
+    key = compile_answer_key(1, None, questions, {
+        0: _correct(option=1),
+        1: _correct(options=[3, 1]),
+        2: _correct(text="  Москва "),
+        3: _correct(text="   "),
+    })
+    assert key.question_types == ("single", "multiple", "text", "text", None, "single")
+
+    graded = grade_answers(key, [1, [1, 3, "x"], "МОСКВА", "что угодно", None, 0])
+    assert graded.results == [(True, 1.0), (True, 1.0), (True, 1.0), (None, 0.0), (None, 0.0), (None, 0.0)]
+    assert (graded.checked, graded.total_score) == (3, 3.0)
+
+    graded = grade_answers(key, ["1", [1], "Питер", None, None, None])
+    assert graded.results[:3] == [(None, 0.0), (False, 0.0), (False, 0.0)]
+    assert (graded.checked, graded.total_score) == (2, 0.0)
+
+
+async def test_answer_key_cache_is_invalidated(dataset):
+    from db.session import async_session
+
+    test_lesson = dataset.courses[0].test_lessons[0]
+    cache_key = (test_lesson.id, test_lesson.updated_at)
+    answer_key_cache.set(cache_key, compile_answer_key(test_lesson.id, test_lesson.updated_at, [], {}))
+
+    async with async_session() as session:
+        await session.begin()
+        await LessonDAL(session).replace_test_correct_answers(test_lesson.id, [])
+        await session.rollback()
+
+    assert answer_key_cache.get(cache_key) is None
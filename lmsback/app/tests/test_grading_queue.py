@@ -0,0 +1,47 @@
+async def _counter(client, headers, course_id: int) -> int:
+    response = await client.get("/practica/queue/counters", headers=headers)
+    assert response.status_code == 200, response.text
+    return next(item["ungraded"] for item in response.json() if item["course_id"] == course_id)
+
+
+async def test_grading_queue_and_counters(client, dataset, auth_headers):
+    seeded = dataset.courses[2]
+    headers = auth_headers(seeded.teacher)
+    practica = seeded.practicas[0]
+    ungraded = await _counter(client, headers, seeded.course.id)
+    submissions = (await client.get(f"/practica/course/{seeded.course.slug}/submissions", headers=headers,
+                                    params={"graded": False})).json()
+    assert ungraded == len(submissions) > 0
+
+    queue, cursor = [], None
+    while True:
+        response = await client.get("/practica/queue", headers=headers,
+                                    params={"limit": 9, "course_slug": seeded.course.slug,
+                                            **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200, response.text
+        queue += response.json()
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+    assert [item["id"] for item in queue] == [item["id"] for item in submissions]
+    assert [item["submitted_at"] for item in queue] == sorted(item["submitted_at"] for item in queue)
+
+    # Оценка убирает отправку из очереди, повторная отправка студентом возвращает её
+    oldest = next(item for item in queue if item["practica_id"] == practica.id)
+    response = await client.patch(f"/practica/{practica.slug}/submissions/{oldest['user_id']}/grade",
+                                  headers=headers, json={"score": 90})
+    assert response.status_code == 200, response.text
+    assert await _counter(client, headers, seeded.course.id) == ungraded - 1
+    first = (await client.get("/practica/queue", headers=headers, params={"limit": 1})).json()
+    assert first[0]["id"] != oldest["id"]
+
+    student = next(student for student in seeded.students if str(student.user_id) == oldest["user_id"])
+    response = await client.post(f"/practica/{practica.slug}/submissions", headers=auth_headers(student),
+                                 data={"text_answer": "Решение"})
+    assert response.status_code == 200, response.text
+    assert await _counter(client, headers, seeded.course.id) == ungraded
+
+    other_teacher = next(teacher for teacher in dataset.teachers if teacher != seeded.teacher)
+    response = await client.get("/practica/queue", headers=auth_headers(other_teacher),
+                                params={"course_slug": seeded.course.slug})
+    assert response.status_code == 404
@@ -0,0 +1,93 @@
+"""
+Проверка, что запросы DAL используют индексы горячих фильтров.
+
+Запросы перехватываются при вызове методов DAL на тестовых данных и затем
+выполняются через EXPLAIN. Таблицы тестовой базы маленькие, и планировщик
+предпочёл бы последовательное чтение, поэтому оно отключается
+(enable_seqscan = off): в плане остаётся индекс, если он вообще применим.
+"""
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from services.course_service import CourseDAL
+from services.grading_service import GradingDAL
+from services.lesson_service import LessonDAL, SubmissionFilters
+from services.message_service import MessageDAL
+
+
+@dataclass(frozen=True)
+class IndexCase:
+    name: str
+    call: Callable[[AsyncSession, object], Awaitable]
+    indexes: tuple[str, ...]
+
+
+CASES = [
+    IndexCase("course outline", lambda s, d: CourseDAL(s).get_course_by_slug(d.courses[0].course.slug),
+              # teacher_courses устроена так же, но в тестовых данных у курса один преподаватель
+              ("ix_modules_course_id", "ix_lessons_module_id", "ix_student_courses_course_id")),
+    IndexCase("student course outline",
+              lambda s, d: CourseDAL(s).get_user_course_by_slug(d.courses[0].students[0].user_id,
+                                                                d.courses[0].course.slug),
+              ("ix_lessons_module_active",)),
+    IndexCase("course catalogue", lambda s, d: CourseDAL(s).get_course_all(d.students[0].user_id),
+              ("ix_courses_published",)),
+    IndexCase("completed lessons",
+              lambda s, d: LessonDAL(s).get_completed_lesson_ids(d.courses[0].students[3].user_id,
+                                                                 d.courses[0].course.id),
+              ("ix_lesson_progress_user_completed",)),
+    IndexCase("test submission",
+              lambda s, d: LessonDAL(s).get_test_submission(d.courses[0].test_lessons[0].id,
+                                                            d.courses[0].students[3].user_id),
+              ("uq_user_test_submission_draft",)),
+    IndexCase("practica submissions",
+              lambda s, d: LessonDAL(s).get_practica_submission_page([d.courses[0].practicas[0].id],
+                                                                     SubmissionFilters(), limit=20),
+              ("ix_practica_submissions_practica_submitted",)),
+    IndexCase("test submissions",
+              lambda s, d: LessonDAL(s).get_test_submission_page([d.courses[0].test_lessons[0].id],
+                                                                 SubmissionFilters(), limit=20),
+              ("ix_test_submissions_lesson_submitted",)),
+    IndexCase("grading queue",
+              lambda s, d: GradingDAL(s).get_ungraded_page([lesson.id for lesson in d.courses[0].practicas]),
+              ("ix_practica_submissions_ungraded",)),
+    IndexCase("dialog messages", lambda s, d: MessageDAL(s).get_dialog_messages(d.courses[0].dialog.id),
+              ("idx_message_dialog_created",)),
+]
+
+
+async def _explain(case: IndexCase, dataset) -> str:
+    """Планы всех запросов, которые выполняет вызов DAL."""
+    from db.session import engine
+
+    statements: list[tuple[str, tuple]] = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    async with engine.connect() as connection:
+        await connection.exec_driver_sql("SET LOCAL enable_seqscan = off")
+
+        event.listen(connection.sync_connection, "before_cursor_execute", capture)
+        try:
+            await case.call(AsyncSession(bind=connection), dataset)
+        finally:
+            event.remove(connection.sync_connection, "before_cursor_execute", capture)
+
+        plans = []
+        for statement, parameters in statements:
+            result = await connection.exec_driver_sql(f"EXPLAIN {statement}", parameters)
+            plans.append("\n".join(row[0] for row in result))
+        await connection.rollback()
+    return "\n\n".join(plans)
+
+
+@pytest.mark.parametrize("case", CASES, ids=lambda case: case.name)
+async def test_dal_queries_use_indexes(case, dataset):
+    plan = await _explain(case, dataset)
+    for index in case.indexes:
+        assert index in plan, f"{case.name}: индекс {index} не используется\n{plan}"
@@ -0,0 +1,43 @@
+from passlib.hash import bcrypt
+
+from itertools import count
+
+from utils import hashing
+from utils.hashing import BCRYPT_ROUNDS_FLOOR, calibrate_bcrypt_rounds, configure_password_hashing, pwd_context
+
+
+async def test_stored_bcrypt_rounds_only_grow(dataset):
+    from db.session import async_session
+    from services.admin_service import AdminDAL
+
+    async with async_session() as session:
+        async with session.begin():
+            admin_dal = AdminDAL(session)
+            assert await admin_dal.store_bcrypt_rounds(13) == 13
+            # Воркер с меньшей калибровкой получает уже сохранённое значение, а не своё
+            assert await admin_dal.store_bcrypt_rounds(12) == 13
+            # Более медленное железо повышает общую стоимость
+            assert await admin_dal.store_bcrypt_rounds(14) == 14
+            await session.rollback()
+
+
+def test_configured_rounds_only_upgrade_weaker_hashes():
+    saved = pwd_context.to_dict()
+    try:
+        # Калибровка на быстром железе не опускает стоимость ниже прежней (12)
+        assert configure_password_hashing(10) == 12
+        assert pwd_context.needs_update(bcrypt.using(rounds=10).hash("password"))
+        assert not pwd_context.needs_update(bcrypt.using(rounds=12).hash("password"))
+        assert not pwd_context.needs_update(bcrypt.using(rounds=13).hash("password"))
+    finally:
+        pwd_context.load(saved)
+
+
+def test_calibration_raises_rounds_above_floor(monkeypatch):
+    # Замер пробного уровня (8 раундов) всегда 4 мс: 12 раундов — 64 мс
+    ticks = count()
+    monkeypatch.setattr(hashing.time, "perf_counter", lambda: next(ticks) * 0.004)
+    assert calibrate_bcrypt_rounds(64, BCRYPT_ROUNDS_FLOOR, 16) == 12
+    # Цель вчетверо дороже стоимости нижней границы — на два раунда больше
+    assert calibrate_bcrypt_rounds(256, BCRYPT_ROUNDS_FLOOR, 16) == 14 > BCRYPT_ROUNDS_FLOOR
+    assert calibrate_bcrypt_rounds(256, BCRYPT_ROUNDS_FLOOR, 13) == 13
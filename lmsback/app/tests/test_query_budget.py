@@ -0,0 +1,88 @@
+"""
+Бюджет SQL-запросов и времени ответа для основных эндпоинтов.
+
+Число запросов берётся из заголовка Server-Timing (utils/sql_stats.py).
+Замеряется повторный запрос: кэши аутентификации уже прогреты, поэтому
+в бюджет входят только запросы самого эндпоинта. Если эндпоинт начал
+делать больше запросов (новая lazy-связь, N+1), тест падает.
+"""
+import os
+import re
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+import pytest
+
+# Множитель лимитов времени для медленных CI-машин
+LATENCY_FACTOR = float(os.environ.get("QUERY_BUDGET_LATENCY_FACTOR", "1"))
+
+_SERVER_TIMING_QUERIES = re.compile(r'db;dur=[\d.]+;desc="(\d+) queries"')
+
+
+@dataclass(frozen=True)
+class Budget:
+    name: str
+    path: Callable
+    user: Callable
+    max_queries: int
+    max_ms: int
+
+
+BUDGETS = [
+    Budget("course outline", lambda d: f"/course/?slug={d.courses[0].course.slug}",
+           lambda d: None, max_queries=11, max_ms=300),
+    Budget("student course outline", lambda d: f"/course/educations/{d.courses[0].course.slug}",
+           lambda d: d.courses[0].students[0], max_queries=11, max_ms=300),
+    Budget("teacher course outline", lambda d: f"/course/teachers/{d.courses[0].course.slug}",
+           lambda d: d.courses[0].teacher, max_queries=12, max_ms=300),
+    Budget("progress full", lambda d: f"/lessons/progress-full/{d.courses[0].course.slug}",
+           lambda d: d.courses[0].students[3], max_queries=14, max_ms=300),
+    Budget("test submissions by lesson", lambda d: f"/lesson/test/{d.courses[0].test_lessons[0].slug}/submissions",
+           lambda d: d.courses[0].teacher, max_queries=7, max_ms=300),
+    Budget("test submissions by course", lambda d: f"/lesson/test/course/{d.courses[0].course.slug}/submissions",
+           lambda d: d.courses[0].teacher, max_queries=15, max_ms=500),
+    Budget("practica submissions by lesson", lambda d: f"/practica/{d.courses[0].practicas[0].slug}/submissions",
+           lambda d: d.courses[0].teacher, max_queries=6, max_ms=300),
+    Budget("practica submissions by course", lambda d: f"/practica/course/{d.courses[0].course.slug}/submissions",
+           lambda d: d.courses[0].teacher, max_queries=14, max_ms=500),
+    Budget("course gradebook", lambda d: f"/course/teachers/{d.courses[0].course.slug}/gradebook",
+           lambda d: d.courses[0].teacher, max_queries=4, max_ms=300),
+    Budget("admin users", lambda d: "/admin/user/all",
+           lambda d: d.admin, max_queries=5, max_ms=300),
+    Budget("admin courses", lambda d: "/admin/course/all",
+           lambda d: d.admin, max_queries=11, max_ms=500),
+    Budget("dialog list", lambda d: "/dialog/list",
+           lambda d: d.courses[0].students[0], max_queries=5, max_ms=300),
+    Budget("course catalogue", lambda d: "/course/list",
+           lambda d: d.courses[0].students[0], max_queries=2, max_ms=200),
+]
+
+
+def _query_count(response) -> int:
+    match = _SERVER_TIMING_QUERIES.search(response.headers.get("server-timing", ""))
+    assert match is not None, "нет заголовка Server-Timing"
+    return int(match.group(1))
+
+
+@pytest.mark.parametrize("budget", BUDGETS, ids=lambda budget: budget.name)
+async def test_query_budget(budget, client, dataset, auth_headers):
+    user = budget.user(dataset)
+    headers = auth_headers(user) if user is not None else {}
+    path = budget.path(dataset)
+
+    # Прогрев: кэши аутентификации и пул соединений
+    response = await client.get(path, headers=headers)
+    assert response.status_code == 200, response.text
+
+    started_at = time.perf_counter()
+    response = await client.get(path, headers=headers)
+    elapsed_ms = (time.perf_counter() - started_at) * 1000
+    assert response.status_code == 200, response.text
+
+    queries = _query_count(response)
+    measured = f"{budget.name}: {queries} SQL-запросов, {elapsed_ms:.1f} мс"
+    assert queries <= budget.max_queries, f"{measured}; бюджет {budget.max_queries} запросов"
+    assert elapsed_ms <= budget.max_ms * LATENCY_FACTOR, (
+        f"{measured}; бюджет {budget.max_ms * LATENCY_FACTOR:.0f} мс"
+    )
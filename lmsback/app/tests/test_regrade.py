@@ -0,0 +1,104 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, select, update
+
+from db.models.lesson import (TestCorrectAnswer as CorrectAnswer, TestRegradeJob as RegradeJob,
+                              TestSubmission as Submission)
+
+
+async def _regrade(client, url, headers) -> dict:
+    response = await client.post(url, headers=headers)
+    assert response.status_code == 202, response.text
+    job = response.json()
+    for _ in range(200):
+        if job["status"] in ("done", "failed"):
+            return job
+        await asyncio.sleep(0.05)
+        job = (await client.get(f"/lesson/test/regrade/{job['id']}", headers=headers)).json()
+    raise AssertionError(f"Пересчёт не завершился: {job}")
+
+
+async def _set_correct_option(test_lesson_id: int, option: int) -> None:
+    from db.session import async_session
+
+    async with async_session() as session:
+        async with session.begin():
+            await session.execute(
+                update(CorrectAnswer)
+                .where(CorrectAnswer.test_lesson_id == test_lesson_id, CorrectAnswer.question_index == 0)
+                .values(correct_option=option)
+            )
+
+
+async def _totals(test_lesson_id: int) -> set[tuple[int, float]]:
+    from db.session import async_session
+
+    async with async_session() as session:
+        result = await session.execute(
+            select(Submission.checked_questions, Submission.total_score)
+            .where(Submission.test_lesson_id == test_lesson_id, Submission.is_draft == False)
+        )
+        return set(result.all())
+
+
+async def test_regrade_after_answer_key_fix(client, dataset, auth_headers):
+    seeded = dataset.courses[1]
+    test_lesson = seeded.test_lessons[0]
+    headers = auth_headers(seeded.teacher)
+    before = await _totals(test_lesson.id)
+    assert before == {(3, 3.0), (3, 1.0)}
+
+    # Ключ исправлен: правильный вариант первого вопроса — 0, а не 1
+    await _set_correct_option(test_lesson.id, 0)
+    try:
+        job = await _regrade(client, f"/lesson/test/{test_lesson.slug}/regrade", headers)
+        assert job["status"] == "done", job
+        assert job["processed"] == job["total"] > 0
+        assert job["changed"] == job["total"] and job["progress"] == 1.0
+        assert await _totals(test_lesson.id) == {(3, 2.0)}
+    finally:
+        await _set_correct_option(test_lesson.id, 1)
+
+    job = await _regrade(client, f"/lesson/test/course/{seeded.course.slug}/regrade", headers)
+    assert job["status"] == "done", job
+    assert job["test_lesson_id"] is None
+    assert await _totals(test_lesson.id) == before
+
+    other_teacher = next(teacher for teacher in dataset.teachers if teacher != seeded.teacher)
+    response = await client.get(f"/lesson/test/regrade/{job['id']}", headers=auth_headers(other_teacher))
+    assert response.status_code == 404
+
+
+async def test_stale_regrade_job_is_replaced(client, dataset, auth_headers):
+    from db.session import async_session
+
+    seeded = dataset.courses[1]
+    test_lesson = seeded.test_lessons[1]
+    headers = auth_headers(seeded.teacher)
+    # Задача, чей воркер был убит: «идёт», но давно без отметок
+    long_ago = datetime.utcnow() - timedelta(hours=1)
+    async with async_session() as session:
+        async with session.begin():
+            stale_id = (await session.execute(
+                insert(RegradeJob).values(course_id=seeded.course.id, test_lesson_id=test_lesson.id,
+                                          created_by=seeded.teacher.user_id, status="running", total=1,
+                                          processed=0, changed=0, created_at=long_ago, heartbeat_at=long_ago)
+                .returning(RegradeJob.id)
+            )).scalar_one()
+
+    url = f"/lesson/test/{test_lesson.slug}/regrade"
+    # Параллельные запросы получают одну и ту же новую задачу
+    first, second = await asyncio.gather(client.post(url, headers=headers), client.post(url, headers=headers))
+    assert first.status_code == second.status_code == 202, (first.text, second.text)
+    first, second = first.json(), second.json()
+    assert stale_id not in (first["id"], second["id"])
+    if first["id"] != second["id"]:
+        # Вторая задача допустима, только если первая успела завершиться
+        earlier = min(first["id"], second["id"])
+        assert (await client.get(f"/lesson/test/regrade/{earlier}", headers=headers)).json()["status"] == "done"
+
+    stale = (await client.get(f"/lesson/test/regrade/{stale_id}", headers=headers)).json()
+    assert stale["status"] == "failed" and stale["error"]
+    job = await _regrade(client, url, headers)
+    assert job["status"] == "done", job
@@ -0,0 +1,42 @@
+async def _pages(client, url: str, headers: dict, **params) -> list[list[dict]]:
+    pages, cursor = [], None
+    while True:
+        response = await client.get(url, headers=headers, params={**params, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200, response.text
+        pages.append(response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            return pages
+
+
+async def test_submission_pages_and_filters(client, dataset, auth_headers):
+    seeded = dataset.courses[0]
+    headers = auth_headers(seeded.teacher)
+    slug = seeded.course.slug
+
+    url = f"/practica/course/{slug}/submissions"
+    full = (await client.get(url, headers=headers)).json()
+    pages = await _pages(client, url, headers, limit=7)
+    assert all(len(page) == 7 for page in pages[:-1]) and 0 < len(pages[-1]) <= 7
+    assert [item["id"] for page in pages for item in page] == [item["id"] for item in full]
+
+    graded = (await client.get(url, headers=headers, params={"graded": True, "summary": True})).json()
+    assert graded and all(item["is_graded"] and item["text_answer"] is None for item in graded)
+    count = (await client.get(f"{url}/count", headers=headers, params={"graded": False})).json()
+    assert count["total"] == len(full) - len(graded)
+
+    test_lesson = seeded.test_lessons[0]
+    student = seeded.students[0]
+    url = f"/lesson/test/course/{slug}/submissions"
+    params = {"lesson_slug": test_lesson.slug, "student_id": str(student.user_id), "summary": True}
+    items = (await client.get(url, headers=headers, params=params)).json()
+    assert len(items) == 1 and items[0]["user_email"] == student.email and items[0]["answers"] is None
+    count = (await client.get(f"/lesson/test/{test_lesson.slug}/submissions/count", headers=headers)).json()
+    pages = await _pages(client, f"/lesson/test/{test_lesson.slug}/submissions", headers, limit=15)
+    assert count["total"] == sum(len(page) for page in pages) == len(seeded.students)
+    assert all(item["answers"] for page in pages for item in page)
+
+    response = await client.get(url, headers=headers, params={"limit": 5, "cursor": "не-курсор"})
+    assert response.status_code == 400
+    response = await client.get(url, headers=headers, params={"lesson_slug": "missing"})
+    assert response.status_code == 404
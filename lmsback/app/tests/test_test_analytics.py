@@ -0,0 +1,61 @@
+import re
+
+from sqlalchemy import delete, select
+
+from db.models.lesson import TestSubmission as Submission, TestSubmissionAnswer as SubmissionAnswer
+
+
+def _queries(response) -> int:
+    return int(re.search(r'desc="(\d+) queries"', response.headers["server-timing"]).group(1))
+
+
+async def test_item_analysis_cached_until_new_submission(client, dataset, auth_headers):
+    from db.session import async_session
+
+    seeded = dataset.courses[3]
+    test_lesson = seeded.test_lessons[-1]
+    headers = auth_headers(seeded.teacher)
+    url = f"/lesson/test/{test_lesson.slug}/analytics"
+
+    async with async_session() as session:
+        totals = (await session.execute(
+            select(Submission.total_score).where(Submission.test_lesson_id == test_lesson.id, Submission.is_draft == False)
+        )).scalars().all()
+    correct = sum(1 for total in totals if total == 3.0)
+
+    response = await client.get(url, headers=headers)
+    assert response.status_code == 200, response.text
+    analytics = response.json()
+    assert analytics["submissions"] == len(totals)
+    first, second, text = analytics["items"]
+    assert first["difficulty"] == round(correct / len(totals), 4)
+    # Правильный ответ на первый вопрос — ровно у тех, кто набрал больше за остальные
+    assert first["discrimination"] == 1.0
+    assert text["difficulty"] == 1.0 and text["discrimination"] is None and text["options"] == []
+    assert [(o["option"], o["count"], o["is_correct"]) for o in first["options"]] == \
+        [(0, len(totals) - correct, False), (1, correct, True), (2, 0, False)]
+    assert {o["option"]: o["count"] for o in second["options"] if o["count"]} == {1: len(totals), 3: correct}
+
+    cached = await client.get(url, headers=headers)
+    assert cached.json() == analytics
+    assert _queries(cached) < _queries(response)
+
+    student = seeded.students[0]
+    response = await client.post(f"/lesson/test/{test_lesson.slug}/check",
+                                 json={"answers": [0, [1], "Питер"]}, headers=auth_headers(student))
+    assert response.status_code == 200, response.text
+    try:
+        updated = (await client.get(url, headers=headers)).json()
+    finally:
+        async with async_session() as session:
+            async with session.begin():
+                submissions = select(Submission.id).where(Submission.test_lesson_id == test_lesson.id,
+                                                          Submission.user_id == student.user_id)
+                await session.execute(delete(SubmissionAnswer).where(SubmissionAnswer.submission_id.in_(submissions)))
+                await session.execute(delete(Submission).where(Submission.id.in_(submissions)))
+
+    assert updated["submissions"] == len(totals) + 1
+    assert updated["items"][2]["wrong_answers"] == [{"answer": "питер", "count": 1}]
+
+    other_teacher = next(teacher for teacher in dataset.teachers if teacher != seeded.teacher)
+    assert (await client.get(url, headers=auth_headers(other_teacher))).status_code == 404
@@ -0,0 +1,98 @@
+import re
+
+from sqlalchemy import delete, select
+
+# Псевдонимы: имена на Test* pytest пытается собрать как тестовые классы
+from db.models.lesson import TestSubmission as Submission, TestSubmissionAnswer as SubmissionAnswer
+
+
+async def test_draft_autosave_upserts_changed_answers(client, dataset, auth_headers):
+    from db.session import async_session
+
+    seeded = dataset.courses[2]
+    student = seeded.students[0]
+    test_lesson = seeded.test_lessons[-1]
+    headers = auth_headers(student)
+    url = f"/lesson/test/{test_lesson.slug}/draft"
+
+    assert (await client.get(f"/lesson/test/{test_lesson.slug}/result", headers=headers)).status_code == 404
+    assert (await client.get(url, headers=headers)).status_code == 404
+
+    response = await client.put(url, json={"version": 0, "answers": [
+        {"question_index": 0, "answer": {"answer_type": "single", "selected_option": 2}},
+        {"question_index": 2, "answer": {"answer_type": "text", "text": "Питер"}},
+    ]}, headers=headers)
+    assert response.status_code == 200, response.text
+    assert response.json() == {"version": 1}
+
+    # Повторное сохранение не перезаписывает ответы, которых нет в запросе
+    response = await client.put(url, json={"version": 1, "answers": [
+        {"question_index": 2, "answer": "Москва"},
+        {"question_index": 1, "answer": [1, 3]},
+    ]}, headers=headers)
+    assert response.status_code == 200, response.text
+    assert response.json() == {"version": 2}
+    queries = int(re.search(r'desc="(\d+) queries"', response.headers["server-timing"]).group(1))
+    # Поиск урока с проверкой доступа (4), проверка отправки (1), upsert черновика и ответов (2)
+    assert queries <= 7
+
+    stale = await client.put(url, json={"version": 1, "answers": [{"question_index": 0, "answer": 0}]},
+                             headers=headers)
+    assert stale.status_code == 409
+
+    invalid = await client.put(url, json={"version": 2, "answers": [{"question_index": 7, "answer": 0}]},
+                               headers=headers)
+    assert invalid.status_code == 400
+
+    draft = (await client.get(url, headers=headers)).json()
+    async with async_session() as session:
+        async with session.begin():
+            drafts = select(Submission.id).where(Submission.is_draft, Submission.user_id == student.user_id)
+            await session.execute(delete(SubmissionAnswer).where(SubmissionAnswer.submission_id.in_(drafts)))
+            await session.execute(delete(Submission).where(Submission.id.in_(drafts)))
+
+    assert draft["version"] == 2
+    assert [(a["question_index"], a["selected_option"], a["selected_options"], a["text_answer"])
+            for a in draft["answers"]] == [(0, 2, None, None), (1, None, [1, 3], None), (2, None, None, "Москва")]
+
+
+async def test_check_finalizes_draft_in_place(client, dataset, auth_headers):
+    from db.session import async_session
+
+    seeded = dataset.courses[2]
+    student = seeded.students[4]
+    test_lesson = seeded.test_lessons[-1]
+    headers = auth_headers(student)
+
+    response = await client.put(f"/lesson/test/{test_lesson.slug}/draft", json={"version": 0, "answers": [
+        {"question_index": 0, "answer": 0},
+        {"question_index": 2, "answer": "Питер"},
+    ]}, headers=headers)
+    assert response.status_code == 200, response.text
+
+    async with async_session() as session:
+        drafts = select(Submission.id).where(Submission.test_lesson_id == test_lesson.id,
+                                             Submission.user_id == student.user_id)
+        draft_id = (await session.execute(drafts)).scalar_one()
+
+    response = await client.post(f"/lesson/test/{test_lesson.slug}/check",
+                                 json={"answers": [1, [1, 3], " москва "]}, headers=headers)
+    assert response.status_code == 200, response.text
+    assert response.json()["total_score"] == 3.0
+
+    async with async_session() as session:
+        async with session.begin():
+            submissions = (await session.execute(
+                select(Submission.id, Submission.is_draft).where(Submission.id.in_(drafts))
+            )).all()
+            answers = (await session.execute(
+                select(SubmissionAnswer.question_index, SubmissionAnswer.text_answer, SubmissionAnswer.score)
+                .where(SubmissionAnswer.submission_id == draft_id)
+                .order_by(SubmissionAnswer.question_index)
+            )).all()
+            await session.execute(delete(SubmissionAnswer).where(SubmissionAnswer.submission_id.in_(drafts)))
+            await session.execute(delete(Submission).where(Submission.id.in_(drafts)))
+
+    assert submissions == [(draft_id, False)]
+    assert [(index, text, score) for index, text, score in answers] == \
+        [(0, None, 1.0), (1, None, 1.0), (2, " москва ", 1.0)]
@@ -0,0 +1,54 @@
+import csv
+import io
+
+from sqlalchemy import delete, select
+
+from db.models.course import student_courses
+from db.models.user import User
+from utils.hashing import Hasher
+
+
+async def test_user_import_creates_users_and_enrolls(client, dataset, auth_headers):
+    from db.session import async_session
+
+    seeded = dataset.courses[3]
+    roster = "\n".join([
+        "email,last_name,first_name,password",
+        "New.Student@example.com,Петров,Петр,secret123",
+        "generated@example.com,Сидоров,Сидор,",
+        f"{seeded.students[0].email},Иванов,Иван,",
+        "broken@example.com,Petrov1,Петр,",
+        "new.student@example.com,Петров,Петр,",
+    ])
+
+    response = await client.post(
+        f"/admin/user/import?course_id={seeded.course.id}",
+        files={"file": ("users.csv", roster.encode(), "text/csv")},
+        headers=auth_headers(dataset.admin),
+    )
+    assert response.status_code == 200, response.text
+    assert response.headers["content-disposition"].startswith("attachment")
+    report = list(csv.DictReader(io.StringIO(response.text)))
+
+    async with async_session() as session:
+        async with session.begin():
+            created = (await session.execute(
+                select(User.email, User.hashed_password).where(User.email.in_(["new.student@example.com",
+                                                                               "generated@example.com"]))
+            )).all()
+            await session.execute(delete(student_courses).where(
+                student_courses.c.student_id.in_(select(User.user_id).where(User.email.in_([e for e, _ in created])))
+            ))
+            await session.execute(delete(User).where(User.email.in_([e for e, _ in created])))
+
+    assert [(row["row"], row["status"], row["enrollment"]) for row in report] == [
+        ("2", "created", "enrolled"),
+        ("3", "created", "enrolled"),
+        ("4", "exists", "already_enrolled"),
+        ("5", "invalid", ""),
+        ("6", "duplicate", ""),
+    ]
+    hashes = dict(created)
+    assert report[0]["password"] == ""
+    assert Hasher.verify_password("secret123", hashes["new.student@example.com"])
+    assert Hasher.verify_password(report[1]["password"], hashes["generated@example.com"])
@@ -0,0 +1,39 @@
+import asyncio
+from typing import Any, Coroutine
+
+from loguru import logger
+
+from utils.metrics import register_metrics_source
+
+
+class BackgroundJobs:
+    """
+    Фоновые задачи процесса (пересчёт оценок и т.п.). Держит ссылки на запущенные задачи,
+    чтобы их не собрал GC, и отменяет их при остановке приложения.
+    """
+
+    def __init__(self):
+        self._tasks: set[asyncio.Task] = set()
+        self.started = 0
+
+    def spawn(self, coro: Coroutine[Any, Any, Any], name: str) -> asyncio.Task:
+        task = asyncio.create_task(coro, name=name)
+        self._tasks.add(task)
+        self.started += 1
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def shutdown(self) -> None:
+        if not self._tasks:
+            return
+        logger.info(f"Остановка фоновых задач: {len(self._tasks)}")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def stats(self) -> dict[str, Any]:
+        return {"running": len(self._tasks), "started": self.started}
+
+
+background_jobs = BackgroundJobs()
+register_metrics_source("background_jobs", background_jobs.stats)
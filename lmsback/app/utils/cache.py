@@ -0,0 +1,119 @@
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+from uuid import UUID
+
+from core.config import (USER_CACHE_MAXSIZE, USER_CACHE_TTL_SECONDS, TOKEN_VERSION_CACHE_TTL_SECONDS,
+                         TOKEN_CLAIMS_CACHE_MAXSIZE, ACCESS_TOKEN_EXPIRE_MINUTES, READ_YOUR_WRITES_SECONDS,
+                         ANSWER_KEY_CACHE_MAXSIZE, ANSWER_KEY_CACHE_TTL_SECONDS,
+                         TEST_ANALYTICS_CACHE_MAXSIZE, TEST_ANALYTICS_CACHE_TTL_SECONDS)
+from utils.metrics import register_metrics_source
+
+
+class TTLCache:
+    """
+    LRU-кэш в памяти процесса с ограниченным размером и временем жизни записей.
+    Рассчитан на использование из одного event loop (без блокировок).
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: Hashable) -> Any:
+        item = self._data.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+
+        expires_at, value = item
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return None
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        if self.maxsize <= 0:
+            return
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+    def invalidate_where(self, predicate: Callable[[Any], bool]) -> int:
+        keys = [key for key, (_, value) in self._data.items() if predicate(value)]
+        for key in keys:
+            del self._data[key]
+        return len(keys)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+# Пользователи, найденные по subject токена
+user_cache = TTLCache(maxsize=USER_CACHE_MAXSIZE, ttl=USER_CACHE_TTL_SECONDS)
+register_metrics_source("user_cache", user_cache.stats)
+
+# Актуальные версии токенов пользователей (user_id -> token_version)
+token_version_cache = TTLCache(maxsize=USER_CACHE_MAXSIZE, ttl=TOKEN_VERSION_CACHE_TTL_SECONDS)
+register_metrics_source("token_version_cache", token_version_cache.stats)
+
+# Проверенные JWT (токен -> payload); время жизни записи ограничено exp токена
+token_claims_cache = TTLCache(maxsize=TOKEN_CLAIMS_CACHE_MAXSIZE, ttl=ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+register_metrics_source("token_claims_cache", token_claims_cache.stats)
+
+# Пользователи (subject токена), недавно писавшие в базу: их чтения идут мимо реплики
+primary_pin_cache = TTLCache(maxsize=USER_CACHE_MAXSIZE, ttl=READ_YOUR_WRITES_SECONDS)
+register_metrics_source("primary_pin_cache", primary_pin_cache.stats)
+
+# Скомпилированные ключи ответов тестов ((test_lesson_id, updated_at) -> AnswerKey)
+answer_key_cache = TTLCache(maxsize=ANSWER_KEY_CACHE_MAXSIZE, ttl=ANSWER_KEY_CACHE_TTL_SECONDS)
+register_metrics_source("answer_key_cache", answer_key_cache.stats)
+
+# Аналитика тестов ((test_lesson_id, updated_at, число отправок, последний id) -> TestAnalyticsResponse)
+test_analytics_cache = TTLCache(maxsize=TEST_ANALYTICS_CACHE_MAXSIZE, ttl=TEST_ANALYTICS_CACHE_TTL_SECONDS)
+register_metrics_source("test_analytics_cache", test_analytics_cache.stats)
+
+
+def invalidate_cached_user(user_id: UUID) -> None:
+    user_cache.invalidate_where(lambda user: user.user_id == user_id)
+    token_version_cache.invalidate(user_id)
+
+
+def pin_to_primary(subject: str) -> None:
+    primary_pin_cache.set(subject, True)
+
+
+def is_pinned_to_primary(subject: str) -> bool:
+    return primary_pin_cache.get(subject) is not None
+
+
+def invalidate_answer_key(test_lesson_id: int) -> None:
+    answer_key_cache.invalidate_where(lambda key: key.test_lesson_id == test_lesson_id)
+
+
+def invalidate_test_analytics(test_lesson_id: int) -> None:
+    test_analytics_cache.invalidate_where(lambda analytics: analytics.test_lesson_id == test_lesson_id)
@@ -0,0 +1,70 @@
+import csv
+import io
+import tempfile
+from enum import Enum
+from typing import Any, AsyncIterator, List, Sequence
+from urllib.parse import quote
+
+from fastapi.responses import StreamingResponse
+from openpyxl import Workbook
+from starlette.concurrency import run_in_threadpool
+
+from utils.roster import XLSX_TYPE
+
+# Пачка строк выгрузки — как её отдаёт курсор базы
+RowBatches = AsyncIterator[Sequence[Sequence[Any]]]
+
+# Размер куска готового XLSX при отдаче клиенту
+_XLSX_CHUNK_SIZE = 64 * 1024
+
+
+class ExportFormat(str, Enum):
+    CSV = "csv"
+    XLSX = "xlsx"
+
+
+def _csv_cell(value: Any) -> Any:
+    # Excel выполняет ячейки, начинающиеся с =, +, -, @, как формулы
+    if isinstance(value, str) and value[:1] in ("=", "+", "-", "@"):
+        return "'" + value
+    return value
+
+
+async def _csv_chunks(header: List[str], batches: RowBatches) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=";")
+    # BOM: без него Excel открывает UTF-8 как cp1251
+    writer.writerow(header)
+    yield ("\ufeff" + buffer.getvalue()).encode("utf-8")
+    async for batch in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([_csv_cell(value) for value in row] for row in batch)
+        yield buffer.getvalue().encode("utf-8")
+
+
+async def _xlsx_chunks(header: List[str], batches: RowBatches, title: str) -> AsyncIterator[bytes]:
+    # write_only: строки сразу уходят во временный файл openpyxl, а не копятся в памяти
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title[:31])
+    sheet.append(header)
+    async for batch in batches:
+        for row in batch:
+            sheet.append(list(row))
+    # XLSX — zip-архив, отдать его можно только целиком: собираем во временном файле
+    with tempfile.TemporaryFile() as file:
+        await run_in_threadpool(workbook.save, file)
+        file.seek(0)
+        while chunk := await run_in_threadpool(file.read, _XLSX_CHUNK_SIZE):
+            yield chunk
+
+
+def export_response(filename: str, header: List[str], batches: RowBatches,
+                    export_format: ExportFormat) -> StreamingResponse:
+    """Потоковый ответ с выгрузкой: строки пишутся по мере чтения пачек из базы."""
+    if export_format == ExportFormat.XLSX:
+        content, media_type = _xlsx_chunks(header, batches, filename), XLSX_TYPE
+    else:
+        content, media_type = _csv_chunks(header, batches), "text/csv; charset=utf-8"
+    disposition = f"attachment; filename*=UTF-8''{quote(f'{filename}.{export_format.value}')}"
+    return StreamingResponse(content, media_type=media_type, headers={"Content-Disposition": disposition})
@@ -0,0 +1,131 @@
+from dataclasses import dataclass
+from datetime import datetime
+from functools import partial
+from typing import Any, Callable, Mapping, Optional, Sequence
+
+# Проверка одного ответа: True/False или None, если ответ не подходит под тип вопроса
+Grader = Callable[[Any], Optional[bool]]
+
+
+def _grade_single(expected: int, answer: Any) -> Optional[bool]:
+    return answer == expected if isinstance(answer, int) else None
+
+
+def _grade_multiple(expected: frozenset, answer: Any) -> Optional[bool]:
+    if not isinstance(answer, list):
+        return None
+    return frozenset(i for i in answer if isinstance(i, int)) == expected
+
+
+def _grade_text(expected: str, answer: Any) -> Optional[bool]:
+    return answer.strip().lower() == expected if isinstance(answer, str) else None
+
+
+def _single_key(correct: Any) -> Optional[int]:
+    return correct.correct_option
+
+
+def _multiple_key(correct: Any) -> Optional[frozenset]:
+    options = correct.correct_options
+    if isinstance(options, list) and all(isinstance(i, int) for i in options):
+        return frozenset(options)
+    return None
+
+
+def _text_key(correct: Any) -> Optional[str]:
+    text = correct.correct_text
+    if isinstance(text, str) and text.strip():
+        return text.strip().lower()
+    return None
+
+
+# Тип вопроса -> (ожидаемый ответ из TestCorrectAnswer, проверка ответа студента)
+GRADERS: dict[str, tuple[Callable[[Any], Any], Callable[[Any, Any], Optional[bool]]]] = {
+    "single": (_single_key, _grade_single),
+    "multiple": (_multiple_key, _grade_multiple),
+    "text": (_text_key, _grade_text),
+}
+
+
+@dataclass(frozen=True)
+class AnswerKey:
+    """
+    Скомпилированный ключ ответов теста. Для каждого вопроса — его тип (None, если вопрос
+    не в формате dict) и проверка с уже нормализованным правильным ответом
+    (None, если автопроверка невозможна).
+    """
+    test_lesson_id: int
+    version: Optional[datetime]
+    question_types: tuple[Optional[str], ...]
+    graders: tuple[Optional[Grader], ...]
+
+
+@dataclass
+class GradeResult:
+    checked: int
+    total_score: float
+    # (is_correct, score) по вопросам в порядке теста
+    results: list[tuple[Optional[bool], float]]
+
+
+def compile_answer_key(
+    test_lesson_id: int,
+    version: Optional[datetime],
+    questions: Sequence[Any],
+    correct_answers: Mapping[int, Any],
+) -> AnswerKey:
+    question_types: list[Optional[str]] = []
+    graders: list[Optional[Grader]] = []
+    for idx, question in enumerate(questions or []):
+        if not isinstance(question, dict):
+            question_types.append(None)
+            graders.append(None)
+            continue
+
+        q_type = question.get("question_type") or "single"
+        question_types.append(q_type)
+        correct = correct_answers.get(idx)
+        rule = GRADERS.get(q_type)
+        expected = rule[0](correct) if rule is not None and correct is not None else None
+        graders.append(partial(rule[1], expected) if expected is not None else None)
+
+    return AnswerKey(
+        test_lesson_id=test_lesson_id,
+        version=version,
+        question_types=tuple(question_types),
+        graders=tuple(graders),
+    )
+
+
+def _grade(grader: Optional[Grader], answer: Any) -> tuple[Optional[bool], float]:
+    is_correct = grader(answer) if grader is not None else None
+    if is_correct is None:
+        return None, 0.0
+    return is_correct, 1.0 if is_correct else 0.0
+
+
+def grade_answers(key: AnswerKey, answers: Sequence[Any]) -> GradeResult:
+    """Проверка нормализованных ответов (по одному на вопрос теста) по ключу."""
+    results = [_grade(grader, answer) for grader, answer in zip(key.graders, answers)]
+    return GradeResult(
+        checked=sum(1 for is_correct, _ in results if is_correct is not None),
+        total_score=sum((score for _, score in results), 0.0),
+        results=results,
+    )
+
+
+# Тип вопроса -> колонка TestSubmissionAnswer, в которой хранится ответ
+STORED_ANSWER_COLUMNS = {
+    "single": "selected_option",
+    "multiple": "selected_options",
+    "text": "text_answer",
+}
+
+
+def grade_stored_answer(key: AnswerKey, question_index: int, row: Any) -> tuple[Optional[bool], float]:
+    """Проверка сохранённого ответа (строки test_submission_answers) по текущему ключу."""
+    if question_index >= len(key.graders):
+        return None, 0.0
+    column = STORED_ANSWER_COLUMNS.get(key.question_types[question_index])
+    answer = getattr(row, column) if column is not None else None
+    return _grade(key.graders[question_index], answer)
@@ -1,7 +1,160 @@
+import asyncio
+import math
+import statistics
+import threading
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, List, Optional
+
+from loguru import logger
 from passlib.context import CryptContext
+from passlib.hash import bcrypt
+
+from core.config import PASSWORD_HASH_WORKERS, BULK_PASSWORD_HASH_PROCESSES, BCRYPT_TARGET_MS, BCRYPT_MIN_ROUNDS
+from utils.metrics import LatencyStats, register_metrics_source
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# Итоговые настройки bcrypt после configure_password_hashing
+bcrypt_settings: dict[str, Any] = {"rounds": None, "calibrated": False, "target_ms": BCRYPT_TARGET_MS}
+register_metrics_source("bcrypt", lambda: dict(bcrypt_settings))
+
+_CALIBRATION_ROUNDS = 8
+
+# Нижняя граница стоимости: не слабее passlib по умолчанию (12), на котором создавались прежние хеши
+BCRYPT_ROUNDS_FLOOR = max(BCRYPT_MIN_ROUNDS, bcrypt.default_rounds)
+
+
+def calibrate_bcrypt_rounds(target_ms: float, min_rounds: int, max_rounds: int, samples: int = 5) -> int:
+    """
+    Подбор стоимости bcrypt под целевое время хеширования на текущем железе.
+    Каждый раунд удваивает время, поэтому достаточно замерить один дешёвый уровень.
+    """
+    probe = bcrypt.using(rounds=_CALIBRATION_ROUNDS)
+    timings = []
+    for _ in range(samples):
+        started_at = time.perf_counter()
+        probe.hash("calibration")
+        timings.append((time.perf_counter() - started_at) * 1000)
+
+    probe_ms = statistics.median(timings)
+    rounds = _CALIBRATION_ROUNDS + round(math.log2(target_ms / probe_ms))
+    return max(min_rounds, min(max_rounds, rounds))
+
+
+def configure_password_hashing(rounds: int, calibrated: bool = False) -> int:
+    """
+    Выставляет стоимость bcrypt для новых хешей (не ниже BCRYPT_ROUNDS_FLOOR).
+    Устаревшими (pwd_context.needs_update) считаются только более слабые хеши:
+    при входе они пересчитываются, более дорогие остаются как есть.
+    """
+    rounds = max(rounds, BCRYPT_ROUNDS_FLOOR)
+    pwd_context.update(
+        bcrypt__default_rounds=rounds,
+        bcrypt__min_rounds=rounds,
+    )
+    bcrypt_settings["rounds"] = rounds
+    bcrypt_settings["calibrated"] = calibrated
+    logger.info(f"Стоимость bcrypt: {rounds} раундов (калибровка: {calibrated})")
+    return rounds
+
+
+class PasswordHashExecutor:
+    """
+    Пул потоков для bcrypt: хеширование не блокирует event loop,
+    а число одновременно считаемых хешей ограничено размером пула.
+    """
+
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self.queued = 0
+        self.running = 0
+        self.wait_latency = LatencyStats()
+        self.hash_latency = LatencyStats()
+        # Счётчики меняются и из event loop, и из потоков пула
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="password-hash")
+
+    def _run(self, submitted_at: float, func: Callable[..., Any], *args) -> Any:
+        started_at = time.perf_counter()
+        with self._lock:
+            self.queued -= 1
+            self.running += 1
+            self.wait_latency.observe(started_at - submitted_at)
+        try:
+            return func(*args)
+        finally:
+            finished_at = time.perf_counter()
+            with self._lock:
+                self.running -= 1
+                self.hash_latency.observe(finished_at - started_at)
+
+    async def run(self, func: Callable[..., Any], *args) -> Any:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self.queued += 1
+        return await loop.run_in_executor(self._executor, self._run, time.perf_counter(), func, *args)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "queue_depth": self.queued,
+                "running": self.running,
+                "wait": self.wait_latency.stats(),
+                "hash": self.hash_latency.stats(),
+            }
+
+
+password_hash_executor = PasswordHashExecutor(max_workers=PASSWORD_HASH_WORKERS)
+register_metrics_source("password_hashing", password_hash_executor.stats)
+
+
+def _hash_chunk(passwords: List[str], rounds: Optional[int]) -> List[str]:
+    # Выполняется в дочернем процессе: стоимость передаётся явно, калибровка там не запускалась
+    handler = bcrypt.using(rounds=rounds) if rounds else pwd_context
+    return [handler.hash(password) for password in passwords]
+
+
+class BulkPasswordHasher:
+    """
+    Пул процессов для массового хеширования паролей (импорт пользователей).
+    Не занимает пул потоков входа и не конкурирует с event loop за GIL.
+    """
+
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: fork процесса с потоками и открытыми соединениями небезопасен
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                 mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    async def hash_many(self, passwords: List[str]) -> List[str]:
+        if not passwords:
+            return []
+        loop = asyncio.get_running_loop()
+        size = math.ceil(len(passwords) / self.max_workers)
+        chunks = [passwords[i:i + size] for i in range(0, len(passwords), size)]
+        started_at = time.perf_counter()
+        results = await asyncio.gather(*(
+            loop.run_in_executor(self._pool(), _hash_chunk, chunk, bcrypt_settings["rounds"]) for chunk in chunks
+        ))
+        logger.info(f"Захешировано паролей: {len(passwords)} за {time.perf_counter() - started_at:.2f} с")
+        return [hashed for chunk in results for hashed in chunk]
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+bulk_password_hasher = BulkPasswordHasher(max_workers=BULK_PASSWORD_HASH_PROCESSES)
+
 
 class Hasher:
     @staticmethod
@@ -11,3 +164,15 @@ class Hasher:
     @staticmethod
     def get_password_hash(password: str) -> str:
         return pwd_context.hash(password)
+
+    @staticmethod
+    def needs_rehash(hashed_password: str) -> bool:
+        return pwd_context.needs_update(hashed_password)
+
+    @staticmethod
+    async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+        return await password_hash_executor.run(pwd_context.verify, plain_password, hashed_password)
+
+    @staticmethod
+    async def get_password_hash_async(password: str) -> str:
+        return await password_hash_executor.run(pwd_context.hash, password)
@@ -0,0 +1,38 @@
+from typing import Any
+
+from core.config import LOGIN_MAX_CONCURRENCY
+from utils.metrics import register_metrics_source
+
+
+class ConcurrencyLimiter:
+    """
+    Ограничение числа одновременно выполняемых операций без ожидания:
+    если лимит исчерпан, try_acquire сразу возвращает False.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.in_flight = 0
+        self.rejected = 0
+
+    def try_acquire(self) -> bool:
+        if self.in_flight >= self.limit:
+            self.rejected += 1
+            return False
+        self.in_flight += 1
+        return True
+
+    def release(self) -> None:
+        self.in_flight -= 1
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "rejected": self.rejected,
+        }
+
+
+# Попытки входа по паролю: каждая занимает поток bcrypt
+login_limiter = ConcurrencyLimiter(limit=LOGIN_MAX_CONCURRENCY)
+register_metrics_source("login", login_limiter.stats)
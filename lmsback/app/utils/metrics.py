@@ -0,0 +1,48 @@
+from collections import deque
+from typing import Any, Callable
+
+
+# Источники метрик процесса: имя -> функция, возвращающая словарь значений
+_metrics_sources: dict[str, Callable[[], dict[str, Any]]] = {}
+
+
+def register_metrics_source(name: str, source: Callable[[], dict[str, Any]]) -> None:
+    _metrics_sources[name] = source
+
+
+def collect_metrics() -> dict[str, dict[str, Any]]:
+    return {name: source() for name, source in _metrics_sources.items()}
+
+
+class LatencyStats:
+    """
+    Счётчик длительностей: общее количество, среднее и максимум за всё время,
+    перцентили — по последним `window` замерам.
+    """
+
+    def __init__(self, window: int = 1024):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._recent: deque[float] = deque(maxlen=window)
+
+    def observe(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self._recent.append(seconds)
+
+    def _percentile(self, samples: list[float], q: float) -> float:
+        if not samples:
+            return 0.0
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+    def stats(self) -> dict[str, Any]:
+        samples = sorted(self._recent)
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            "p50_ms": round(self._percentile(samples, 0.50) * 1000, 3),
+            "p95_ms": round(self._percentile(samples, 0.95) * 1000, 3),
+            "max_ms": round(self.max * 1000, 3),
+        }
@@ -0,0 +1,37 @@
+import base64
+import binascii
+from datetime import datetime
+from typing import Callable, List, Optional, Sequence, Tuple, TypeVar
+
+T = TypeVar("T")
+
+# Заголовок ответа с курсором следующей страницы
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# Позиция в списке отправок: (submitted_at, id) последней выданной записи
+Cursor = Tuple[datetime, int]
+
+
+def encode_cursor(submitted_at: datetime, id: int) -> str:
+    raw = f"{submitted_at.isoformat()}|{id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Cursor:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        submitted_at, _, id = raw.partition("|")
+        return datetime.fromisoformat(submitted_at), int(id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError("Некорректный курсор пагинации")
+
+
+def split_page(rows: Sequence[T], limit: Optional[int], key: Callable[[T], Cursor]) -> Tuple[List[T], Optional[str]]:
+    """
+    DAL запрашивает limit + 1 строк: лишняя строка означает, что есть следующая страница.
+    Возвращает страницу и курсор следующей (None, если страница последняя).
+    """
+    if limit is None or len(rows) <= limit:
+        return list(rows), None
+    page = list(rows[:limit])
+    return page, encode_cursor(*key(page[-1]))
@@ -0,0 +1,96 @@
+import codecs
+import csv
+from itertools import islice
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from fastapi import HTTPException, UploadFile
+from openpyxl import load_workbook
+
+
+CSV_TYPES = {"text/csv", "application/csv", "text/plain", "application/vnd.ms-excel"}
+XLSX_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+# Строка файла: (номер строки в файле, значение из колонки email)
+RosterRow = Tuple[int, str]
+
+
+def _email_column(header: List[str]) -> Optional[int]:
+    for index, cell in enumerate(header):
+        if cell.strip().lower() in ("email", "e-mail", "почта"):
+            return index
+    return None
+
+
+def _rows(cells: Iterator[List[str]]) -> Iterator[RosterRow]:
+    """
+    Колонка с email берётся из заголовка; если заголовка нет,
+    email ожидается в первой колонке, и первая строка — уже данные.
+    """
+    first = next(cells, None)
+    if first is None:
+        return
+    column = _email_column(first)
+    if column is None:
+        column = 0
+        yield 1, first[0].strip() if first else ""
+    for line_number, row in enumerate(cells, start=2):
+        if not any(cell.strip() for cell in row):
+            continue
+        yield line_number, row[column].strip() if column < len(row) else ""
+
+
+def _csv_reader(file: BinaryIO):
+    sample = file.read(4096).decode("utf-8-sig", errors="replace")
+    file.seek(0)
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+    except csv.Error:
+        dialect = csv.excel
+    # Файл читается построчно, целиком в память не загружается
+    return codecs.getreader("utf-8-sig")(file, errors="replace"), dialect
+
+
+def _csv_cells(file: BinaryIO) -> Iterator[List[str]]:
+    stream, dialect = _csv_reader(file)
+    yield from csv.reader(stream, dialect)
+
+
+def _records(file: BinaryIO) -> Iterator[Tuple[int, Dict[str, str]]]:
+    stream, dialect = _csv_reader(file)
+    cells = csv.reader(stream, dialect)
+    header = [cell.strip().lower() for cell in next(cells, [])]
+    for line_number, row in enumerate(cells, start=2):
+        if not any(cell.strip() for cell in row):
+            continue
+        yield line_number, {key: value.strip() for key, value in zip(header, row) if key}
+
+
+def iter_csv_records(upload: UploadFile) -> Iterator[Tuple[int, Dict[str, str]]]:
+    """Строки CSV с заголовком: (номер строки, {колонка в нижнем регистре: значение})."""
+    filename = (upload.filename or "").lower()
+    if upload.content_type not in CSV_TYPES and not filename.endswith(".csv"):
+        raise HTTPException(status_code=415, detail="File must be a CSV")
+    return _records(upload.file)
+
+
+def _xlsx_cells(file: BinaryIO) -> Iterator[List[str]]:
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        for row in workbook.active.iter_rows(values_only=True):
+            yield ["" if cell is None else str(cell) for cell in row]
+    finally:
+        workbook.close()
+
+
+def iter_roster(upload: UploadFile) -> Iterator[RosterRow]:
+    """Построчное чтение списка студентов из CSV или XLSX."""
+    filename = (upload.filename or "").lower()
+    if upload.content_type == XLSX_TYPE or filename.endswith(".xlsx"):
+        return _rows(_xlsx_cells(upload.file))
+    if upload.content_type in CSV_TYPES or filename.endswith(".csv"):
+        return _rows(_csv_cells(upload.file))
+    raise HTTPException(status_code=415, detail="Roster must be a CSV or XLSX file")
+
+
+def next_batch(rows: Iterator[RosterRow], size: int) -> List[RosterRow]:
+    return list(islice(rows, size))
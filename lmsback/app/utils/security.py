@@ -1,3 +1,4 @@
+import time
 from datetime import datetime
 from datetime import timedelta
 from typing import Optional
@@ -8,6 +9,25 @@ from core.config import SECRET_KEY
 from core.config import ALGORITHM
 from core.config import ACCESS_TOKEN_EXPIRE_MINUTES
 from core.config import REFRESH_TOKEN_EXPIRE_DAYS
+from utils.cache import token_claims_cache
+
+
+def decode_token(token: str) -> dict:
+    """
+    Проверяет подпись и срок действия токена, возвращает payload.
+    Бросает JWTError, если токен недействителен.
+    Проверенные токены кэшируются до истечения их exp; возвращаемый
+    payload общий для всех запросов с этим токеном — не изменять.
+    """
+    payload = token_claims_cache.get(token)
+    if payload is not None:
+        return payload
+
+    payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    exp = payload.get("exp")
+    if exp is not None:
+        token_claims_cache.set(token, payload, ttl=exp - time.time())
+    return payload
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
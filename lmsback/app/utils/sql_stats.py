@@ -0,0 +1,114 @@
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Optional
+
+from loguru import logger
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from core.config import SQL_QUERY_COUNT_WARN, SQL_TIME_WARN_MS, SQL_REPEATED_SHAPE_WARN
+
+
+_PARAM_RE = re.compile(r"\$\d+|%\(\w+\)s|%s|\?")
+_PARAM_LIST_RE = re.compile(r"\?(?:\s*,\s*\?)+")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def sql_shape(statement: str) -> str:
+    """Текст запроса без параметров: IN ($1, $2, ...) и IN ($1) дают одну форму."""
+    shape = _PARAM_RE.sub("?", statement)
+    shape = _PARAM_LIST_RE.sub("?", shape)
+    return _WHITESPACE_RE.sub(" ", shape).strip()
+
+
+class RequestSQLStats:
+    """SQL-запросы одного HTTP-запроса: количество, суммарное время и повторы."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes: Counter[str] = Counter()
+
+    def record(self, statement: str, duration: float) -> None:
+        self.count += 1
+        self.duration += duration
+        self.shapes[sql_shape(statement)] += 1
+
+    def repeated_shapes(self, limit: int) -> list[tuple[str, int]]:
+        return [(shape, times) for shape, times in self.shapes.most_common() if times > limit]
+
+    def server_timing(self, total: float) -> str:
+        return (
+            f'db;dur={self.duration * 1000:.2f};desc="{self.count} queries", '
+            f"app;dur={total * 1000:.2f}"
+        )
+
+
+_current_stats: ContextVar[Optional[RequestSQLStats]] = ContextVar("sql_stats", default=None)
+
+
+def current_sql_stats() -> Optional[RequestSQLStats]:
+    return _current_stats.get()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_stats.get() is not None and context is not None:
+        context._sql_stats_started_at = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current_stats.get()
+    started_at = getattr(context, "_sql_stats_started_at", None)
+    if stats is not None and started_at is not None:
+        stats.record(statement, time.perf_counter() - started_at)
+
+
+def instrument_engine(engine: Engine) -> None:
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def _report(method: str, path: str, stats: RequestSQLStats) -> None:
+    db_ms = round(stats.duration * 1000, 2)
+    log = logger.bind(method=method, path=path, queries=stats.count, db_ms=db_ms)
+    if stats.count > SQL_QUERY_COUNT_WARN or db_ms > SQL_TIME_WARN_MS:
+        log.warning(f"SQL: {method} {path} queries={stats.count} db_ms={db_ms}")
+    for shape, times in stats.repeated_shapes(SQL_REPEATED_SHAPE_WARN):
+        log.bind(repeats=times, shape=shape).warning(
+            f"SQL: {method} {path} повтор запроса {times} раз (вероятно N+1): {shape[:300]}"
+        )
+
+
+class SQLStatsMiddleware:
+    """
+    Считает SQL-запросы каждого HTTP-запроса, отдаёт их в Server-Timing
+    и пишет предупреждения при превышении порогов.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestSQLStats()
+        token = _current_stats.set(stats)
+        started_at = time.perf_counter()
+
+        async def send_with_timing(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", stats.server_timing(time.perf_counter() - started_at))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_stats.reset(token)
+            _report(scope["method"], scope["path"], stats)